@@ -0,0 +1,161 @@
+"""
+发票解析基准语料与性能剖析
+
+用法:
+    python benchmarks/bench_fapiao_corpus.py                       # 生成临时语料 (默认 60 张) 并测试
+    python benchmarks/bench_fapiao_corpus.py --count 300 --dir corpus  # 语料保存到 corpus/，下次可直接复用
+    python benchmarks/bench_fapiao_corpus.py --dir corpus --profile hot.prof  # 同时用 cProfile 输出热点
+
+用 reportlab 生成覆盖增值税发票、全电发票、卷式发票的合成 PDF (部分带多页附件)，
+标准答案写在语料目录的 truth.json 中。逐个调用 fapiao_engine.extract_info
+(计时包装见 bench_fapiao_extract.stage_timers)，统计每张发票的 pdfplumber 文本提取、
+字段识别和其余开销，以及逐字段准确率。
+真实语料也可以使用：把 PDF 放进目录并按 truth.json 的格式 ({"文件名": {字段: 值}}) 写好答案。
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fapiao_engine as fe  # noqa: E402
+from bench_fapiao_extract import synth_invoice, timed_extract_info  # noqa: E402
+
+TRUTH_FILE = "truth.json"
+FIELDS = ("发票代码", "发票号码", "开票日期", "金额", "购买方名称", "购买方税号", "销售方税号")
+
+
+def make_corpus(folder, count, seed):
+    """生成合成发票 PDF 和标准答案"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfgen import canvas
+
+    font = "STSong-Light"
+    pdfmetrics.registerFont(UnicodeCIDFont(font))
+    rng = random.Random(seed)
+    truth = {}
+    os.makedirs(folder, exist_ok=True)
+    for i in range(count):
+        layout, lines, fields = synth_invoice(rng)
+        name = f"{i:04d}_{layout}.pdf"
+        c = canvas.Canvas(os.path.join(folder, name))
+        c.setFont(font, 10)
+        for row, line in enumerate(lines):
+            c.drawString(40, 800 - row * 16, line)
+        # 约五分之一带 1~3 页附件 (销货清单)，检验按页提前结束
+        for page in range(rng.choice((0, 0, 0, 0, rng.randint(1, 3)))):
+            c.showPage()
+            c.setFont(font, 10)
+            c.drawString(40, 800, f"销货清单 第 {page + 1} 页")
+            for row in range(40):
+                c.drawString(40, 780 - row * 16, f"*办公用品*附件商品{row} 个 {rng.randint(1, 50)} {rng.random() * 100:.2f}")
+        c.save()
+        truth[name] = {"版式": layout, **fields}
+    with open(os.path.join(folder, TRUTH_FILE), "w", encoding="utf-8") as f:
+        json.dump(truth, f, ensure_ascii=False, indent=1)
+    return truth
+
+
+def run_corpus(folder, truth, structured):
+    """逐个解析，返回 [(文件名, info, 错误, 各阶段耗时, 总耗时), ...]"""
+    results = []
+    for name in sorted(truth):
+        start = time.perf_counter()
+        info, error, timings = timed_extract_info(os.path.join(folder, name), structured)
+        results.append((name, info, error, timings, time.perf_counter() - start))
+    return results
+
+
+def report(results, truth):
+    n = len(results)
+    total = sum(r[4] for r in results)
+    text = sum(r[3].get("text", 0.0) for r in results)
+    match = sum(r[3].get("match", 0.0) for r in results)
+    pages = sum(r[3].get("pages", 0) for r in results)
+    print(f"发票 {n} 张，共提取 {pages} 页文本，平均每张 {total * 1000 / n:.1f} ms")
+    print(f"  pdfplumber 文本提取 {text * 1000 / n:8.2f} ms/张 ({text / total:6.1%})")
+    print(f"  字段识别             {match * 1000 / n:8.2f} ms/张 ({match / total:6.1%})")
+    other = total - text - match
+    print(f"  打开文件及其他       {other * 1000 / n:8.2f} ms/张 ({other / total:6.1%})")
+
+    # 逐字段准确率，也按版式统计整张全对的比例
+    correct = {field: 0 for field in FIELDS}
+    by_layout = {}
+    errors = []
+    for name, info, error, _, _ in results:
+        expected = truth[name]
+        layout = expected.get("版式", "")
+        ok_all = error is None
+        for field in FIELDS:
+            if field not in expected:
+                correct[field] += 1
+                continue
+            if info[field] == expected[field]:
+                correct[field] += 1
+            else:
+                ok_all = False
+                errors.append(f"  {name} {field}: 期望={expected[field]!r} 实际={info[field]!r}")
+        stats = by_layout.setdefault(layout, [0, 0])
+        stats[0] += ok_all
+        stats[1] += 1
+    print("字段准确率:")
+    for field in FIELDS:
+        print(f"  {field:<8} {correct[field] / n:7.1%}")
+    for layout, (ok, count) in sorted(by_layout.items()):
+        print(f"  [{layout or '未标注'}] 整张全对 {ok}/{count}")
+    for line in errors[:10]:
+        print(line)
+    if len(errors) > 10:
+        print(f"  ... 另有 {len(errors) - 10} 处不一致")
+    return not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="发票解析基准语料与性能剖析")
+    parser.add_argument("--dir", help="语料目录；不存在 truth.json 时在此生成语料，默认用临时目录")
+    parser.add_argument("--count", type=int, default=60, help="生成的发票张数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-structured", action="store_true", help="不读取 PDF 内嵌数据 (与界面选项对应)")
+    parser.add_argument("--profile", metavar="FILE", help="用 cProfile 运行并把统计数据写入 FILE")
+    parser.add_argument("--top", type=int, default=25, help="打印的热点函数个数")
+    args = parser.parse_args()
+
+    folder = args.dir or tempfile.mkdtemp(prefix="fapiao_bench_")
+    try:
+        truth_path = os.path.join(folder, TRUTH_FILE)
+        if os.path.exists(truth_path):
+            with open(truth_path, "r", encoding="utf-8") as f:
+                truth = json.load(f)
+            print(f"使用现有语料: {folder}")
+        else:
+            start = time.perf_counter()
+            truth = make_corpus(folder, args.count, args.seed)
+            print(f"生成 {len(truth)} 张合成发票: {folder} ({time.perf_counter() - start:.1f} s)")
+
+        structured = not args.no_structured
+        fe.default_extractor()  # 规则编译不计入第一张发票
+        if args.profile:
+            profiler = cProfile.Profile()
+            results = profiler.runcall(run_corpus, folder, truth, structured)
+            profiler.dump_stats(args.profile)
+            print(f"cProfile 数据已写入 {args.profile} (可用 snakeviz 等工具查看)，累计耗时前 {args.top} 的函数:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+        else:
+            results = run_corpus(folder, truth, structured)
+        return 0 if report(results, truth) else 1
+    finally:
+        if not args.dir:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+LVGL 字库 Python 后端基准与对照
+
+用法:
+    python benchmarks/bench_lvgl_font.py --ttf 字体.ttf                 # 默认 3000 个常用汉字 + ASCII，16px 4bpp
+    python benchmarks/bench_lvgl_font.py --ttf 字体.ttf --size 24 --bpp 2 -j 8
+    python benchmarks/bench_lvgl_font.py --ttf 字体.ttf --symbols 确认取消设置
+
+测试 lvgl_font_native 单进程与多进程栅格化的耗时，并把生成的 C 文件解析回来做自检。
+本地装有 lv_font_conv 时，再用相同参数 (--no-compress --no-kerning) 生成一份，
+对比字形集合、行高/基线、度量 (adv_w/box/ofs) 和逐像素差异，任何不一致都以退出码 1 报告。
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lvgl_font_native as lfn  # noqa: E402
+import lvgl_font_tool as lft  # noqa: E402
+
+ASCII = "".join(chr(c) for c in range(0x20, 0x7F))
+
+
+def default_symbols(count):
+    """ASCII 加上 CJK 统一汉字区开头的 count 个字 (字体里没有的会记为缺字)"""
+    return ASCII + "".join(chr(0x4E00 + i) for i in range(count))
+
+
+def timed_generate(ttf, size, bpp, symbols, out_path, workers):
+    start = time.perf_counter()
+    stats = lfn.generate_font(ttf, size, bpp, symbols, out_path, workers)
+    return stats, time.perf_counter() - start
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return lfn.parse_font_c(f.read())
+
+
+def compare(native, reference):
+    """对比两份解析结果，返回 (是否一致, 度量不一致数, 像素差异统计, 说明行)"""
+    lines = []
+    only_native = sorted(set(native["glyphs"]) - set(reference["glyphs"]))
+    only_ref = sorted(set(reference["glyphs"]) - set(native["glyphs"]))
+    same = not only_native and not only_ref
+    if not same:
+        lines.append(f"  字形集合不同: 仅 Python 后端 {lft.describe_codepoints(only_native)}，"
+                     f"仅 lv_font_conv {lft.describe_codepoints(only_ref)}")
+    for key in ("line_height", "base_line"):
+        if native[key] != reference[key]:
+            same = False
+            lines.append(f"  {key}: Python 后端 {native[key]}，lv_font_conv {reference[key]}")
+
+    metric_diff = 0
+    pixels = diff_pixels = max_delta = 0
+    for cp in sorted(set(native["glyphs"]) & set(reference["glyphs"])):
+        a, b = native["glyphs"][cp], reference["glyphs"][cp]
+        if a[:5] != b[:5]:
+            metric_diff += 1
+            if metric_diff <= 5:
+                lines.append(f"  U+{cp:04X} 度量不同: Python 后端 {a[:5]}，lv_font_conv {b[:5]}")
+            continue
+        if a[5] is None or b[5] is None:
+            continue
+        pixels += len(a[5])
+        for x, y in zip(a[5], b[5]):
+            if x != y:
+                diff_pixels += 1
+                max_delta = max(max_delta, abs(x - y))
+    same = same and metric_diff == 0 and diff_pixels == 0
+    return same, metric_diff, (pixels, diff_pixels, max_delta), lines
+
+
+def run_lv_font_conv(ttf, size, bpp, symbols, out_path):
+    job = lft.font_job(ttf, size, bpp, symbols, out_path, ["--no-compress", "--no-kerning"])
+    start = time.perf_counter()
+    proc, _, _ = lft.run_lv_font_conv(job)
+    if proc.returncode != 0:
+        raise OSError(proc.stderr or proc.stdout)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ttf", required=True, help="TTF/OTF 字体文件")
+    parser.add_argument("--size", type=int, default=16)
+    parser.add_argument("--bpp", type=int, default=4, choices=lfn.SUPPORTED_BPP)
+    parser.add_argument("--count", type=int, default=3000, help="未指定 --symbols 时附加的汉字个数")
+    parser.add_argument("--symbols", help="要生成的字符")
+    parser.add_argument("-j", "--workers", type=int, default=lfn.NATIVE_WORKERS, help="栅格化进程数")
+    args = parser.parse_args()
+
+    symbols = lft.canonical_symbols(args.symbols or default_symbols(args.count))
+    tmp = tempfile.mkdtemp(prefix="lvgl_font_bench_")
+    try:
+        serial_path = os.path.join(tmp, "font_serial.c")
+        parallel_path = os.path.join(tmp, "font_parallel.c")
+        stats, serial = timed_generate(args.ttf, args.size, args.bpp, symbols, serial_path, 1)
+        _, parallel = timed_generate(args.ttf, args.size, args.bpp, symbols, parallel_path, args.workers)
+        print(f"输入: {len(symbols)} 个字符，{os.path.basename(args.ttf)} {args.size}px {args.bpp}bpp")
+        print(f"  字形 {stats['glyphs']} 个，缺字 {len(stats['missing'])} 个，位图 {stats['bitmap_bytes']} 字节，"
+              f"cmap {stats['cmaps']}")
+        print(f"  Python 后端 单进程 : {serial:8.3f} s  ({serial * 1000 / max(1, stats['glyphs']):.2f} ms/字)")
+        print(f"  Python 后端 {args.workers} 进程 : {parallel:8.3f} s  (x{serial / parallel:.1f})")
+
+        native = load(serial_path)
+        ok = native["glyphs"] == load(parallel_path)["glyphs"]
+        print("  单进程与多进程输出一致" if ok else "  !!! 单进程与多进程输出不一致")
+        if len(native["glyphs"]) != stats["glyphs"]:
+            print(f"  !!! 解析回来的字形数 {len(native['glyphs'])} 与生成时 {stats['glyphs']} 不符")
+            ok = False
+
+        # find_lv_font_conv 找不到本地安装时会退回 npx (需要联网下载)，这里只对照真正装好的版本
+        launcher = lft.find_lv_font_conv()
+        if not shutil.which("node") or not launcher["cmd"][-1].endswith("lv_font_conv.js"):
+            print("  未找到本地安装的 lv_font_conv (需要 Node.js 和 npm install -g lv_font_conv)，跳过与官方工具的对照")
+            return 0 if ok else 1
+
+        ref_path = os.path.join(tmp, "font_ref.c")
+        try:
+            elapsed = run_lv_font_conv(args.ttf, args.size, args.bpp, symbols, ref_path)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"  lv_font_conv 运行失败: {e}")
+            return 1
+        print(f"  lv_font_conv        : {elapsed:8.3f} s  (Python 单进程 x{elapsed / serial:.1f})")
+        same, metric_diff, (pixels, diff_pixels, max_delta), lines = compare(native, load(ref_path))
+        for line in lines:
+            print(line)
+        print(f"  度量不一致 {metric_diff} 个字形；度量一致的字形中像素差异 {diff_pixels}/{pixels} "
+              f"({diff_pixels / max(1, pixels):.2%})，最大灰度差 {max_delta}")
+        print("  与 lv_font_conv 输出一致" if same else "  !!! 与 lv_font_conv 输出不一致")
+        return 0 if ok and same else 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+LVGL 字体助手源码扫描基准
+
+用法:
+    python benchmarks/bench_lvgl_scan.py                 # 生成临时源码树 (默认 5000 个文件)
+    python benchmarks/bench_lvgl_scan.py --files 20000
+    python benchmarks/bench_lvgl_scan.py --dir 固件工程目录
+
+对比旧实现 (os.walk + 逐字符 ord(char) > 127) 与当前的字节级正则 + 线程池扫描，
+并校验两者提取到的字符集合一致 (对比时不使用忽略规则)。
+另外测试只提取字符串常量的模式，以及修改一个文件后借助缓存重新扫描的耗时。
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lvgl_font_tool as lft  # noqa: E402
+
+HANZI = "确认取消设置返回温度湿度电量连接断开成功失败警告错误开始停止保存删除时间日期音量亮度"
+
+
+def legacy_scan(path):
+    """改造前的实现，仅作为对照基准"""
+    chars = set()
+    files = [path] if os.path.isfile(path) else []
+    if not files:
+        for r, d, fs in os.walk(path):
+            for f in fs:
+                if f.endswith(('.c', '.h', '.cpp', '.hpp')):
+                    files.append(os.path.join(r, f))
+    for f_path in files:
+        try:
+            with open(f_path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+                for char in content:
+                    if ord(char) > 127:
+                        chars.add(char)
+        except Exception:
+            continue
+    return chars
+
+
+def make_tree(folder, count, seed):
+    """生成模拟固件工程：大部分是纯 ASCII 代码，少数文件含中文字符串和注释"""
+    rng = random.Random(seed)
+    body = "".join(f"static int func_{i}(int a, int b)\n{{\n    return a * {i} + b;\n}}\n" for i in range(60))
+    for i in range(count):
+        sub = os.path.join(folder, "build" if i % 10 == 0 else f"module_{i % 37}")
+        os.makedirs(sub, exist_ok=True)
+        lines = [f"/* file {i} */", "#include <stdint.h>", body]
+        if rng.random() < 0.2:
+            words = "".join(rng.sample(HANZI, 6))
+            lines.append(f"// 注释：{words[:3]}")
+            lines.append(f'static const char *label_{i} = "{words}";')
+        ext = rng.choice((".c", ".h"))
+        with open(os.path.join(sub, f"file_{i}{ext}"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", help="扫描已有的源码目录")
+    parser.add_argument("--files", type=int, default=5000, help="未指定 --dir 时生成的文件数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-j", "--workers", type=int, default=lft.SCAN_WORKERS, help="扫描线程数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.dir
+        if not folder:
+            folder = tmp
+            make_tree(folder, args.files, args.seed)
+
+        old, legacy_elapsed = timed(legacy_scan, folder)
+        files = lft.collect_source_files(folder)
+        (per_file, stats), elapsed = timed(lft.scan_sources, files, args.workers)
+        new = set().union(*per_file.values())
+        size_mb = sum(os.path.getsize(p) for p in files) / (1024 * 1024)
+        print(f"输入: {len(files)} 个文件, {size_mb:.1f} MB")
+        print(f"  legacy        : {legacy_elapsed:8.3f} s")
+        print(f"  scan_sources  : {elapsed:8.3f} s  (x{legacy_elapsed / elapsed:.1f}, {args.workers} 线程)")
+        print("  字符集合一致" if old == new else f"  !!! 字符集合不一致: 旧 {len(old)} 个, 新 {len(new)} 个")
+
+        # 字符串常量模式 + 缓存：首次全量，再模拟改动一个文件后重扫 (缓存写到临时目录，不碰源码树)
+        cache_path = os.path.join(tmp, lft.GLYPH_CACHE_NAME)
+        cache = lft.GlyphCache(folder, True, cache_path)
+        (literal, _), cold = timed(lft.scan_sources, files, args.workers, None, True, cache)
+        literal_chars = set().union(*literal.values())
+        print(f"  字符串常量模式: {cold:8.3f} s  {len(literal_chars)} 个字符 (全部非ASCII {len(new)} 个)")
+        cache = lft.GlyphCache(folder, True, cache_path)
+        cache.entries.pop(cache.key(files[0]), None)
+        (_, stats), warm = timed(lft.scan_sources, files, args.workers, None, True, cache)
+        print(f"  改动 1 个文件后重扫: {warm:8.3f} s  (重新读取 {stats['scanned']}，缓存 {stats['cached']})")
+
+        ignore = lft.parse_ignore_patterns(lft.DEFAULT_IGNORE)
+        kept = lft.collect_source_files(folder, ignore)
+        print(f"  默认忽略规则下剩余 {len(kept)} 个文件")
+        return 0 if old == new and not stats["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
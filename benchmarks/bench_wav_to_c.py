@@ -0,0 +1,201 @@
+"""
+WAV <-> C 数组 转换性能基准与往返校验
+
+用法:
+    python benchmarks/bench_wav_to_c.py              # 生成临时测试 WAV (默认 8 MB)
+    python benchmarks/bench_wav_to_c.py --size-mb 50
+    python benchmarks/bench_wav_to_c.py --dir 某个WAV目录
+    python benchmarks/bench_wav_to_c.py --roundtrip  # 只跑往返一致性校验
+
+对比旧实现 (逐字节 f-string / regex findall + int()) 与当前的流式实现，
+输出 MB/s，并校验 WAV -> C -> WAV 逐字节一致。
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wav_to_c_array as w2c  # noqa: E402
+
+
+def legacy_wav_to_c_array(input_path, var_prefix="pcm_data"):
+    """改造前的实现，仅作为对照基准"""
+    with open(input_path, "rb") as f:
+        data = f.read()
+    hex_list = [f"0x{b:02x}" for b in data]
+    rows = [", ".join(hex_list[i:i+12]) for i in range(0, len(hex_list), 12)]
+    hex_body = ",\n    ".join(rows)
+    base_name = os.path.splitext(os.path.basename(input_path))[0]
+    safe_name = re.sub(r"[^a-zA-Z0-9_]", "_", base_name)
+    var_name = f"{var_prefix}_{safe_name}"
+    array_lines = [
+        f"// Original File: {os.path.basename(input_path)}",
+        f"const unsigned char {var_name}[] = {{",
+        f"    {hex_body}",
+        "};",
+        f"const unsigned int {var_name}_len = {len(data)};",
+        ""
+    ]
+    return "\n".join(array_lines)
+
+
+def legacy_write_c_file(out_path, wav_paths):
+    all_content = ["// Auto-generated audio data", "#include <stdint.h>\n"]
+    for path in wav_paths:
+        all_content.append(legacy_wav_to_c_array(path))
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(all_content))
+
+
+def legacy_c_array_to_wav(c_file_path, output_dir):
+    """改造前的解析实现，仅作为对照基准"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    with open(c_file_path, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+    pattern = re.compile(
+        r"//\s*Original\s*File:\s*(?P<filename>.*?)\s*\n"
+        r"const\s+unsigned\s+char\s+\w+\[\]\s*=\s*\{(?P<data>.*?)\};",
+        re.DOTALL
+    )
+    count = 0
+    for match in pattern.finditer(content):
+        filename = match.group("filename").strip()
+        hex_values = re.findall(r"0x[0-9a-fA-F]{2}", match.group("data"))
+        with open(os.path.join(output_dir, filename), "wb") as f:
+            f.write(bytes([int(h, 16) for h in hex_values]))
+        count += 1
+    return count
+
+
+def same_file(a, b):
+    with open(a, "rb") as fa, open(b, "rb") as fb:
+        return fa.read() == fb.read()
+
+
+def check_roundtrip(tmp):
+    """边界场景往返校验：空文件、行/块边界、特殊文件名、手工编辑过的数组"""
+    src = os.path.join(tmp, "rt_src")
+    os.makedirs(src)
+    sizes = [0, 1, 11, 12, 13, 44, w2c.CHUNK_SIZE - 1, w2c.CHUNK_SIZE, w2c.CHUNK_SIZE + 1,
+             w2c.PARSE_SLICE_SIZE + 7]
+    names = []
+    for i, size in enumerate(sizes):
+        name = f"rt {i}-提示音.wav" if i % 2 else f"rt_{i}.WAV"
+        with open(os.path.join(src, name), "wb") as f:
+            f.write(os.urandom(size))
+        names.append(name)
+
+    failures = 0
+    c_path = os.path.join(tmp, "rt.c")
+    w2c.write_c_file(c_path, [os.path.join(src, n) for n in names])
+    for label, parser in (("streaming", w2c.c_array_to_wav), ("legacy", legacy_c_array_to_wav)):
+        out = os.path.join(tmp, f"rt_{label}")
+        count = parser(c_path, out)
+        bad = [n for n in names if not same_file(os.path.join(src, n), os.path.join(out, n))]
+        failures += len(bad) + (count != len(names))
+        print(f"  round-trip {label:9s}: {count}/{len(names)} 个文件, 不一致 {len(bad)}")
+
+    # 手工编辑过的数组 (大写 0X、注释、缺逗号) 必须与旧解析器结果一致
+    edited = os.path.join(tmp, "edited.c")
+    with open(edited, "w", encoding="utf-8") as f:
+        f.write("// Original File: edited.wav\n"
+                "const unsigned char pcm_data_edited[] = {\n"
+                "    0x52, 0X49, /* 0x46, skip? */ 0x1, 0x234,\n    0x0a0x0b , 0xff\n};\n")
+    for label, parser in (("streaming", w2c.c_array_to_wav), ("legacy", legacy_c_array_to_wav)):
+        parser(edited, os.path.join(tmp, f"ed_{label}"))
+    same = same_file(os.path.join(tmp, "ed_streaming", "edited.wav"), os.path.join(tmp, "ed_legacy", "edited.wav"))
+    failures += not same
+    print(f"  edited array        : {'一致' if same else '不一致'}")
+    return failures
+
+
+def make_wav(path, size_bytes, rate=16000):
+    frames = max(0, (size_bytes - 44) // 2)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        remaining = frames
+        while remaining:
+            n = min(remaining, 1 << 18)
+            wf.writeframes(os.urandom(n * 2))
+            remaining -= n
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", help="使用该目录下已有的 WAV 文件")
+    parser.add_argument("--size-mb", type=float, default=8.0, help="未指定 --dir 时生成的测试数据总量")
+    parser.add_argument("--files", type=int, default=4, help="未指定 --dir 时生成的文件数")
+    parser.add_argument("--skip-legacy", action="store_true", help="只测当前实现 (数据量很大时旧实现会非常慢)")
+    parser.add_argument("--roundtrip", action="store_true", help="只运行往返一致性校验")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("往返校验:")
+        if check_roundtrip(tmp):
+            sys.exit(1)
+        if args.roundtrip:
+            return
+
+        if args.dir:
+            wav_paths = sorted(os.path.join(args.dir, f) for f in os.listdir(args.dir) if f.lower().endswith(".wav"))
+        else:
+            per_file = int(args.size_mb * 1024 * 1024 / max(1, args.files))
+            wav_paths = []
+            for i in range(args.files):
+                path = os.path.join(tmp, f"sample_{i}.wav")
+                make_wav(path, per_file)
+                wav_paths.append(path)
+
+        total_mb = sum(os.path.getsize(p) for p in wav_paths) / (1024 * 1024)
+        print(f"输入: {len(wav_paths)} 个文件, {total_mb:.2f} MB")
+
+        print("WAV -> C:")
+        new_out = os.path.join(tmp, "new.c")
+        elapsed = timed(w2c.write_c_file, new_out, wav_paths)
+        print(f"  streaming : {elapsed:8.3f} s  {total_mb / elapsed:8.2f} MB/s")
+
+        if not args.skip_legacy:
+            old_out = os.path.join(tmp, "old.c")
+            legacy_elapsed = timed(legacy_write_c_file, old_out, wav_paths)
+            print(f"  legacy    : {legacy_elapsed:8.3f} s  {total_mb / legacy_elapsed:8.2f} MB/s"
+                  f"  (x{legacy_elapsed / elapsed:.1f})")
+            same = same_file(new_out, old_out)
+            print("  输出一致" if same else "  !!! 输出不一致")
+            if not same:
+                sys.exit(1)
+
+        print("C -> WAV:")
+        restored = os.path.join(tmp, "restored")
+        elapsed = timed(w2c.c_array_to_wav, new_out, restored)
+        print(f"  streaming : {elapsed:8.3f} s  {total_mb / elapsed:8.2f} MB/s")
+        if not args.skip_legacy:
+            legacy_restored = os.path.join(tmp, "legacy_restored")
+            legacy_elapsed = timed(legacy_c_array_to_wav, new_out, legacy_restored)
+            print(f"  legacy    : {legacy_elapsed:8.3f} s  {total_mb / legacy_elapsed:8.2f} MB/s"
+                  f"  (x{legacy_elapsed / elapsed:.1f})")
+            shutil.rmtree(legacy_restored)
+        bad = [p for p in wav_paths
+               if not same_file(p, os.path.join(restored, os.path.basename(p)))]
+        print("  往返一致" if not bad else f"  !!! {len(bad)} 个文件往返不一致")
+        if bad:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,30 @@
 """
 发票自动查重工具 (带UI版)
+
+解析与查重逻辑在 fapiao_engine.py 中，命令行用法见该文件。
 """
 
+import multiprocessing
 import os
-import re
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
-import pandas as pd
-import pdfplumber
+from fapiao_engine import (
+    DEFAULT_WORKERS, INDEX_PATH, REPORT_FORMATS, StreamingReport, collect_invoice_files, new_info,
+    report_path, scan_invoices, watch_invoices, write_sorted_report,
+)
+from log_sink import LogSink
 
 
 class InvoiceDeduplicatorApp:
     def __init__(self, root):
         self.root = root
         self.root.title("发票自动查重工具")
-        self.root.geometry("650x450")
+        self.root.geometry("700x480")
         self.root.minsize(550, 400)
 
+        self.watch_stop = None  # 监视模式运行时为 threading.Event
         self.setup_ui()
 
     def setup_ui(self):
@@ -33,6 +39,28 @@ class InvoiceDeduplicatorApp:
         
         ttk.Button(frame_top, text="浏览...", command=self.browse_dir).pack(side=tk.LEFT, padx=5)
 
+        # --- 选项 ---
+        frame_opts = ttk.Frame(self.root)
+        frame_opts.pack(fill=tk.X, padx=10, pady=(0, 10))
+
+        ttk.Label(frame_opts, text="进程数:").pack(side=tk.LEFT)
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        ttk.Spinbox(frame_opts, from_=1, to=64, textvariable=self.workers_var, width=4).pack(side=tk.LEFT, padx=(2, 10))
+
+        self.rebuild_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame_opts, text="重建缓存", variable=self.rebuild_cache_var).pack(side=tk.LEFT, padx=(0, 10))
+
+        self.structured_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame_opts, text="读取OFD/XML", variable=self.structured_var).pack(side=tk.LEFT, padx=(0, 10))
+
+        self.use_index_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frame_opts, text="跨目录查重", variable=self.use_index_var).pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Label(frame_opts, text="报表:").pack(side=tk.LEFT)
+        self.report_format_var = tk.StringVar(value=next(iter(REPORT_FORMATS)))
+        ttk.Combobox(frame_opts, textvariable=self.report_format_var, values=list(REPORT_FORMATS),
+                     state="readonly", width=12).pack(side=tk.LEFT, padx=(2, 10))
+
         # --- 中部：进度条和按钮 ---
         frame_mid = ttk.Frame(self.root)
         frame_mid.pack(fill=tk.X, padx=10, pady=(0, 10))
@@ -40,6 +68,9 @@ class InvoiceDeduplicatorApp:
         self.start_btn = ttk.Button(frame_mid, text="开始扫描与查重", command=self.start_processing)
         self.start_btn.pack(side=tk.LEFT, padx=(0, 10))
 
+        self.watch_btn = ttk.Button(frame_mid, text="监视目录", command=self.toggle_watch)
+        self.watch_btn.pack(side=tk.LEFT, padx=(0, 10))
+
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(frame_mid, variable=self.progress_var, maximum=100)
         self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
@@ -50,142 +81,155 @@ class InvoiceDeduplicatorApp:
         
         self.log_text = scrolledtext.ScrolledText(log_frame, state='disabled', font=("Consolas", 9))
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.log_sink = LogSink(self.root, self.log_text)
 
     def log(self, message):
-        """向日志窗口输出信息"""
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state='disabled')
-        # 如果在主线程调用可以不加 update，但如果是子线程调用，Tkinter 本身不是线程安全的
-        # 为简单起见，这里直接插入。严谨的做法是用 root.after
+        """向日志窗口输出信息 (任意线程可调用，主线程定时批量刷新)"""
+        self.log_sink.write(message)
 
     def clear_log(self):
-        self.log_text.config(state='normal')
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.config(state='disabled')
+        self.log_sink.clear()
 
     def browse_dir(self):
         selected_dir = filedialog.askdirectory(title="选择包含PDF发票的目录")
         if selected_dir:
             self.dir_var.set(selected_dir)
 
-    def extract_info(self, pdf_path):
-        """核心解析逻辑"""
-        info = {
-            "文件名": os.path.basename(pdf_path),
-            "发票代码": "",
-            "发票号码": "",
-            "开票日期": "",
-            "金额": "",
-            "购买方名称": "",
-            "购买方税号": "",
-            "销售方税号": "" # 修复：提前初始化该字段
-        }
+    def read_options(self):
+        """校验界面输入，返回 (目录, 进程数) 或 None"""
+        folder = self.dir_var.get().strip()
+        if not folder or not os.path.isdir(folder):
+            messagebox.showerror("错误", "请选择有效的发票目录！")
+            return None
 
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    t = page.extract_text()
-                    if t:
-                        text += t
-
-            # 发票代码
-            code = re.search(r'发票代码[:：]?\s*(\d{10,12})', text)
-            if code:
-                info["发票代码"] = code.group(1)
-
-            # 发票号码
-            number = re.search(r'发票号码[:：]?\s*(\d{8,20})', text)
-            if not number:
-                number = re.search(r'(\b\d{20}\b)', text)
-            if number:
-                info["发票号码"] = number.group(1)
-
-            # 日期
-            date = re.search(r'(\d{4}年\d{2}月\d{2}日)', text)
-            if date:
-                info["开票日期"] = date.group(1)
-
-            # 金额
-            amount = re.search(r'价税合计.*?([0-9]+\.[0-9]{2})', text)
-            if amount:
-                info["金额"] = amount.group(1)
-
-            # 购买方、销售方识别 (找18位信用代码)
-            tax_ids = re.findall(r'\b[0-9A-Z]{18}\b', text)
-            if len(tax_ids) >= 2:
-                info["购买方税号"] = tax_ids[0]
-                info["销售方税号"] = tax_ids[1]
-
-        except Exception as e:
-            self.root.after(0, self.log, f"读取失败: {os.path.basename(pdf_path)} - {str(e)}")
-
-        return info
+            workers = max(1, int(self.workers_var.get()))
+        except ValueError:
+            messagebox.showerror("错误", "进程数必须是正整数！")
+            return None
+        return folder, workers
 
     def start_processing(self):
         """启动后台线程处理数据"""
-        folder = self.dir_var.get().strip()
-        if not folder or not os.path.isdir(folder):
-            messagebox.showerror("错误", "请选择有效的发票目录！")
+        options = self.read_options()
+        if options is None:
             return
+        folder, workers = options
 
         self.start_btn.config(state='disabled')
+        self.watch_btn.config(state='disabled')
         self.clear_log()
         self.progress_var.set(0)
         
         # 启动后台线程，避免阻塞主UI
-        thread = threading.Thread(target=self.process_invoices, args=(folder,))
+        rebuild = self.rebuild_cache_var.get()
+        structured = self.structured_var.get()
+        index_path = INDEX_PATH if self.use_index_var.get() else None
+        report_format = REPORT_FORMATS[self.report_format_var.get()]
+        thread = threading.Thread(target=self.process_invoices,
+                                  args=(folder, workers, rebuild, structured, index_path, report_format))
         thread.daemon = True
         thread.start()
 
-    def process_invoices(self, folder):
+    def toggle_watch(self):
+        """开始/停止监视目录"""
+        if self.watch_stop is not None:
+            self.watch_stop.set()
+            self.watch_btn.config(text="正在停止...", state='disabled')
+            return
+
+        options = self.read_options()
+        if options is None:
+            return
+        folder, workers = options
+
+        self.watch_stop = threading.Event()
+        self.start_btn.config(state='disabled')
+        self.watch_btn.config(text="停止监视")
+        self.clear_log()
+        self.progress_var.set(0)
+
+        structured = self.structured_var.get()
+        index_path = INDEX_PATH if self.use_index_var.get() else None
+        thread = threading.Thread(target=self.watch_folder,
+                                  args=(folder, workers, structured, index_path, self.watch_stop))
+        thread.daemon = True
+        thread.start()
+
+    def watch_folder(self, folder, workers, structured, index_path, stop_event):
+        """监视模式：新文件解析后立即查重并追加到 CSV 报表 (xlsx 无法增量追加)"""
+        report = None
         try:
-            pdf_files = [f for f in os.listdir(folder) if f.lower().endswith(".pdf")]
-            total_files = len(pdf_files)
+            out_file = report_path(folder, "csv")
+            columns = list(new_info("")) + (["首次出现位置", "疑似重复"] if index_path else [])
+            report = StreamingReport(out_file, columns)
+            self.log(f"监视模式的结果逐行追加到:\n{out_file}")
+            watch_invoices(folder, stop_event, report.write, workers, structured, index_path,
+                           log=self.log,
+                           after_batch=report.flush)
+        except Exception as e:
+            self.log(f"\n❌ 发生严重错误: {str(e)}")
+        finally:
+            if report is not None:
+                report.close()
+                self.log(f"已停止监视，共写出 {report.rows} 行，其中重复 {report.duplicates} 张")
+            self.root.after(0, self.watch_stopped)
+
+    def watch_stopped(self):
+        self.watch_stop = None
+        self.watch_btn.config(text="监视目录", state='normal')
+        self.start_btn.config(state='normal')
+
+    def process_invoices(self, folder, workers=DEFAULT_WORKERS, rebuild_cache=False, structured=True,
+                         index_path=None, report_format="xlsx"):
+        report = None
+        try:
+            paths = collect_invoice_files([folder], structured)
+            total_files = len(paths)
 
             if total_files == 0:
-                self.root.after(0, self.log, "⚠️ 该目录下没有找到 PDF 文件！")
+                self.log("⚠️ 该目录下没有找到发票文件！")
                 self.root.after(0, lambda: self.start_btn.config(state='normal'))
                 return
 
-            self.root.after(0, self.log, f"找到 {total_files} 个 PDF 文件，开始解析...")
-            result = []
-
-            for i, file in enumerate(pdf_files):
-                path = os.path.join(folder, file)
-                self.root.after(0, self.log, f"正在解析: {file}")
-                
-                info = self.extract_info(path)
-                result.append(info)
+            out_file = report_path(folder, report_format)
+            if report_format != "xlsx":
+                columns = list(new_info("")) + (["首次出现位置", "疑似重复"] if index_path else [])
+                report = StreamingReport(out_file, columns)
 
+            def progress(done, total, path):
                 # 更新进度条
-                progress = ((i + 1) / total_files) * 100
-                self.root.after(0, self.progress_var.set, progress)
-
-            self.root.after(0, self.log, "\n解析完成，正在进行查重和导出 Excel...")
-
-            # 转换为 DataFrame 并查重
-            df = pd.DataFrame(result)
-            df["是否重复"] = df.duplicated(subset=["发票代码", "发票号码"], keep=False)
-            df.sort_values(by=["是否重复", "发票代码"], ascending=False, inplace=True)
-
-            # 输出 Excel
-            out_file = os.path.join(folder, "发票查重结果.xlsx")
-            df.to_excel(out_file, index=False)
-
-            self.root.after(0, self.log, f"✔ 成功！结果已保存至:\n{out_file}")
-            self.root.after(0, messagebox.showinfo, "完成", f"处理完成！\n共处理 {total_files} 张发票。\n结果保存在目录下的 '发票查重结果.xlsx'")
+                self.root.after(0, self.progress_var.set, (done / total) * 100)
+
+            result = scan_invoices(
+                paths, workers, structured, rebuild_cache=rebuild_cache, index_path=index_path,
+                on_row=report.write if report else None, progress=progress,
+                log=self.log,
+            )
+
+            if report is not None:
+                report.close()
+                self.log(f"\n解析完成，共写出 {report.rows} 行，其中重复 {report.duplicates} 张")
+                report = None
+            else:
+                self.log("\n解析完成，正在进行查重和导出 Excel...")
+                write_sorted_report(result, out_file)
+
+            report_name = os.path.basename(out_file)
+            self.log(f"✔ 成功！结果已保存至:\n{out_file}")
+            self.root.after(0, messagebox.showinfo, "完成", f"处理完成！\n共处理 {total_files} 张发票。\n结果保存在目录下的 '{report_name}'")
 
         except Exception as e:
-            self.root.after(0, self.log, f"\n❌ 发生严重错误: {str(e)}")
+            self.log(f"\n❌ 发生严重错误: {str(e)}")
             self.root.after(0, messagebox.showerror, "错误", f"发生错误:\n{str(e)}")
         finally:
-            self.root.after(0, lambda: self.start_btn.config(state='normal'))
-
+            if report is not None:
+                report.close()
+            self.root.after(0, lambda: (self.start_btn.config(state='normal'), self.watch_btn.config(state='normal')))
 
 if __name__ == "__main__":
+    # 打包成 exe 时子进程需要
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = InvoiceDeduplicatorApp(root)
     root.mainloop()
\ No newline at end of file
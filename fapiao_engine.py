@@ -0,0 +1,1049 @@
+"""
+发票解析与查重引擎 (无界面依赖，可被其他脚本导入，也可直接作为命令行使用)
+
+用法:
+    python fapiao_engine.py 发票/2024-01 发票/2024-02 -o 结果.jsonl
+    python fapiao_engine.py "扫描件/**/*.pdf" -j 8 -o 发票查重结果.xlsx --sorted
+    python fapiao_engine.py 发票目录 --index            # 同时登记到跨目录发票索引
+    python fapiao_engine.py 共享发票目录 --watch -o 发票查重结果.csv   # 监视目录，新发票到达即解析
+
+pdfplumber / pandas / openpyxl 以及进程池只在真正用到时才导入，导入本模块本身很快。
+"""
+
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+# ================= 字段解析 =================
+DEFAULT_WORKERS = os.cpu_count() or 1
+# 每个进程同时排队的任务数，限制在途任务数量，避免几千个 future 一次性提交
+TASKS_PER_WORKER = 4
+
+INVOICE_EXTENSIONS = (".pdf",)
+STRUCTURED_EXTENSIONS = (".ofd", ".xml")
+
+# 结构化数据 (OFD 标签 / 电子发票 XML / PDF 附件与 XMP) 中各字段可能的标签名，不区分大小写
+FIELD_TAGS = {
+    "发票代码": ("InvoiceCode", "Fpdm"),
+    "发票号码": ("InvoiceNo", "InvoiceNumber", "EInvoiceNumber", "Fphm"),
+    "开票日期": ("IssueDate", "IssueTime", "InvoiceDate", "Kprq"),
+    "金额": ("TotalTax-includedAmount", "TotalTaxIncludedAmount", "TaxInclusiveTotalAmount", "Jshj"),
+    "购买方名称": ("BuyerName", "Gmfmc"),
+    "购买方税号": ("BuyerTaxID", "BuyerIdNum", "BuyerTaxNo", "Gmfnsrsbh"),
+    "销售方税号": ("SellerTaxID", "SellerIdNum", "SellerTaxNo", "Xsfnsrsbh"),
+}
+TAG_FIELDS = {tag.lower(): field for field, tags in FIELD_TAGS.items() for tag in tags}
+REQUIRED_FIELDS = ("发票号码", "开票日期", "金额", "购买方税号", "销售方税号")
+
+
+def new_info(path):
+    return {
+        "文件名": os.path.basename(path),
+        "发票代码": "",
+        "发票号码": "",
+        "开票日期": "",
+        "金额": "",
+        "购买方名称": "",
+        "购买方税号": "",
+        "销售方税号": "" # 修复：提前初始化该字段
+    }
+
+
+def missing_fields(info):
+    """返回尚未识别的必需字段；20 位号码的全电发票没有发票代码"""
+    missing = [f for f in REQUIRED_FIELDS if not info[f]]
+    if not info["发票代码"] and len(info["发票号码"]) != 20:
+        missing.append("发票代码")
+    return missing
+
+
+# ================= 字段识别规则 =================
+# 每个版式是一组 (字段, 正则)，值放在命名分组 (?P<value>...) 中。
+# 规则在加载时统一预编译；同一字段按版式顺序尝试，第一个命中的规则生效，其余规则不再扫描。
+# "税号" 是特殊字段：收集所有匹配，依次作为购买方、销售方税号 (未被带标签规则占用时)。
+# 注: 开头的 \b 会让 re 无法按首字符快速跳过，税号和 20 位号码的边界改用前后断言表达，含义与 \b...\b 相同。
+INVOICE_LAYOUTS = {
+    "增值税发票": [
+        ("发票代码", r'发票代码[:：]?\s*(?P<value>\d{10,12})'),
+        ("发票号码", r'发票号码[:：]?\s*(?P<value>\d{8,20})'),
+        ("开票日期", r'(?P<value>\d{4}年\d{2}月\d{2}日)'),
+        ("金额", r'价税合计.*?(?P<value>[0-9]+\.[0-9]{2})'),
+        ("税号", r'(?P<value>[0-9A-Z]{18})(?<!\w[0-9A-Z]{18})(?!\w)'),
+    ],
+    "全电发票": [
+        # 全电发票没有发票代码，号码为 20 位，可能不带"发票号码"标签
+        ("发票号码", r'(?P<value>\d{20})(?<!\w\d{20})(?!\w)'),
+    ],
+    "卷式发票": [
+        ("开票日期", r'开票日期[:：]?\s*(?P<value>\d{4}-\d{1,2}-\d{1,2})'),
+        ("金额", r'合计金额\s*[(（]小写[)）][:：]?\s*[¥￥]?\s*(?P<value>[0-9]+\.[0-9]{2})'),
+        ("购买方名称", r'购买方名称[:：]\s*(?P<value>[^\s:：]+)'),
+        ("购买方税号", r'购买方纳税人识别号[:：]?\s*(?P<value>[0-9A-Z]{15,20})'),
+        ("销售方税号", r'销售方纳税人识别号[:：]?\s*(?P<value>[0-9A-Z]{15,20})'),
+    ],
+}
+# 可选的附加版式，格式: {"版式名": [["字段", "正则"], ...]}
+LAYOUTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fapiao_layouts.json")
+
+
+def load_layouts(path=LAYOUTS_PATH):
+    """内置版式加上 fapiao_layouts.json 中的附加版式"""
+    layouts = dict(INVOICE_LAYOUTS)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for name, rules in json.load(f).items():
+                layouts[name] = [tuple(rule) for rule in rules]
+    return layouts
+
+
+class FieldExtractor:
+    """预编译的字段识别器，一次调用返回全部字段"""
+
+    def __init__(self, layouts=None, names=None):
+        layouts = layouts if layouts is not None else load_layouts()
+        self.rules = {}  # 字段 -> [已编译正则, ...]，按优先级排列
+        sources = []
+        for name in names or layouts:
+            for field, pattern in layouts[name]:
+                if field != "税号" and field not in FIELD_TAGS:
+                    raise ValueError(f"版式 {name} 中的未知字段: {field}")
+                regex = re.compile(pattern)
+                if "value" not in regex.groupindex:
+                    raise ValueError(f"版式 {name} 的规则缺少 (?P<value>...) 分组: {pattern}")
+                self.rules.setdefault(field, []).append(regex)
+                sources.append(f"{field}\t{pattern}")
+        self.tax_rules = self.rules.pop("税号", [])
+        # 规则集合的指纹，规则变化时缓存自动失效
+        self.token = hashlib.sha1("\n".join(sources).encode("utf-8")).hexdigest()[:12]
+
+    def extract(self, text):
+        """返回 {字段: 原始值}，未识别的字段不出现在结果中"""
+        return {field: value for field, (_, value) in self.extract_ranked(text).items()}
+
+    def extract_ranked(self, text):
+        """返回 {字段: (优先级, 原始值)}，优先级为命中规则的序号 (越小越可信)，
+        由不带标签的"税号"规则推断出的买卖方税号排在该字段所有规则之后"""
+        result = {}
+        for field, rules in self.rules.items():
+            for rank, regex in enumerate(rules):
+                m = regex.search(text)
+                if m:
+                    result[field] = (rank, m.group("value"))
+                    break
+
+        buyer = result.get("购买方税号", (0, None))[1]
+        seller = result.get("销售方税号", (0, None))[1]
+        tax_ids = [m.group("value") for regex in self.tax_rules for m in regex.finditer(text)]
+        tax_ids = [t for t in tax_ids if t != buyer and t != seller]
+
+        def guessed(field, value):
+            result[field] = (len(self.rules.get(field, ())), value)
+
+        if buyer is None and seller is None:
+            # 都没有标签时沿用原逻辑：至少两个税号才按先买方后卖方分配
+            if len(tax_ids) >= 2:
+                guessed("购买方税号", tax_ids[0])
+                guessed("销售方税号", tax_ids[1])
+        elif tax_ids:
+            guessed("购买方税号" if buyer is None else "销售方税号", tax_ids[0])
+        return result
+
+
+_extractor = None
+
+
+def default_extractor():
+    """每个进程只编译一次"""
+    global _extractor
+    if _extractor is None:
+        _extractor = FieldExtractor()
+    return _extractor
+
+
+def parse_text_fields(text, info, extractor=None, ranks=None):
+    """从发票文本中识别字段，只填写 info 中仍为空的字段
+
+    逐页解析时传入同一个 ranks 字典 ({字段: 优先级})：之前由低优先级规则 (例如不带标签的 20 位号码)
+    填写的字段，在后面的文本中遇到更可信的规则时被替换。结构化数据填写的字段不在 ranks 中，不会被替换。
+    """
+    extractor = extractor or default_extractor()
+    if ranks is None:
+        merge_fields(info, extractor.extract(text))
+        return
+    for field, (rank, value) in extractor.extract_ranked(text).items():
+        if not value:
+            continue
+        if not info[field] or (field in ranks and rank < ranks[field]):
+            info[field] = normalize_field(field, value)
+            ranks[field] = rank
+
+
+# ================= 结构化发票数据 (OFD / XML) =================
+def normalize_field(field, value):
+    """把结构化数据中的值统一成与 PDF 文本解析相同的格式"""
+    value = value.strip()
+    if field == "开票日期":
+        m = re.match(r'(\d{4})\D?(\d{1,2})\D?(\d{1,2})', value)
+        if m:
+            return f"{m.group(1)}年{int(m.group(2)):02d}月{int(m.group(3)):02d}日"
+    elif field == "金额":
+        try:
+            return f"{float(value.lstrip('¥￥').replace(',', '')):.2f}"
+        except ValueError:
+            pass
+    return value
+
+
+def merge_fields(info, fields):
+    for field, value in fields.items():
+        if value and not info[field]:
+            info[field] = normalize_field(field, value)
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def xml_fields(data):
+    """从电子发票 XML (或 XMP) 中按标签名取字段，解析失败返回空字典"""
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError:
+        return {}
+    fields = {}
+    for elem in root.iter():
+        field = TAG_FIELDS.get(local_name(elem.tag))
+        if field and field not in fields and elem.text and elem.text.strip():
+            fields[field] = elem.text
+    return fields
+
+
+def ofd_fields(path):
+    """读取 OFD 发票：先找附件中的原始发票 XML，再用自定义标签定位页面上的文本对象"""
+    import zipfile
+
+    fields = {}
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        for name in names:
+            lower = name.lower()
+            if lower.endswith(".xml") and "/attachs/" in lower:
+                for field, value in xml_fields(z.read(name)).items():
+                    fields.setdefault(field, value)
+        if all(f in fields for f in FIELD_TAGS):
+            return fields
+
+        # 自定义标签: <InvoiceNo><ObjectRef PageRef="..">12</ObjectRef></InvoiceNo>
+        # 对应页面 Content.xml 中 ID=12 的 TextObject
+        texts = {}
+        for name in names:
+            lower = name.lower()
+            if lower.endswith("content.xml") and ("/pages/" in lower or "/tpls/" in lower):
+                try:
+                    root = ET.fromstring(z.read(name))
+                except ET.ParseError:
+                    continue
+                for elem in root.iter():
+                    if local_name(elem.tag) == "textobject":
+                        texts[elem.get("ID")] = "".join(
+                            t.text or "" for t in elem.iter() if local_name(t.tag) == "textcode")
+        for name in names:
+            lower = name.lower()
+            if "/tags/" not in lower or not lower.endswith(".xml"):
+                continue
+            try:
+                root = ET.fromstring(z.read(name))
+            except ET.ParseError:
+                continue
+            for elem in root.iter():
+                field = TAG_FIELDS.get(local_name(elem.tag))
+                if not field or field in fields:
+                    continue
+                refs = [r.text.strip() for r in elem if local_name(r.tag) == "objectref" and r.text]
+                value = "".join(texts.get(ref, "") for ref in refs)
+                if value:
+                    fields[field] = value
+    return fields
+
+
+def pdf_embedded_fields(pdf):
+    """从 PDF 的 XMP 元数据和嵌入的 XML 附件中取字段，无需版面分析"""
+    from pdfminer.pdftypes import resolve1, stream_value
+
+    fields = {}
+    catalog = resolve1(pdf.doc.catalog)
+    blobs = []
+    if "Metadata" in catalog:
+        blobs.append(stream_value(catalog["Metadata"]).get_data())
+
+    names = resolve1(catalog.get("Names")) or {}
+    nodes = [resolve1(names["EmbeddedFiles"])] if "EmbeddedFiles" in names else []
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(resolve1(kid) for kid in resolve1(node.get("Kids", [])))
+        pairs = resolve1(node.get("Names", []))
+        for spec in pairs[1::2]:
+            spec = resolve1(spec)
+            filename = resolve1(spec.get("UF") or spec.get("F") or b"")
+            if isinstance(filename, bytes):
+                filename = filename.decode("latin-1")
+            ef = resolve1(spec.get("EF")) or {}
+            if filename.lower().endswith(".xml") and "F" in ef:
+                blobs.append(stream_value(ef["F"]).get_data())
+
+    for blob in blobs:
+        for field, value in xml_fields(blob).items():
+            fields.setdefault(field, value)
+    return fields
+
+
+def extract_info(pdf_path, structured=True, max_pages=None):
+    """核心解析逻辑 (可在子进程中运行)，返回 (info, 错误信息或 None)
+
+    structured 为 True 时先读 OFD/XML/PDF 内嵌的结构化数据，字段齐全则不再做文本提取；
+    PDF 文本按页提取，所有字段识别出来后立即停止；max_pages 默认不限页数，指定时最多读取这么多页。
+    每页只解析该页的文本；读完后仍缺字段 (例如标签和值被分到两页) 时再对全部文本解析一次。
+    """
+    info = new_info(pdf_path)
+    ext = os.path.splitext(pdf_path)[1].lower()
+
+    try:
+        if ext == ".ofd":
+            merge_fields(info, ofd_fields(pdf_path))
+        elif ext == ".xml":
+            with open(pdf_path, "rb") as f:
+                merge_fields(info, xml_fields(f.read()))
+        else:
+            import pdfplumber
+
+            with pdfplumber.open(pdf_path) as pdf:
+                if structured:
+                    try:
+                        merge_fields(info, pdf_embedded_fields(pdf))
+                    except Exception:
+                        pass  # 结构异常时退回文本解析
+                texts = []
+                ranks = {}
+                for page in pdf.pages[:max_pages] if max_pages else pdf.pages:
+                    if not missing_fields(info):
+                        break
+                    t = page.extract_text()
+                    if t:
+                        texts.append(t)
+                        parse_text_fields(t, info, ranks=ranks)
+                if len(texts) > 1 and missing_fields(info):
+                    parse_text_fields("".join(texts), info, ranks=ranks)
+
+    except Exception as e:
+        return info, f"读取失败: {os.path.basename(pdf_path)} - {str(e)}"
+
+    return info, None
+
+
+def iter_extract_parallel(paths, workers=DEFAULT_WORKERS, structured=True):
+    """用进程池并行解析，按完成顺序产出 (下标, info, 错误信息)
+
+    在途任务数限制为 workers * TASKS_PER_WORKER，分批提交。
+    """
+    if workers <= 1:
+        for index, path in enumerate(paths):
+            yield (index, *extract_info(path, structured))
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        queue = iter(enumerate(paths))
+        limit = workers * TASKS_PER_WORKER
+        while True:
+            for index, path in queue:
+                pending[pool.submit(extract_info, path, structured)] = index
+                if len(pending) >= limit:
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                yield (index, *future.result())
+
+
+# ================= 解析缓存 =================
+CACHE_FILE_NAME = ".fapiao_cache.sqlite"
+# 修改解析逻辑后递增，旧版本的缓存条目会被清除；识别规则本身的变化由规则指纹自动体现
+EXTRACT_RULES_VERSION = 3
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def extract_rules_token():
+    """缓存条目的规则标识：解析逻辑版本 + 识别规则指纹"""
+    return f"{EXTRACT_RULES_VERSION}-{default_extractor().token}"
+
+
+def file_digest(path):
+    """计算文件内容的 SHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExtractionCache:
+    """发票解析结果缓存 (单文件 SQLite)
+
+    files 表记录 文件路径 (相对缓存所在目录) -> (大小, mtime, 内容哈希)，大小和 mtime 未变时不必重新读文件算哈希；
+    entries 表记录 (内容哈希, 解析模式) -> info，文件改名或复制到别处也能命中；
+    是否读取结构化数据 (structured) 会影响结果，两种模式的条目分开存放，切换选项不会串用。
+    """
+
+    def __init__(self, db_path, rules_version=None, rebuild=False, structured=True):
+        self.rules_version = rules_version or extract_rules_token()
+        self.mode = "structured" if structured else "text"
+        self.stats = {"hits": 0, "misses": 0, "hashed": 0, "purged": 0}
+        self.base_dir = os.path.dirname(os.path.abspath(db_path))
+        self.conn = sqlite3.connect(db_path)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(entries)")]
+        if columns and "mode" not in columns:
+            # 旧版缓存不区分解析模式，无法判断条目来自哪种模式，整表重建
+            self.conn.execute("DROP TABLE entries")
+        self.conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " name TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT);"
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " digest TEXT, mode TEXT, rules TEXT, info TEXT, PRIMARY KEY (digest, mode));"
+        )
+        if rebuild:
+            cur = self.conn.execute("DELETE FROM entries")
+        else:
+            cur = self.conn.execute("DELETE FROM entries WHERE rules != ?", (self.rules_version,))
+        self.stats["purged"] = cur.rowcount
+        self.conn.commit()
+
+    def digest(self, path):
+        """返回文件内容哈希，大小和 mtime 与上次一致时直接复用记录"""
+        st = os.stat(path)
+        name = os.path.relpath(os.path.abspath(path), self.base_dir)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, digest FROM files WHERE name = ?", (name,)
+        ).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        digest = file_digest(path)
+        self.stats["hashed"] += 1
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (name, st.st_size, st.st_mtime_ns, digest),
+        )
+        return digest
+
+    def lookup(self, path):
+        """返回 (info 或 None, 内容哈希)"""
+        digest = self.digest(path)
+        row = self.conn.execute(
+            "SELECT info FROM entries WHERE digest = ? AND mode = ? AND rules = ?",
+            (digest, self.mode, self.rules_version),
+        ).fetchone()
+        if row is None:
+            self.stats["misses"] += 1
+            return None, digest
+        self.stats["hits"] += 1
+        info = json.loads(row[0])
+        info["文件名"] = os.path.basename(path)
+        return info, digest
+
+    def store(self, digest, info):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            (digest, self.mode, self.rules_version, json.dumps(info, ensure_ascii=False)),
+        )
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def summary(self):
+        s = self.stats
+        return (f"缓存命中 {s['hits']} 个，新解析 {s['misses']} 个，"
+                f"重新计算哈希 {s['hashed']} 个，清除过期条目 {s['purged']} 个")
+
+
+# ================= 跨目录发票索引 =================
+# 所有扫描过的发票都登记在这里，不同月份、不同目录重复报销的发票也能查出
+INDEX_PATH = os.path.join(os.path.expanduser("~"), ".fapiao_index.sqlite")
+
+
+def invoice_key(info):
+    """发票唯一键: 代码|号码 (全电发票代码为空)，没有识别出号码时返回 None"""
+    if not info["发票号码"]:
+        return None
+    return f"{info['发票代码']}|{info['发票号码']}"
+
+
+def near_key(info):
+    """疑似重复键: 金额|日期|销售方税号，缺任一字段时返回 None"""
+    if not (info["金额"] and info["开票日期"] and info["销售方税号"]):
+        return None
+    return f"{info['金额']}|{info['开票日期']}|{info['销售方税号']}"
+
+
+class InvoiceIndex:
+    """持久化的发票索引 (SQLite 存储，启动时载入内存字典，每张发票 O(1) 查询)"""
+
+    def __init__(self, db_path=INDEX_PATH):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS invoices ("
+            " key TEXT PRIMARY KEY, number TEXT, amount TEXT, date TEXT,"
+            " seller TEXT, path TEXT, added TEXT)"
+        )
+        self.keys = {}  # 唯一键 -> 首次登记的文件路径
+        self.near = {}  # 疑似重复键 -> [(号码, 文件路径), ...]
+        for key, number, amount, date, seller, path in self.conn.execute(
+                "SELECT key, number, amount, date, seller, path FROM invoices"):
+            self.keys[key] = path
+            if amount and date and seller:
+                self.near.setdefault(f"{amount}|{date}|{seller}", []).append((number, path))
+        self.stats = {"total": len(self.keys), "added": 0, "duplicates": 0, "near": 0}
+
+    def check_and_add(self, info, path):
+        """查重并登记，返回 (首次出现的其他文件路径或 "", 疑似重复文件路径列表)"""
+        key = invoice_key(info)
+        if key is None:
+            return "", []
+        path = os.path.abspath(path)
+        number = info["发票号码"]
+        nkey = near_key(info)
+        near = [p for n, p in self.near.get(nkey, ()) if n != number and p != path] if nkey else []
+        if near:
+            self.stats["near"] += 1
+
+        first = self.keys.get(key)
+        if first is None:
+            self.keys[key] = path
+            if nkey:
+                self.near.setdefault(nkey, []).append((number, path))
+            self.conn.execute(
+                "INSERT INTO invoices VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, number, info["金额"], info["开票日期"], info["销售方税号"], path,
+                 time.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+            self.stats["added"] += 1
+            self.stats["total"] += 1
+            return "", near
+        if first == path:
+            # 同一个文件再次扫描，不算重复
+            return "", near
+        self.stats["duplicates"] += 1
+        return first, near
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def summary(self):
+        s = self.stats
+        return (f"发票索引共 {s['total']} 张，本次新登记 {s['added']} 张，"
+                f"与已登记发票重复 {s['duplicates']} 张，疑似重复 {s['near']} 张")
+
+
+# ================= 流式报表 =================
+REPORT_NAME = "发票查重结果"
+# 报表格式: pandas 汇总后排序输出 (重复项排在前面)，或按文件名顺序边解析边写出
+REPORT_FORMATS = {
+    "Excel (排序)": "xlsx",
+    "Excel (流式)": "xlsx_stream",
+    "CSV (流式)": "csv",
+}
+
+
+def report_path(folder, report_format):
+    ext = ".csv" if report_format == "csv" else ".xlsx"
+    return os.path.join(folder, REPORT_NAME + ext)
+
+
+class StreamingReport:
+    """逐行写出查重报表 (openpyxl write-only、csv 或 JSON Lines)，不经过 pandas
+
+    重复判断用内存中的 代码+号码 字典 (没有发票号码的行不参与查重)；已写出的行不回头修改，
+    所以"是否重复"只标记后出现的那张，并在"重复于"列给出先出现的文件名。
+    唯一的例外是同一文件再次写入 (监视模式下文件被修改)：csv / jsonl 文件中改写它原来的那一行。
+    """
+
+    def __init__(self, out_path, columns):
+        self.out_path = out_path
+        self.columns = list(columns) + ["是否重复", "重复于"]
+        self.seen = {}
+        self.written = {}  # 文件名 -> (代码+号码 或 None, 是否重复)
+        self.rows = 0
+        self.duplicates = 0
+        self.book = None
+        if out_path == "-" or out_path.lower().endswith(".jsonl"):
+            self.file = sys.stdout if out_path == "-" else open(out_path, "w", encoding="utf-8")
+            self.append = self._append_json
+            return
+        if out_path.lower().endswith(".csv"):
+            self.file = open(out_path, "w", newline="", encoding="utf-8-sig")
+            self.append = csv.writer(self.file).writerow
+        else:
+            from openpyxl import Workbook
+            from openpyxl.utils import get_column_letter
+
+            self.file = None
+            self.book = Workbook(write_only=True)
+            sheet = self.book.create_sheet("Sheet1")
+            sheet.auto_filter.ref = f"A1:{get_column_letter(len(self.columns))}1"
+            self.append = sheet.append
+        self.append(self.columns)
+
+    def _append_json(self, row):
+        self.file.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + "\n")
+
+    def write(self, info):
+        """写出一行；同一文件 (监视模式下被修改后重新解析) 再次写入时替换之前的行"""
+        name = info["文件名"]
+        replacing = name in self.written
+        if replacing:
+            old_key, was_duplicate = self.written[name]
+            if self.seen.get(old_key) == name:
+                del self.seen[old_key]
+            self.duplicates -= was_duplicate
+        first = ""
+        key = None
+        if info["发票号码"]:
+            key = (info["发票代码"], info["发票号码"])
+            first = self.seen.setdefault(key, name)
+            if first == name:
+                first = ""
+        if first:
+            self.duplicates += 1
+        self.written[name] = (key, bool(first))
+        row = [info.get(column, "") for column in self.columns[:-2]] + [bool(first), first]
+        if replacing and self._replace_row(name, row):
+            return
+        self.append(row)
+        self.rows += 1
+
+    def _replace_row(self, name, row):
+        """把 csv / jsonl 文件中该文件的旧行改写为 row；标准输出和 xlsx 无法改写，返回 False"""
+        if self.book is not None or self.file is None or self.file is sys.stdout:
+            return False
+        index = self.columns.index("文件名")
+        self.file.close()
+        if self.out_path.lower().endswith(".csv"):
+            with open(self.out_path, newline="", encoding="utf-8-sig") as f:
+                rows = list(csv.reader(f))
+            rows = rows[:1] + [row if old[index] == name else old for old in rows[1:]]
+            self.file = open(self.out_path, "w", newline="", encoding="utf-8-sig")
+            self.append = csv.writer(self.file).writerow
+            for old in rows:
+                self.append(old)
+        else:
+            with open(self.out_path, encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            self.file = open(self.out_path, "w", encoding="utf-8")
+            for old in rows:
+                self._append_json(row if old.get("文件名") == name else [old.get(c, "") for c in self.columns])
+        return True
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.book is not None:
+            self.book.save(self.out_path)
+            self.book = None
+        if self.file is not None:
+            if self.file is sys.stdout:
+                self.file.flush()
+            else:
+                self.file.close()
+            self.file = None
+
+
+def write_sorted_report(results, out_path):
+    """汇总后用 pandas 查重排序，重复项排在前面 (原有的 Excel 报表)
+
+    与 StreamingReport 相同，没有识别出发票号码的行不参与查重。
+    """
+    import pandas as pd
+
+    # 转换为 DataFrame 并查重
+    df = pd.DataFrame(results)
+    has_number = df["发票号码"].fillna("") != ""
+    df["是否重复"] = df.duplicated(subset=["发票代码", "发票号码"], keep=False) & has_number
+    # 稳定排序，相同键保持文件名顺序
+    df.sort_values(by=["是否重复", "发票代码"], ascending=False, inplace=True, kind="mergesort")
+    df.to_excel(out_path, index=False)
+
+
+# ================= 扫描流程 =================
+def collect_invoice_files(sources, structured=True):
+    """把目录、文件和通配符 (支持 **) 展开为排好序、去重的发票文件列表"""
+    extensions = INVOICE_EXTENSIONS + (STRUCTURED_EXTENSIONS if structured else ())
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            candidates = (os.path.join(source, name) for name in os.listdir(source))
+        elif os.path.isfile(source):
+            candidates = [source]
+        else:
+            candidates = glob.glob(source, recursive=True)
+        for path in candidates:
+            if path.lower().endswith(extensions) and os.path.isfile(path):
+                files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def scan_invoices(paths, workers=DEFAULT_WORKERS, structured=True, use_cache=True, cache_path=None,
+                  rebuild_cache=False, index_path=None, on_row=None, progress=None, log=print, index=None,
+                  on_error=None):
+    """解析并查重一批发票文件，返回与 paths 顺序一致的 info 列表
+
+    缓存默认放在每个文件所在目录 (CACHE_FILE_NAME)，也可用 cache_path 指定一个共用的缓存文件；
+    index_path 不为空时与跨目录发票索引比对，增加"首次出现位置"/"疑似重复"两列
+    (也可直接传入已打开的 InvoiceIndex，由调用方负责关闭)。
+    on_row(info) 按 paths 顺序逐行回调 (流式报表)，progress(done, total, path) 每处理完一个文件回调，
+    on_error(path, 错误信息) 在某个文件读取或解析失败时回调 (该文件仍输出一行空字段的结果)。
+    多个目录时"文件名"为相对公共目录的路径，保证同名文件可区分。
+    """
+    total = len(paths)
+    result = [None] * total
+    if total == 0:
+        return result
+    folders = sorted({os.path.dirname(os.path.abspath(p)) for p in paths})
+    base_dir = folders[0] if len(folders) == 1 else os.path.commonpath(folders)
+    names = [os.path.relpath(os.path.abspath(p), base_dir) for p in paths]
+
+    caches = {}
+    own_index = index is None and bool(index_path)
+    try:
+        if own_index:
+            index = InvoiceIndex(index_path)
+
+        # 结果按完成顺序到达，按下标归位；已就绪的连续前缀按顺序登记索引、交给 on_row
+        emitted = 0
+
+        def emit_ready():
+            nonlocal emitted
+            while emitted < total and result[emitted] is not None:
+                info = result[emitted]
+                info["文件名"] = names[emitted]
+                if index is not None:
+                    first, near = index.check_and_add(info, paths[emitted])
+                    info["首次出现位置"] = first
+                    info["疑似重复"] = "; ".join(near)
+                if on_row is not None:
+                    on_row(info)
+                emitted += 1
+
+        # 先查缓存，只把新增或修改过的文件交给进程池
+        digests = {}
+        failed = 0
+        for i, path in enumerate(paths):
+            if not use_cache:
+                break
+            db_path = cache_path or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_FILE_NAME)
+            if db_path not in caches:
+                caches[db_path] = ExtractionCache(db_path, rebuild=rebuild_cache, structured=structured)
+            try:
+                result[i], digest = caches[db_path].lookup(path)
+            except OSError as e:
+                # 列出文件之后被删除或被其他程序占用：与解析失败一样记一行空结果，不影响其他文件
+                result[i] = new_info(path)
+                failed += 1
+                error = f"读取失败: {names[i]} - {str(e)}"
+                log(error)
+                if on_error:
+                    on_error(path, error)
+                continue
+            digests[i] = (caches[db_path], digest)
+        emit_ready()
+        todo = [i for i in range(total) if result[i] is None]
+        done = total - len(todo)
+        if progress and done:
+            progress(done, total, None)
+        log(f"找到 {total} 个发票文件，缓存命中 {done - failed} 个，使用 {workers} 个进程解析其余 {len(todo)} 个...")
+
+        for pos, info, error in iter_extract_parallel([paths[i] for i in todo], workers, structured):
+            i = todo[pos]
+            result[i] = info
+            done += 1
+            if error is None and i in digests:
+                cache, digest = digests[i]
+                cache.store(digest, info)
+            elif error is not None and on_error:
+                on_error(paths[i], error)
+            emit_ready()
+            log(error or f"已解析: {names[i]}")
+            if progress:
+                progress(done, total, paths[i])
+    finally:
+        for cache in caches.values():
+            cache.close()
+        if own_index:
+            index.close()
+
+    for cache in caches.values():
+        log(cache.summary())
+    if index is not None:
+        log(index.summary())
+    return result
+
+
+# ================= 监视目录 =================
+# 轮询间隔 (秒)；文件大小和修改时间在相邻两次检查中不变才认为已写完，避免解析复制到一半的文件
+WATCH_INTERVAL = 2.0
+# 装有 watchdog 时由文件系统事件唤醒，没有待确认的文件时最多空等这么久再兜底扫描一次
+WATCH_IDLE_TIMEOUT = 30.0
+WATCH_DEBOUNCE = 0.2
+# 解析失败的文件 (可能仍在写入或被占用) 内容不变时最多重试几次；内容变化后重新计数
+WATCH_RETRIES = 3
+
+
+class FolderWatcher:
+    """找出目录中新出现或被修改的发票文件 (有 watchdog 时用事件唤醒，否则定时轮询)"""
+
+    def __init__(self, folder, structured=True):
+        self.folder = folder
+        self.structured = structured
+        self.known = {}    # 已交出的文件 -> (大小, mtime)
+        self.pending = {}  # 刚发现、等待确认写完的文件 -> (大小, mtime)
+        self.retries = {}  # 解析失败的文件 -> ((大小, mtime), 已重试次数)
+        self.started = False
+        self.changed = threading.Event()
+        self.observer = None
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return
+
+        changed = self.changed
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                changed.set()
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), folder, recursive=False)
+        self.observer.start()
+
+    def poll(self):
+        """返回已确认写完的新文件/修改过的文件；第一次调用返回目录中现有的全部文件"""
+        ready = []
+        current = {}
+        for path in collect_invoice_files([self.folder], self.structured):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            current[path] = (st.st_size, st.st_mtime_ns)
+        for path, sig in current.items():
+            if self.known.get(path) == sig:
+                continue
+            if not self.started or self.pending.get(path) == sig:
+                ready.append(path)
+                self.known[path] = sig
+                self.pending.pop(path, None)
+            else:
+                self.pending[path] = sig
+        # 删除的文件不再跟踪
+        for path in list(self.pending):
+            if path not in current:
+                del self.pending[path]
+        for path in list(self.retries):
+            if path not in current:
+                del self.retries[path]
+        self.started = True
+        return sorted(ready)
+
+    def retry(self, path):
+        """解析失败的文件重新进入待确认状态，下次检查时大小和 mtime 仍不变就再交出一次"""
+        sig = self.known.get(path)
+        if sig is None:
+            return False
+        last_sig, attempts = self.retries.get(path, (sig, 0))
+        attempts = attempts + 1 if last_sig == sig else 1
+        if attempts > WATCH_RETRIES:
+            return False
+        self.retries[path] = (sig, attempts)
+        del self.known[path]
+        self.pending[path] = sig
+        return True
+
+    def wait(self, stop_event, interval=WATCH_INTERVAL):
+        """等到下一次该检查的时候，stop_event 置位时立即返回"""
+        if self.observer is not None and not self.pending:
+            deadline = time.monotonic() + WATCH_IDLE_TIMEOUT
+            while not stop_event.is_set() and time.monotonic() < deadline:
+                if self.changed.wait(0.5):
+                    break
+            self.changed.clear()
+            # 合并一次复制产生的连续事件后立即检查，新文件进入待确认状态
+            stop_event.wait(WATCH_DEBOUNCE)
+            return
+        stop_event.wait(interval)
+
+    def close(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+
+def watch_invoices(folder, stop_event, on_row=None, workers=DEFAULT_WORKERS, structured=True,
+                   index_path=None, interval=WATCH_INTERVAL, log=print, after_batch=None):
+    """持续监视目录：先处理现有文件，之后每批新到的文件解析后立即查重并交给 on_row
+
+    重复判断依赖调用方在 on_row 中保留的状态 (如 StreamingReport 的代码+号码字典) 和跨目录索引，
+    都是 O(1) 查询，不会重新扫描整个目录。after_batch() 在每批处理完后调用 (如刷新报表文件)。
+    已输出的文件内容不变时不再输出；内容改变时再次交给 on_row，由报表替换原来的行 (StreamingReport.write)。
+    读取或解析失败的文件 (复制到一半、被占用) 稍后重试；某一批整体出错只记日志，监视继续。
+    """
+    watcher = FolderWatcher(folder, structured)
+    index = InvoiceIndex(index_path) if index_path else None
+    reported = {}  # 已输出的文件名 -> 内容摘要
+    mode = "文件系统事件" if watcher.observer is not None else f"每 {interval:g} 秒轮询"
+    try:
+        first = True
+        while not stop_event.is_set():
+            # 已输出过的文件只是被重新保存 (mtime 变了、内容没变) 时不再解析
+            paths, digests = [], {}
+            for path in watcher.poll():
+                name = os.path.basename(path)
+                try:
+                    digests[name] = file_digest(path)
+                except OSError:
+                    digests[name] = None
+                if digests[name] is None or reported.get(name) != digests[name]:
+                    paths.append(path)
+            if paths:
+                if not first:
+                    log(f"发现 {len(paths)} 个新发票文件")
+                # 会重试的文件先不输出空结果行，重试次数用完仍失败才输出
+                retried = set()
+
+                def on_error(path, error):
+                    if watcher.retry(path):
+                        retried.add(os.path.basename(path))
+
+                def emit(info):
+                    if info["文件名"] in retried:
+                        return
+                    reported[info["文件名"]] = digests[info["文件名"]]
+                    if on_row is not None:
+                        on_row(info)
+
+                try:
+                    scan_invoices(paths, workers, structured, index=index, on_row=emit, log=log, on_error=on_error)
+                    if index is not None:
+                        index.commit()
+                except Exception as e:
+                    log(f"处理本批文件出错: {e}")
+                    for path in paths:
+                        if watcher.retry(path):
+                            retried.add(os.path.basename(path))
+                if retried:
+                    log(f"{len(retried)} 个文件读取失败，稍后重试")
+                if after_batch:
+                    after_batch()
+            if first:
+                log(f"开始监视目录 ({mode}): {folder}")
+                first = False
+            watcher.wait(stop_event, interval)
+    finally:
+        watcher.close()
+        if index is not None:
+            index.close()
+
+
+# ================= 命令行 =================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="发票解析与查重 (命令行)")
+    parser.add_argument("sources", nargs="+", help="发票目录、文件或通配符 (支持 **)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="输出文件: .jsonl / .csv / .xlsx，默认以 JSON Lines 输出到标准输出")
+    parser.add_argument("--sorted", action="store_true",
+                        help="xlsx 输出用 pandas 汇总排序 (重复项在前)，默认流式写出")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_WORKERS, help="解析进程数")
+    parser.add_argument("--no-cache", action="store_true", help="不使用解析缓存")
+    parser.add_argument("--cache", metavar="FILE", help="共用的缓存文件 (默认每个目录各自一个)")
+    parser.add_argument("--rebuild-cache", action="store_true", help="清空缓存后重新解析")
+    parser.add_argument("--no-structured", action="store_true", help="不读取 OFD/XML 和 PDF 内嵌数据")
+    parser.add_argument("--index", nargs="?", const=INDEX_PATH, metavar="FILE",
+                        help=f"与跨目录发票索引比对并登记 (默认 {INDEX_PATH})")
+    parser.add_argument("--watch", action="store_true",
+                        help="持续监视 (单个) 目录，新发票到达即解析并追加到报表，Ctrl+C 结束")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="监视模式的轮询间隔 (秒)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出进度日志")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    if args.sorted and (args.watch or not args.output.lower().endswith(".xlsx")):
+        parser.error("--sorted 只用于 .xlsx 输出 (不能与 --watch 同时使用)")
+
+    structured = not args.no_structured
+    if args.watch:
+        if len(args.sources) != 1 or not os.path.isdir(args.sources[0]):
+            parser.error("--watch 需要且只能指定一个目录")
+        if args.output.lower().endswith(".xlsx"):
+            parser.error("--watch 需要可追加的报表，请输出 .csv 或 .jsonl")
+        columns = list(new_info("")) + (["首次出现位置", "疑似重复"] if args.index else [])
+        report = StreamingReport(args.output, columns)
+        stop_event = threading.Event()
+        try:
+            watch_invoices(args.sources[0], stop_event, report.write, max(1, args.workers), structured,
+                           args.index, args.interval, log, report.flush)
+        except KeyboardInterrupt:
+            stop_event.set()
+        finally:
+            report.close()
+        log(f"停止监视，共写出 {report.rows} 行，其中重复 {report.duplicates} 张")
+        return 0
+
+    paths = collect_invoice_files(args.sources, structured)
+    if not paths:
+        print("没有找到发票文件", file=sys.stderr)
+        return 1
+
+    sort_report = args.sorted
+    columns = list(new_info("")) + (["首次出现位置", "疑似重复"] if args.index else [])
+    report = None if sort_report else StreamingReport(args.output, columns)
+    try:
+        results = scan_invoices(
+            paths, max(1, args.workers), structured,
+            use_cache=not args.no_cache, cache_path=args.cache, rebuild_cache=args.rebuild_cache,
+            index_path=args.index, on_row=report.write if report else None, log=log,
+        )
+    finally:
+        if report is not None:
+            report.close()
+
+    if sort_report:
+        write_sorted_report(results, args.output)
+        log(f"结果已保存至: {args.output}")
+    else:
+        log(f"共写出 {report.rows} 行，其中重复 {report.duplicates} 张")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Tk 界面共用的批量日志输出
+
+后台线程直接调用 LogSink.write (只是往 deque 里追加，线程安全)，
+主线程定时把积攒的消息一次性插入 ScrolledText，并限制控件保留的行数。
+处理几千个文件时不再每条消息都排一次 root.after、触发一次重绘。
+"""
+
+from collections import deque
+
+FLUSH_INTERVAL_MS = 100
+MAX_LINES = 5000
+
+
+class LogSink:
+    def __init__(self, root, widget, prefix="", interval_ms=FLUSH_INTERVAL_MS, max_lines=MAX_LINES):
+        self.root = root
+        self.widget = widget
+        self.prefix = prefix
+        self.interval_ms = interval_ms
+        self.max_lines = max_lines
+        self.pending = deque()
+        self.root.after(self.interval_ms, self._tick)
+
+    def write(self, message):
+        """记录一条日志，任意线程都可以调用"""
+        self.pending.append(message)
+
+    __call__ = write
+
+    def clear(self):
+        """清空控件和尚未显示的消息 (主线程调用)"""
+        self.pending.clear()
+        self._edit(lambda: self.widget.delete("1.0", "end"))
+
+    def flush(self):
+        """把积攒的消息一次性写入控件 (主线程调用)"""
+        if not self.pending:
+            return
+        lines = []
+        pop = self.pending.popleft
+        try:
+            while True:
+                lines.append(pop())
+        except IndexError:
+            pass
+
+        skipped = 0
+        if len(lines) > self.max_lines:
+            # 留一行给省略提示
+            skipped = len(lines) - self.max_lines + 1
+            lines = lines[skipped:]
+        text = "".join(f"{self.prefix}{line}\n" for line in lines)
+        if skipped:
+            text = f"... (省略 {skipped} 条日志)\n" + text
+
+        def insert():
+            self.widget.insert("end", text)
+            # 超过行数上限时删掉最早的行 (文本以换行结尾，end-1c 落在末尾的空行上)
+            total = int(self.widget.index("end-1c").split(".")[0]) - 1
+            if total > self.max_lines:
+                self.widget.delete("1.0", f"{total - self.max_lines + 1}.0")
+            self.widget.see("end")
+
+        self._edit(insert)
+
+    def _edit(self, action):
+        # 只读 (disabled) 的日志框需要临时打开才能写入
+        readonly = str(self.widget.cget("state")) == "disabled"
+        if readonly:
+            self.widget.config(state="normal")
+        action()
+        if readonly:
+            self.widget.config(state="disabled")
+
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self.root.after(self.interval_ms, self._tick)
@@ -0,0 +1,456 @@
+"""
+LVGL 字库的 Python 生成后端 (不依赖 Node.js / lv_font_conv)
+
+用 Pillow (FreeType) 按指定字号栅格化字符，量化到 1/2/4/8 bpp 后连续打包位图，
+生成与 lv_font_conv --format lvgl --no-compress 相同结构的 lv_font_fmt_txt C 文件：
+    glyph_bitmap / glyph_dsc / 压缩的 cmaps (连续段用 FORMAT0_TINY，零散码点用 SPARSE_TINY)。
+字符较多时按块分给多个进程并行栅格化。
+
+与 lv_font_conv 的已知差异：不输出字距调整表 (kern_dsc = NULL)，位图不做 RLE 压缩，
+下划线位置按字号估算。对比脚本见 benchmarks/bench_lvgl_font.py。
+
+需要 Pillow: pip install Pillow
+"""
+
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageFont
+
+# 不压缩的位图 (bitmap_format = 0) 在 LVGL 中只支持这些 bpp，3 bpp 需要 lv_font_conv 的压缩格式
+SUPPORTED_BPP = (1, 2, 4, 8)
+# 字符少于这个数时直接在当前进程栅格化，省掉进程池启动开销
+PARALLEL_MIN_GLYPHS = 256
+GLYPHS_PER_TASK = 128
+NATIVE_WORKERS = os.cpu_count() or 1
+# 连续码点达到这个长度才单独成一个 FORMAT0_TINY 子表 (放进 SPARSE 表每个码点占 2 字节，子表本身约 16 字节)
+TINY_RUN_MIN = 10
+# lv_font_fmt_txt_cmap_t.range_length 是 uint16_t，一个子表最多覆盖 0xFFFF 个码点
+RANGE_LENGTH_MAX = 0xFFFF
+SPARSE_SPAN_MAX = RANGE_LENGTH_MAX - 1
+# lv_font_fmt_txt_glyph_dsc_t 未开启 LV_FONT_FMT_TXT_LARGE 时的位域上限
+SMALL_BITMAP_INDEX_MAX = (1 << 20) - 1
+SMALL_ADV_W_MAX = (1 << 12) - 1
+# box_w/box_h 默认为 uint8_t、ofs_x/ofs_y 为 int8_t；开启 LV_FONT_FMT_TXT_LARGE 后为 uint16_t / int16_t
+SMALL_BOX_MAX, LARGE_BOX_MAX = 0xFF, 0xFFFF
+SMALL_OFS_RANGE, LARGE_OFS_RANGE = (-0x80, 0x7F), (-0x8000, 0x7FFF)
+BYTES_PER_LINE = 16
+# 字体中肯定不存在的码点，渲染结果即 .notdef 字形，用来识别缺字
+NOTDEF_PROBE = 0x10FFFD
+
+_FONTS = {}
+
+
+def _load_font(ttf, size):
+    key = (ttf, size)
+    if key not in _FONTS:
+        # BASIC 布局逐字渲染，不受 raqm 连字/整形影响
+        _FONTS[key] = ImageFont.truetype(ttf, size, layout_engine=ImageFont.Layout.BASIC)
+    return _FONTS[key]
+
+
+def _quantize_table(bpp):
+    """0~255 灰度到 bpp 位的映射表，配合 bytes.translate 使用"""
+    top = (1 << bpp) - 1
+    return bytes((v * top + 127) // 255 for v in range(256))
+
+
+def pack_pixels(values, bpp):
+    """把量化后的像素 (每个一字节) 按 bpp 位连续打包，高位在前，末尾补 0 到整字节"""
+    if bpp == 8:
+        return bytes(values)
+    if not values:
+        return b""
+    fmt = f"0{bpp}b"
+    bits = "".join([format(v, fmt) for v in values])
+    bits += "0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+
+def unpack_pixels(data, offset, count, bpp):
+    """pack_pixels 的逆过程，返回 count 个像素值"""
+    if bpp == 8:
+        return list(data[offset:offset + count])
+    nbytes = (count * bpp + 7) // 8
+    bits = int.from_bytes(data[offset:offset + nbytes], "big")
+    total = nbytes * 8
+    mask = (1 << bpp) - 1
+    return [(bits >> (total - (i + 1) * bpp)) & mask for i in range(count)]
+
+
+def _render(font, ch, table):
+    """栅格化一个字符，返回 (adv_w, box_w, box_h, ofs_x, ofs_y, 量化后的像素 bytes)"""
+    adv_w = round(font.getlength(ch) * 16)
+    # 每次 FreeType 渲染都比较慢，只渲染一次：mask 的左上角相对基线原点偏移 (x0, y0)
+    mask, (x0, y0) = font.getmask2(ch, mode="L", anchor="ls")
+    if not mask.size[0] or not mask.size[1]:
+        return adv_w, 0, 0, 0, 0, b""
+    # 先量化再裁掉四周全 0 的行列，量化后为 0 的淡边不占位图
+    img = Image.frombytes("L", mask.size, bytes(mask).translate(table))
+    ink = img.getbbox()
+    if not ink:
+        return adv_w, 0, 0, 0, 0, b""
+    left, top, right, bottom = ink
+    pixels = img.crop(ink).tobytes()
+    # LVGL 的 ofs_y 是字形底边相对基线的偏移，向上为正
+    return adv_w, right - left, bottom - top, x0 + left, -(y0 + bottom), pixels
+
+
+def rasterize_chunk(ttf, size, bpp, codepoints):
+    """栅格化一组码点 (进程池任务)，返回 [(码点, 字形或 None 表示字体中没有), ...]"""
+    font = _load_font(ttf, size)
+    table = _quantize_table(bpp)
+    notdef = _render(font, chr(NOTDEF_PROBE), table)
+    results = []
+    for cp in codepoints:
+        ch = chr(cp)
+        glyph = _render(font, ch, table)
+        # 与 .notdef 完全相同且不是空白字符，视为字体缺字
+        if glyph == notdef and not ch.isspace():
+            results.append((cp, None))
+            continue
+        adv_w, box_w, box_h, ofs_x, ofs_y, pixels = glyph
+        results.append((cp, (adv_w, box_w, box_h, ofs_x, ofs_y, pack_pixels(pixels, bpp))))
+    return results
+
+
+def rasterize_glyphs(ttf, size, bpp, codepoints, workers=NATIVE_WORKERS, progress=None):
+    """栅格化全部码点，返回 ({码点: 字形}, 缺字码点列表)；progress(done, total) 在调用线程中回调"""
+    codepoints = sorted(codepoints)
+    chunks = [codepoints[i:i + GLYPHS_PER_TASK] for i in range(0, len(codepoints), GLYPHS_PER_TASK)]
+    glyphs, missing = {}, []
+
+    def collect(results):
+        for cp, glyph in results:
+            if glyph is None:
+                missing.append(cp)
+            else:
+                glyphs[cp] = glyph
+
+    done = 0
+    if workers <= 1 or len(codepoints) < PARALLEL_MIN_GLYPHS:
+        for chunk in chunks:
+            collect(rasterize_chunk(ttf, size, bpp, chunk))
+            done += len(chunk)
+            if progress:
+                progress(done, len(codepoints))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            # map 保持提交顺序，结果与串行完全一致
+            for chunk, results in zip(chunks, pool.map(rasterize_chunk, *zip(*[(ttf, size, bpp, c) for c in chunks]))):
+                collect(results)
+                done += len(chunk)
+                if progress:
+                    progress(done, len(codepoints))
+    return glyphs, sorted(missing)
+
+
+def build_cmaps(codepoints):
+    """把排序后的码点划分成 cmap 子表
+
+    较长的连续段用 FORMAT0_TINY (不需要任何列表)，其余码点合并进 SPARSE_TINY
+    (uint16 偏移列表)；每个子表的 length 不超过 RANGE_LENGTH_MAX。返回 [{"start", "length", "glyph_id_start", "type", "offsets"}, ...]，
+    字形 id 从 1 开始按码点顺序分配 (0 保留)。
+    """
+    runs = []
+    for cp in codepoints:
+        if runs and cp == runs[-1][-1] + 1:
+            runs[-1].append(cp)
+        else:
+            runs.append([cp])
+
+    cmaps = []
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        start = pending[0]
+        contiguous = pending[-1] - start + 1 == len(pending)
+        cmaps.append({"start": start, "length": pending[-1] - start + 1, "type": "FORMAT0_TINY" if contiguous else "SPARSE_TINY",
+                      "offsets": [] if contiguous else [cp - start for cp in pending], "count": len(pending)})
+        pending.clear()
+
+    for run in runs:
+        if len(run) >= TINY_RUN_MIN:
+            flush()
+            for i in range(0, len(run), RANGE_LENGTH_MAX):
+                pending.extend(run[i:i + RANGE_LENGTH_MAX])
+                flush()
+            continue
+        for cp in run:
+            if pending and cp - pending[0] > SPARSE_SPAN_MAX:
+                flush()
+            pending.append(cp)
+    flush()
+
+    glyph_id = 1
+    for cmap in cmaps:
+        cmap["glyph_id_start"] = glyph_id
+        glyph_id += cmap["count"]
+    return cmaps
+
+
+def _c_char_comment(cp):
+    ch = chr(cp)
+    if ch in '"\\':
+        ch = "\\" + ch
+    return f'/* U+{cp:04X} "{ch}" */'
+
+
+def _hex_lines(data, indent="    "):
+    lines = []
+    for i in range(0, len(data), BYTES_PER_LINE):
+        lines.append(indent + ", ".join(f"0x{b:02x}" for b in data[i:i + BYTES_PER_LINE]) + ",")
+    return lines
+
+
+def render_font_c(name, size, bpp, glyphs, cmaps, metrics, opts=""):
+    """按 lv_font_conv 的 lvgl 格式输出 C 源码，metrics 为字体的 (ascent, descent)，descent 取正值"""
+    codepoints = sorted(glyphs)
+    bitmap_lines, dsc_lines = [], []
+    dsc_lines.append("    {.bitmap_index = 0, .adv_w = 0, .box_w = 0, .box_h = 0, .ofs_x = 0, .ofs_y = 0} /* id = 0 reserved */")
+    index = 0
+    large = False
+    for cp in codepoints:
+        adv_w, box_w, box_h, ofs_x, ofs_y, data = glyphs[cp]
+        if (max(box_w, box_h) > LARGE_BOX_MAX
+                or not LARGE_OFS_RANGE[0] <= min(ofs_x, ofs_y) <= max(ofs_x, ofs_y) <= LARGE_OFS_RANGE[1]):
+            raise ValueError(f"U+{cp:04X} 的字形尺寸或偏移超出 lv_font_fmt_txt_glyph_dsc_t 的范围 "
+                             f"(box {box_w}x{box_h}, ofs {ofs_x},{ofs_y})，请减小字号")
+        bitmap_lines.append(f"    {_c_char_comment(cp)}")
+        bitmap_lines.extend(_hex_lines(data))
+        bitmap_lines.append("")
+        dsc_lines.append(f"    {{.bitmap_index = {index}, .adv_w = {adv_w}, .box_w = {box_w}, .box_h = {box_h}, "
+                         f".ofs_x = {ofs_x}, .ofs_y = {ofs_y}}}")
+        large = (large or index > SMALL_BITMAP_INDEX_MAX or adv_w > SMALL_ADV_W_MAX
+                 or max(box_w, box_h) > SMALL_BOX_MAX
+                 or not SMALL_OFS_RANGE[0] <= min(ofs_x, ofs_y) <= max(ofs_x, ofs_y) <= SMALL_OFS_RANGE[1])
+        index += len(data)
+    if bitmap_lines and bitmap_lines[-1] == "":
+        bitmap_lines.pop()
+
+    ascent, descent = metrics
+    guard = name.upper()
+    out = [
+        "/*******************************************************************************",
+        f" * Size: {size} px",
+        f" * Bpp: {bpp}",
+        f" * Opts: {opts}",
+        " ******************************************************************************/",
+        "",
+        "#ifdef LV_LVGL_H_INCLUDE_SIMPLE",
+        '#include "lvgl.h"',
+        "#else",
+        '#include "lvgl/lvgl.h"',
+        "#endif",
+        "",
+        f"#ifndef {guard}",
+        f"#define {guard} 1",
+        "#endif",
+        "",
+        f"#if {guard}",
+        "",
+    ]
+    if large:
+        out += ["#if !LV_FONT_FMT_TXT_LARGE",
+                f'#error "Too large font or glyphs in {guard}. Enable LV_FONT_FMT_TXT_LARGE in lv_conf.h"',
+                "#endif", ""]
+    out += [
+        "/*-----------------",
+        " *    BITMAPS",
+        " *----------------*/",
+        "",
+        "/*Store the image of the glyphs*/",
+        "static LV_ATTRIBUTE_LARGE_CONST const uint8_t glyph_bitmap[] = {",
+        *bitmap_lines,
+        "};",
+        "",
+        "",
+        "/*---------------------",
+        " *  GLYPH DESCRIPTION",
+        " *--------------------*/",
+        "",
+        "static const lv_font_fmt_txt_glyph_dsc_t glyph_dsc[] = {",
+        ",\n".join(dsc_lines),
+        "};",
+        "",
+        "/*---------------------",
+        " *  CHARACTER MAPPING",
+        " *--------------------*/",
+        "",
+    ]
+    cmap_lines = []
+    for i, cmap in enumerate(cmaps):
+        unicode_list = "NULL"
+        if cmap["type"] == "SPARSE_TINY":
+            unicode_list = f"unicode_list_{i}"
+            out.append(f"static const uint16_t {unicode_list}[] = {{")
+            for j in range(0, len(cmap["offsets"]), 8):
+                out.append("    " + ", ".join(f"0x{o:x}" for o in cmap["offsets"][j:j + 8]) + ",")
+            out += ["};", ""]
+        list_length = len(cmap["offsets"])
+        cmap_lines.append(
+            "    {\n"
+            f"        .range_start = {cmap['start']}, .range_length = {cmap['length']}, .glyph_id_start = {cmap['glyph_id_start']},\n"
+            f"        .unicode_list = {unicode_list}, .glyph_id_ofs_list = NULL, .list_length = {list_length}, "
+            f".type = LV_FONT_FMT_TXT_CMAP_{cmap['type']}\n"
+            "    }")
+    out += [
+        "/*Collect the unicode lists and glyph_id offsets*/",
+        "static const lv_font_fmt_txt_cmap_t cmaps[] =",
+        "{",
+        ",\n".join(cmap_lines),
+        "};",
+        "",
+        "",
+        "",
+        "/*--------------------",
+        " *  ALL CUSTOM DATA",
+        " *--------------------*/",
+        "",
+        "#if LVGL_VERSION_MAJOR == 8",
+        "/*Store all the custom data of the font*/",
+        "static  lv_font_fmt_txt_glyph_cache_t cache;",
+        "#endif",
+        "",
+        "#if LVGL_VERSION_MAJOR >= 8",
+        "static const lv_font_fmt_txt_dsc_t font_dsc = {",
+        "#else",
+        "static lv_font_fmt_txt_dsc_t font_dsc = {",
+        "#endif",
+        "    .glyph_bitmap = glyph_bitmap,",
+        "    .glyph_dsc = glyph_dsc,",
+        "    .cmaps = cmaps,",
+        "    .kern_dsc = NULL,",
+        "    .kern_scale = 0,",
+        f"    .cmap_num = {len(cmaps)},",
+        f"    .bpp = {bpp},",
+        "    .kern_classes = 0,",
+        "    .bitmap_format = 0,",
+        "#if LVGL_VERSION_MAJOR == 8",
+        "    .cache = &cache",
+        "#endif",
+        "};",
+        "",
+        "",
+        "",
+        "/*-----------------",
+        " *  PUBLIC FONT",
+        " *----------------*/",
+        "",
+        "/*Initialize a public general font descriptor*/",
+        "#if LVGL_VERSION_MAJOR >= 8",
+        f"const lv_font_t {name} = {{",
+        "#else",
+        f"lv_font_t {name} = {{",
+        "#endif",
+        "    .get_glyph_dsc = lv_font_get_glyph_dsc_fmt_txt,    /*Function pointer to get glyph's data*/",
+        "    .get_glyph_bitmap = lv_font_get_bitmap_fmt_txt,    /*Function pointer to get glyph's bitmap*/",
+        f"    .line_height = {ascent + descent},          /*The maximum line height required by the font*/",
+        f"    .base_line = {descent},             /*Baseline measured from the bottom of the line*/",
+        "#if !(LVGL_VERSION_MAJOR == 6 && LVGL_VERSION_MINOR == 0)",
+        "    .subpx = LV_FONT_SUBPX_NONE,",
+        "#endif",
+        "#if LV_VERSION_CHECK(7, 4, 0) || LVGL_VERSION_MAJOR >= 8",
+        f"    .underline_position = {-max(1, round(size / 10))},",
+        f"    .underline_thickness = {max(1, round(size / 20))},",
+        "#endif",
+        "    .dsc = &font_dsc,          /*The custom font data. Will be accessed by `get_glyph_bitmap/dsc` */",
+        "#if LV_VERSION_CHECK(8, 2, 0) || LVGL_VERSION_MAJOR >= 9",
+        "    .fallback = NULL,",
+        "#endif",
+        "    .user_data = NULL,",
+        "};",
+        "",
+        "",
+        "",
+        f"#endif /*#if {guard}*/",
+        "",
+    ]
+    return "\n".join(out)
+
+
+def generate_font(ttf, size, bpp, symbols, out_path, workers=NATIVE_WORKERS, progress=None):
+    """生成 LVGL C 字库，返回统计信息字典"""
+    size, bpp = int(size), int(bpp)
+    if bpp not in SUPPORTED_BPP:
+        raise ValueError(f"Python 后端不支持 {bpp} bpp (只支持 1/2/4/8)")
+    start = time.perf_counter()
+    glyphs, missing = rasterize_glyphs(ttf, size, bpp, {ord(c) for c in symbols}, workers, progress)
+    if not glyphs:
+        raise ValueError("字体中没有任何所需字符")
+    cmaps = build_cmaps(sorted(glyphs))
+    name = re.sub(r"[^a-zA-Z0-9_]", "_", os.path.splitext(os.path.basename(out_path))[0])
+    opts = f"--bpp {bpp} --size {size} --font {os.path.basename(ttf)} --format lvgl --no-compress (Python 后端)"
+    # 行高和基线取字体本身的度量 (hhea/OS2)，与 lv_font_conv 一致，不随所选字符变化
+    text = render_font_c(name, size, bpp, glyphs, cmaps, _load_font(ttf, size).getmetrics(), opts)
+    with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(text)
+    stats = {"glyphs": len(glyphs), "missing": missing, "bitmap_bytes": sum(len(g[5]) for g in glyphs.values()),
+             "cmaps": {}, "elapsed": time.perf_counter() - start}
+    for cmap in cmaps:
+        stats["cmaps"][cmap["type"]] = stats["cmaps"].get(cmap["type"], 0) + 1
+    return stats
+
+
+# ================= 解析生成的字库 (用于对比) =================
+
+DSC_RE = re.compile(r"\{\.bitmap_index = (\d+), \.adv_w = (\d+), \.box_w = (\d+), \.box_h = (\d+), "
+                    r"\.ofs_x = (-?\d+), \.ofs_y = (-?\d+)\}")
+CMAP_RE = re.compile(r"\.range_start = (\d+), \.range_length = (\d+), \.glyph_id_start = (\d+),\s*"
+                     r"\.unicode_list = (\w+), \.glyph_id_ofs_list = (\w+), \.list_length = (\d+), "
+                     r"\.type = LV_FONT_FMT_TXT_CMAP_(\w+)")
+ARRAY_RE = re.compile(r"(\w+)\[\] = \{(.*?)\};", re.S)
+
+
+def parse_font_c(text):
+    """解析 lvgl 格式的 C 字库 (lv_font_conv 或本后端生成)
+
+    返回 {"bpp", "bitmap_format", "line_height", "base_line",
+          "glyphs": {码点: (adv_w, box_w, box_h, ofs_x, ofs_y, 像素列表或 None)}}；
+    压缩位图 (bitmap_format != 0) 不解码像素。
+    """
+    arrays = {}
+    for name, body in ARRAY_RE.findall(text):
+        body = re.sub(r"/\*.*?\*/", "", body, flags=re.S)
+        arrays[name] = body
+    bitmap = bytes(int(v, 16) for v in re.findall(r"0x([0-9a-fA-F]+)", arrays.get("glyph_bitmap", "")))
+    dscs = [tuple(int(v) for v in m) for m in DSC_RE.findall(arrays.get("glyph_dsc", ""))]
+
+    def int_list(name):
+        return [int(v, 0) for v in re.findall(r"0x[0-9a-fA-F]+|\d+", arrays.get(name, ""))]
+
+    def field(name):
+        match = re.search(rf"\.{name} = (-?\d+)", text)
+        return int(match.group(1)) if match else None
+
+    bpp = field("bpp")
+    bitmap_format = field("bitmap_format") or 0
+    font = {"bpp": bpp, "bitmap_format": bitmap_format, "line_height": field("line_height"),
+            "base_line": field("base_line"), "glyphs": {}}
+
+    mapping = {}
+    for start, length, gid_start, ulist, olist, _, kind in CMAP_RE.findall(text):
+        start, length, gid_start = int(start), int(length), int(gid_start)
+        if kind == "FORMAT0_TINY":
+            mapping.update((start + i, gid_start + i) for i in range(length))
+        elif kind == "FORMAT0_FULL":
+            ofs = int_list(olist)
+            mapping.update((start + i, gid_start + o) for i, o in enumerate(ofs) if o or i == 0)
+        elif kind == "SPARSE_TINY":
+            mapping.update((start + u, gid_start + k) for k, u in enumerate(int_list(ulist)))
+        elif kind == "SPARSE_FULL":
+            mapping.update((start + u, gid_start + o) for u, o in zip(int_list(ulist), int_list(olist)))
+
+    for cp, gid in mapping.items():
+        if gid >= len(dscs):
+            continue
+        index, adv_w, box_w, box_h, ofs_x, ofs_y = dscs[gid]
+        pixels = None
+        if bitmap_format == 0:
+            pixels = unpack_pixels(bitmap, index, box_w * box_h, bpp)
+        font["glyphs"][cp] = (adv_w, box_w, box_h, ofs_x, ofs_y, pixels)
+    return font
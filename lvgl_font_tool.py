@@ -2,22 +2,675 @@
 LVGL 字体管理与转换助手 (GUI)
 功能：
 1. 逆向解析：从已有 LVGL C 字库文件提取所有字符和图标码点。
-2. 源码扫描：自动扫描项目 C/H 文件提取所有出现的汉字。
+2. 源码扫描：自动扫描项目 C/H 文件，提取字符串常量 (或全部) 中出现的汉字，可附带翻译表。
 3. 字符追加：支持手动编辑字符集或通过 Unicode 码点追加图标。
-4. 官方转换：配置 TTF、Size、BPP 后，一键调用 lv_font_conv 生成标准 C 字库。
+4. 官方转换：配置 TTF、Size、BPP 后，一键调用 lv_font_conv 生成标准 C 字库；
+   也可以选择 Python 后端 (lvgl_font_native.py，Pillow 栅格化)，离线机器无需 Node.js。
+
+源码扫描在后台线程池中进行，可用忽略规则跳过 build、第三方库等目录。
+
+命令行 (无界面，CI 中批量生成)：
+    python lvgl_font_tool.py batch fonts.json [-j 并行数] [--force] [--backend python]
 """
 
+import argparse
+import fnmatch
+import functools
+import hashlib
+import json
+import multiprocessing
 import os
 import re
+import shutil
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+from log_sink import LogSink
+
+# ================= 源码扫描 =================
+
+SOURCE_EXTENSIONS = ('.c', '.h', '.cpp', '.hpp')
+# 翻译表 (整份文件都是要显示的文字，按全部非 ASCII 字符提取)
+I18N_EXTENSIONS = ('.po', '.json', '.csv', '.txt', '.xml', '.yaml', '.yml', '.ini')
+# 默认跳过的目录 (按目录名或相对路径做通配匹配)
+DEFAULT_IGNORE = "build .git .svn node_modules Debug Release out"
+SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# 每个任务处理的文件数，避免几万个文件各提交一个 future
+FILES_PER_TASK = 64
+
+GLYPH_CACHE_NAME = ".lvgl_glyph_cache.json"
+GLYPH_CACHE_VERSION = 2
+
+NON_ASCII_RE = re.compile(rb'[\x80-\xff]+')
+GLYPH_HINT_RE = re.compile(rb'[\x80-\xff]|\\[xuU0-7]')
+# 一次扫描同时识别注释、原始字符串 R"d(...)d" 和字符串/字符常量，注释里的引号不会被误当成字符串
+C_TOKEN_RE = re.compile(rb'//[^\n]*|/\*.*?(?:\*/|\Z)'
+                        rb'|(?<!\w)(?:u8|[uUL])?R"(?P<delim>[^()\\\s"]{0,16})\((?P<raw>.*?)\)(?P=delim)"'
+                        rb'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.S)
+# 相邻字符串常量之间 (去掉注释后) 只有空白和前缀时，按 C 的规则拼接后再解码
+C_CONCAT_GAP_RE = re.compile(rb'\s*(?:u8|[uUL])?')
+C_ESCAPE_RE = re.compile(rb'\\(?:x([0-9a-fA-F]{1,2})|([0-7]{1,3})|u([0-9a-fA-F]{4})|U([0-9a-fA-F]{8})|(.))', re.S)
+
+
+def parse_ignore_patterns(text):
+    """把 "build, out *_test" 这样的输入拆成通配符列表"""
+    return [p.strip().rstrip("/\\") for p in re.split(r"[,;\s]+", text or "") if p.strip()]
+
+
+def is_ignored(rel_path, patterns):
+    name = os.path.basename(rel_path)
+    rel_path = rel_path.replace(os.sep, "/")
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p) for p in patterns)
+
+
+def collect_source_files(path, ignore=(), extensions=SOURCE_EXTENSIONS):
+    """列出目录下的 C/C++ 源文件，命中忽略规则的目录整棵跳过"""
+    if os.path.isfile(path):
+        return [path]
+    files = []
+    for root, dirs, names in os.walk(path):
+        rel_root = os.path.relpath(root, path)
+        rel_root = "" if rel_root == "." else rel_root
+        # 原地修改 dirs，os.walk 就不会再进入被忽略的目录
+        dirs[:] = [d for d in dirs if not is_ignored(os.path.join(rel_root, d), ignore)]
+        for name in names:
+            if name == GLYPH_CACHE_NAME:
+                continue
+            if name.lower().endswith(extensions) and not is_ignored(os.path.join(rel_root, name), ignore):
+                files.append(os.path.join(root, name))
+    return files
+
+
+def non_ascii_chars(data):
+    """按字节查找 0x80 以上的连续片段再解码，纯 ASCII 的部分不进入 Python 逐字符循环"""
+    chars = set()
+    for run in NON_ASCII_RE.findall(data):
+        chars.update(run.decode("utf-8", errors="ignore"))
+    return chars
+
+
+def _unescape(match):
+    hex_byte, oct_byte, u4, u8, other = match.groups()
+    if hex_byte or oct_byte:
+        # "\xe7\xa1\xae"、"\347\241\256" 这种按 UTF-8 字节转义写的中文
+        return bytes([int(hex_byte, 16) if hex_byte else int(oct_byte, 8) & 0xFF])
+    if u4 or u8:
+        return chr(int(u4 or u8, 16)).encode("utf-8", errors="ignore")
+    return b"" if other.isascii() else other
+
+
+def literal_chars(data):
+    """只提取 C/C++ 字符串和字符常量中的非 ASCII 字符 (跳过注释)
+
+    支持 "\\xe7\\xa1\\xae"、"\\u786e" 这类转义写法；u8""、L"" 等前缀和 R"(...)" 原始字符串不影响识别。
+    相邻的字符串常量先拼接再解码，"\\xe7\\xa1" "\\xae" 这种跨常量的 UTF-8 序列也能识别。
+    """
+    # 既没有非 ASCII 字节也没有 \x、\u、八进制转义的文件直接跳过分词
+    if not GLYPH_HINT_RE.search(data):
+        return set()
+    chars = set()
+    pending = []  # 正在拼接的相邻字符串常量 (已处理转义)
+    last_end = None  # 上一个字符串常量的结束位置；中间只隔着注释时仍算相邻
+    for m in C_TOKEN_RE.finditer(data):
+        token = m.group()
+        if token[:1] == b"/":
+            continue
+        if pending and not (token[:1] != b"'" and last_end is not None
+                            and C_CONCAT_GAP_RE.fullmatch(_strip_comments(data[last_end:m.start()]))):
+            chars |= non_ascii_chars(b"".join(pending))
+            pending = []
+        if m.group("raw") is not None:
+            pending.append(m.group("raw"))
+        else:
+            body = token[1:-1]
+            if b"\\" in body:
+                body = C_ESCAPE_RE.sub(_unescape, body)
+            if token[:1] == b"'":
+                chars |= non_ascii_chars(body)
+                last_end = None
+                continue
+            pending.append(body)
+        last_end = m.end()
+    if pending:
+        chars |= non_ascii_chars(b"".join(pending))
+    return chars
+
+
+def _strip_comments(gap):
+    return re.sub(rb'//[^\n]*|/\*.*?\*/', b" ", gap, flags=re.S)
+
+
+def scan_file_chars(path, literals_only=False):
+    """读取一个文件中的非 ASCII 字符；literals_only 时源码只取字符串常量，翻译表始终整份提取"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if literals_only and path.lower().endswith(SOURCE_EXTENSIONS):
+        return literal_chars(data)
+    return non_ascii_chars(data)
+
+
+class GlyphCache:
+    """按 (文件大小, 修改时间) 缓存每个文件提取出的字符
+
+    缓存保存在扫描目录下的 .lvgl_glyph_cache.json，两种提取方式分开存放。
+    小改动后重新扫描，只有变化的文件会被重新读取。
+    """
+
+    def __init__(self, folder, literals_only, cache_path=None):
+        self.folder = folder
+        self.path = cache_path or os.path.join(folder, GLYPH_CACHE_NAME)
+        self.mode = "literal" if literals_only else "all"
+        self.data = {"version": GLYPH_CACHE_VERSION, "modes": {}}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == GLYPH_CACHE_VERSION:
+                self.data = data
+        except (OSError, ValueError):
+            pass
+        self.entries = self.data["modes"].get(self.mode, {})
+        self.fresh = {}
+
+    def key(self, path):
+        return os.path.relpath(path, self.folder).replace(os.sep, "/")
+
+    def lookup(self, path, st):
+        entry = self.entries.get(self.key(path))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            return set(entry[2])
+        return None
+
+    def store(self, path, st, chars):
+        self.fresh[self.key(path)] = [st.st_size, st.st_mtime_ns, "".join(sorted(chars))]
+
+    def save(self):
+        # 只保留本次扫描到的文件，已删除或被忽略的文件自然淘汰
+        self.data["modes"][self.mode] = self.fresh
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # 目录只读时不缓存，不影响本次结果
+            pass
+
+
+def scan_sources(files, workers=SCAN_WORKERS, progress=None, literals_only=False, cache=None):
+    """在线程池中扫描文件，返回 ({文件路径: 字符集合}, stats)
+
+    progress(done, total) 在调用线程中每完成一批文件回调一次；cache 为 GlyphCache 时未变化的文件直接复用结果。
+    """
+    per_file = {}
+    total = len(files)
+    stats = {"files": total, "scanned": 0, "cached": 0, "failed": 0}
+    done = 0
+
+    def scan_batch(batch):
+        results = []
+        for path in batch:
+            try:
+                st = os.stat(path)
+                chars = cache.lookup(path, st) if cache else None
+                hit = chars is not None
+                if not hit:
+                    chars = scan_file_chars(path, literals_only)
+                results.append((path, st, chars, hit))
+            except OSError:
+                results.append((path, None, None, False))
+        return results
+
+    batches = [files[i:i + FILES_PER_TASK] for i in range(0, total, FILES_PER_TASK)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in as_completed([pool.submit(scan_batch, b) for b in batches]):
+            results = future.result()
+            for path, st, chars, hit in results:
+                if chars is None:
+                    stats["failed"] += 1
+                    continue
+                per_file[path] = chars
+                stats["cached" if hit else "scanned"] += 1
+                if cache:
+                    cache.store(path, st, chars)
+            done += len(results)
+            if progress:
+                progress(done, total)
+    if cache:
+        cache.save()
+    return per_file, stats
+
+
+def glyph_report(per_file, base=""):
+    """生成字形来源报告：每个文件贡献了哪些字符，以及只被一个文件用到的字符"""
+    users = {}
+    for path, chars in per_file.items():
+        for char in chars:
+            users.setdefault(char, []).append(path)
+
+    def rel(path):
+        return os.path.relpath(path, base) if base else path
+
+    lines = [f"共 {len(users)} 个字符，来自 {sum(1 for c in per_file.values() if c)} 个文件", ""]
+    for path in sorted(per_file, key=lambda p: (-len(per_file[p]), p)):
+        if per_file[path]:
+            lines.append(f"[{rel(path)}] {len(per_file[path])} 个")
+            lines.append("    " + "".join(sorted(per_file[path])))
+    single = sorted(char for char, paths in users.items() if len(paths) == 1)
+    if single:
+        lines += ["", f"只出现在一个文件中的字符 ({len(single)} 个):"]
+        lines += [f"    {char}  <- {rel(users[char][0])}" for char in single]
+    return "\n".join(lines)
+
+
+# ================= 字库转换 =================
+
+# 生成的 .c 文件首行记录转换参数的哈希，参数不变时跳过 lv_font_conv
+CONV_HASH_RE = re.compile(r"lvgl_font_tool hash: ([0-9a-f]{64})")
+CONV_HASH_VERSION = 1
+FONT_CODEPOINT_RES = (
+    # 兼容不同版本的 LVGL 注释提取
+    # 模式 1: U+XXXX
+    re.compile(r"U\+([0-9a-fA-F]{2,6})"),
+    # 模式 2: .unicode = 0xXXXX
+    re.compile(r"\.unicode\s*=\s*0x([0-9a-fA-F]+)"),
+)
+
+
+def canonical_symbols(chars):
+    """去重排序后的字符集 (去掉换行等控制字符)，作为 --symbols 参数和哈希输入"""
+    return "".join(sorted(c for c in set(chars) if ord(c) >= 0x20))
+
+
+def read_font_codepoints(path):
+    """从已有 LVGL C 字库中解析出全部码点"""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+    codepoints = set()
+    for pattern in FONT_CODEPOINT_RES:
+        codepoints.update(int(m, 16) for m in pattern.findall(content))
+    return codepoints
+
+
+def conversion_hash(ttf, size, bpp, symbols, options=()):
+    """(字体文件内容, 字号, BPP, 排序后的码点, 其余参数) 的 sha256"""
+    digest = hashlib.sha256()
+    with open(ttf, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    params = {"version": CONV_HASH_VERSION, "size": str(size), "bpp": str(bpp),
+              "codepoints": [ord(c) for c in canonical_symbols(symbols)], "options": list(options)}
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def stored_conversion_hash(out_path):
+    """读取已生成字库开头记录的哈希，没有则返回 None"""
+    try:
+        with open(out_path, "r", encoding="utf-8", errors="ignore") as f:
+            head = f.read(4096)
+    except OSError:
+        return None
+    match = CONV_HASH_RE.search(head)
+    return match.group(1) if match else None
+
+
+def stamp_conversion_hash(out_path, value):
+    """在生成的字库首行写入哈希 (注释行，不影响编译)"""
+    with open(out_path, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(f"/* lvgl_font_tool hash: {value} */\n")
+        f.write(content)
+
+
+def codepoint_diff(old, new):
+    """返回 (新增码点, 删除码点)，均为排序后的列表"""
+    return sorted(new - old), sorted(old - new)
+
+
+def describe_codepoints(codepoints, limit=60):
+    """把码点列表显示成 "确认 (U+786E U+8BA4)" 的形式，过长时截断"""
+    shown = codepoints[:limit]
+    text = "".join(chr(c) for c in shown)
+    codes = " ".join(f"U+{c:04X}" for c in shown)
+    more = f" ... 等 {len(codepoints)} 个" if len(codepoints) > limit else ""
+    return f"{text} ({codes}){more}"
+
+
+# ================= 调用 lv_font_conv =================
+
+# 不经过 shell 时 Windows 命令行上限为 32767 个字符；Linux 单个参数上限 128 KB。统一按保守值处理
+CMDLINE_LIMIT = 30000
+# 经过 cmd.exe (只能找到 npx.cmd 时) 的上限
+SHELL_CMDLINE_LIMIT = 8000
+# cmd.exe 会解释的字符：经过 shell 时 --symbols 中的这些字符改用 --range 的十六进制码点传递，
+# 其余参数 (路径等) 含有时直接报错
+CMD_METACHARS = '&|^<>%"()!'
+# 参数过长时：写入临时 JSON 文件，由 node 读取后调用 lv_font_conv 的 lib/cli.js
+ARGS_FILE_LOADER = (
+    "const fs = require('fs');"
+    "const args = JSON.parse(fs.readFileSync(process.argv[1], 'utf8'));"
+    "require(process.argv[2]).run(args).catch(e => { console.error(e.message || e); process.exit(1); });"
+)
+
+
+@functools.lru_cache(maxsize=None)
+def find_lv_font_conv():
+    """定位 lv_font_conv，返回 {"cmd": 命令前缀, "shell": 是否需要 shell, "cli": lib/cli.js 路径或 None}
+
+    优先用 node 直接运行已安装的 lv_font_conv.js (不经过 shell，也支持参数文件)，
+    其次 node + npm 自带的 npx-cli.js，最后才退回 npx 命令。
+    """
+    node = shutil.which("node")
+    if node:
+        node_dir = os.path.dirname(os.path.realpath(node))
+        prefixes = [os.path.join(os.getcwd(), "node_modules"), os.path.join(node_dir, "node_modules"),
+                    os.path.join(os.path.dirname(node_dir), "lib", "node_modules")]
+        if os.environ.get("APPDATA"):
+            prefixes.append(os.path.join(os.environ["APPDATA"], "npm", "node_modules"))
+        if os.environ.get("NPM_CONFIG_PREFIX"):
+            prefixes.append(os.path.join(os.environ["NPM_CONFIG_PREFIX"], "lib", "node_modules"))
+        for prefix in prefixes:
+            script = os.path.join(prefix, "lv_font_conv", "lv_font_conv.js")
+            if os.path.isfile(script):
+                cli = os.path.join(prefix, "lv_font_conv", "lib", "cli.js")
+                return {"cmd": [node, script], "shell": False, "cli": cli if os.path.isfile(cli) else None}
+        for prefix in prefixes[1:]:
+            npx_cli = os.path.join(prefix, "npm", "bin", "npx-cli.js")
+            if os.path.isfile(npx_cli):
+                return {"cmd": [node, npx_cli, "--yes", "lv_font_conv"], "shell": False, "cli": None}
+    npx = shutil.which("npx")
+    if npx and os.name != "nt":
+        return {"cmd": [npx, "--yes", "lv_font_conv"], "shell": False, "cli": None}
+    # Windows 下只有 npx.cmd 可用时，仍需经过 cmd.exe
+    return {"cmd": ["npx", "--yes", "lv_font_conv"], "shell": os.name == "nt", "cli": None}
+
+
+def _cmdline_cost(text):
+    """参数在命令行上占用的长度：Windows 按 UTF-16 字符，其余按 UTF-8 字节"""
+    if os.name == "nt":
+        return len(text.encode("utf-16-le")) // 2
+    return len(text.encode("utf-8"))
+
+
+def encode_symbols(symbols, unsafe=""):
+    """把字符集拆成连续码点区间 (--range) 和零散字符 (--symbols)
+
+    从排序后的码点中找出连续段，某一段写成 "0x4E00-0x4E2F" 比直接列出字符更短时用区间，
+    否则留在 --symbols 里；unsafe 中的字符总是写成单个码点的区间。
+    返回 {"ranges": ["0x20-0x7E", ...], "symbols": "零散字符"}。
+    """
+    codepoints = sorted({ord(c) for c in symbols})
+    ranges, singles = [], []
+    i = 0
+    while i < len(codepoints):
+        j = i
+        while j + 1 < len(codepoints) and codepoints[j + 1] == codepoints[j] + 1:
+            j += 1
+        start, end = codepoints[i], codepoints[j]
+        span = f"0x{start:X}-0x{end:X}" if end > start else f"0x{start:X}"
+        run = "".join(chr(c) for c in range(start, end + 1))
+        # +1 是 -r 列表中的逗号
+        if end > start and _cmdline_cost(span) + 1 < _cmdline_cost(run):
+            ranges.append(span)
+        else:
+            for c in run:
+                if c in unsafe:
+                    ranges.append(f"0x{ord(c):X}")
+                else:
+                    singles.append(c)
+        i = j + 1
+    return {"ranges": ranges, "symbols": "".join(singles)}
+
+
+def decode_symbols(encoding):
+    """把 encode_symbols 的结果还原成码点集合，用于核对"""
+    codepoints = {ord(c) for c in encoding["symbols"]}
+    for span in encoding["ranges"]:
+        start, _, end = span.partition("-")
+        codepoints.update(range(int(start, 16), int(end or start, 16) + 1))
+    return codepoints
+
+
+def conversion_args(job, encoding):
+    args = ["--font", job["ttf"], "--size", job["size"], "--bpp", job["bpp"]]
+    if encoding["ranges"]:
+        args += ["-r", ",".join(encoding["ranges"])]
+    if encoding["symbols"]:
+        args += ["--symbols", encoding["symbols"]]
+    return args + list(job["options"]) + ["-o", job["out_path"]]
+
+
+def describe_encoding(encoding, mode, length):
+    total = len(decode_symbols(encoding))
+    covered = total - len(set(encoding["symbols"]))
+    return (f"--range {len(encoding['ranges'])} 段 (覆盖 {covered} 个码点) + --symbols {len(encoding['symbols'])} 个字符，"
+            f"还原后共 {total} 个码点与原字符集一致；命令行 {length} 字符，{mode}")
+
+
+# ================= 批量转换 =================
+
+# 默认同时运行的 lv_font_conv 进程数 (每个 node 进程基本只占一个核)
+BATCH_WORKERS = max(1, min(4, os.cpu_count() or 1))
+JOB_NAME_TEMPLATE = "lv_font_{font}_{size}_{bpp}bpp"
+CONV_OPTIONS = ["--format", "lvgl"]
+# "lv_font_conv" 调用 Node.js 官方工具；"python" 用 lvgl_font_native 在本进程生成 (需要 Pillow)
+BACKENDS = ("lv_font_conv", "python")
+# Python 后端可以接受的参数 (本身就不压缩位图、不输出字距表)
+NATIVE_OPTIONS = {"--format", "lvgl", "--no-compress", "--no-prefilter", "--no-kerning"}
+
+
+def font_job(ttf, size, bpp, symbols, out_path, options=(), backend="lv_font_conv"):
+    """一次字库转换的参数"""
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的转换后端: {backend}")
+    return {"ttf": ttf, "size": str(size), "bpp": str(bpp), "symbols": canonical_symbols(symbols),
+            "out_path": out_path, "options": CONV_OPTIONS + list(options), "backend": backend}
+
+
+def load_font_jobs(job_path):
+    """读取批量任务文件，展开 字体 × 字号 × BPP，返回 (任务列表, 并行数)
+
+    任务文件为 JSON，可以是单个任务组，也可以是 {"jobs": [任务组, ...]}：
+        {
+            "fonts": ["fonts/NotoSansSC-Regular.ttf"],
+            "sizes": [12, 16, 20, 24],
+            "bpp": [2, 4],
+            "symbols_file": "chars.txt",        (或 "symbols": "确认取消")
+            "output_dir": "generated",
+            "name": "lv_font_{font}_{size}_{bpp}bpp",
+            "options": ["--no-compress"],
+            "backend": "lv_font_conv",          (或 "python"，不需要 Node.js)
+            "workers": 4
+        }
+    相对路径都以任务文件所在目录为准；顶层的字段作为各任务组的默认值。
+    展开后有两个任务的输出文件相同时抛出 ValueError。
+    """
+    base = os.path.dirname(os.path.abspath(job_path))
+    with open(job_path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    defaults = {k: v for k, v in spec.items() if k != "jobs"}
+    groups = [dict(defaults, **group) for group in spec["jobs"]] if "jobs" in spec else [spec]
+
+    def resolve(path):
+        return os.path.normpath(os.path.join(base, path))
+
+    jobs = []
+    for group in groups:
+        symbols = group.get("symbols", "")
+        if group.get("symbols_file"):
+            with open(resolve(group["symbols_file"]), "r", encoding="utf-8") as f:
+                symbols += f.read()
+        if not canonical_symbols(symbols):
+            raise ValueError("任务组没有指定字符集 (symbols / symbols_file)")
+        out_dir = resolve(group.get("output_dir", "."))
+        template = group.get("name", JOB_NAME_TEMPLATE)
+        fonts = group["fonts"] if isinstance(group["fonts"], list) else [group["fonts"]]
+        sizes = group["sizes"] if isinstance(group["sizes"], list) else [group["sizes"]]
+        bpps = group.get("bpp", [4])
+        bpps = bpps if isinstance(bpps, list) else [bpps]
+        for ttf in fonts:
+            font = re.sub(r"[^a-zA-Z0-9_]", "_", os.path.splitext(os.path.basename(ttf))[0]).lower()
+            for size in sizes:
+                for bpp in bpps:
+                    name = template.format(font=font, size=size, bpp=bpp)
+                    jobs.append(font_job(resolve(ttf), size, bpp, symbols, os.path.join(out_dir, f"{name}.c"),
+                                         group.get("options", ()), group.get("backend", "lv_font_conv")))
+    # 同时运行的任务写同一个文件会互相覆盖，在开始前拒绝
+    seen = {}
+    for job in jobs:
+        key = os.path.normcase(job["out_path"])
+        if key in seen:
+            raise ValueError(f"多个任务输出到同一文件 {job['out_path']}: {describe_job(seen[key])} 与 {describe_job(job)}"
+                             f" (检查 name 模板是否包含 {{size}} / {{bpp}}，或是否重复列出了字体和字号)")
+        seen[key] = job
+    return jobs, spec.get("workers", BATCH_WORKERS)
+
+
+def conversion_cmd(job, encoding=None):
+    """返回 (命令, 是否经过 shell, 命令行长度)"""
+    launcher = find_lv_font_conv()
+    if encoding is None:
+        encoding = encode_symbols(job["symbols"], CMD_METACHARS if launcher["shell"] else "")
+    cmd = launcher["cmd"] + conversion_args(job, encoding)
+    return cmd, launcher["shell"], sum(_cmdline_cost(arg) + 1 for arg in cmd)
+
+
+def run_lv_font_conv(job):
+    """调用 lv_font_conv，返回 (CompletedProcess, 实际命令, 编码说明)
+
+    命令行超出上限时改为把参数写入临时 JSON 文件再交给 lib/cli.js (需要本地或全局安装 lv_font_conv)。
+    必须经过 cmd.exe 时，字符集里的 cmd 特殊字符改用码点区间传递，不会被 shell 解释。
+    """
+    launcher = find_lv_font_conv()
+    shell = launcher["shell"]
+    encoding = encode_symbols(job["symbols"], CMD_METACHARS if shell else "")
+    if decode_symbols(encoding) != {ord(c) for c in job["symbols"]}:
+        raise ValueError("码点区间编码与原字符集不一致")
+    cmd, _, length = conversion_cmd(job, encoding)
+    if length <= (SHELL_CMDLINE_LIMIT if shell else CMDLINE_LIMIT):
+        mode = "经 cmd.exe 调用 npx" if shell else "直接传参"
+        if shell:
+            unsafe = [arg for arg in cmd if any(c in CMD_METACHARS for c in arg)]
+            if unsafe:
+                raise ValueError(f"参数含有 cmd.exe 特殊字符 ({CMD_METACHARS})，无法经 npx.cmd 传递: "
+                                 f"{' '.join(unsafe)} (请执行 npm install -g lv_font_conv 后重试)")
+        proc = subprocess.run(cmd if not shell else subprocess.list2cmdline(cmd), capture_output=True,
+                              text=True, encoding="utf-8", errors="replace", shell=shell)
+        return proc, cmd, describe_encoding(encoding, mode, length)
+    if not launcher["cli"]:
+        raise OSError(f"字符集过大，命令行长度 {length} 超出上限，且未找到本地安装的 lv_font_conv"
+                      f" (请执行 npm install -g lv_font_conv 后重试)")
+    fd, args_path = tempfile.mkstemp(prefix="lv_font_conv_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(conversion_args(job, encoding), f, ensure_ascii=False)
+        node_cmd = [launcher["cmd"][0], "-e", ARGS_FILE_LOADER, args_path, launcher["cli"]]
+        proc = subprocess.run(node_cmd, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    finally:
+        os.remove(args_path)
+    return proc, cmd, describe_encoding(encoding, f"参数文件 (命令行 {length} 字符超出上限)", length)
+
+
+def run_native(job, workers=None):
+    """用 Python 后端生成字库，返回结果摘要"""
+    unsupported = [opt for opt in job["options"] if opt not in NATIVE_OPTIONS]
+    if unsupported:
+        raise ValueError(f"Python 后端不支持参数: {' '.join(unsupported)}")
+    try:
+        import lvgl_font_native
+    except ImportError as e:
+        raise OSError(f"Python 后端需要 Pillow (pip install Pillow): {e}")
+    stats = lvgl_font_native.generate_font(job["ttf"], job["size"], job["bpp"], job["symbols"], job["out_path"],
+                                           workers or lvgl_font_native.NATIVE_WORKERS)
+    cmaps = "，".join(f"{kind} {count} 个" for kind, count in sorted(stats["cmaps"].items()))
+    summary = (f"Python 后端: {stats['glyphs']} 个字形，位图 {stats['bitmap_bytes']} 字节，cmap 子表 {cmaps}，"
+               f"{stats['elapsed']:.1f} s")
+    if stats["missing"]:
+        # lv_font_conv 同样会跳过字体里没有的字符，这里在日志中列出来
+        summary += f"；字体中缺少 {len(stats['missing'])} 个字符: {describe_codepoints(stats['missing'])}"
+    return summary
+
+
+def convert_font(job, force=False, glyph_workers=None):
+    """执行一个转换任务，返回结果字典
+
+    status 为 "ok" / "skipped" (参数未变化) / "failed"；added/removed 是相对现有字库的码点变化。
+    glyph_workers 是 Python 后端栅格化用的进程数。
+    """
+    start = time.perf_counter()
+    result = {"status": "failed", "returncode": None, "stdout": "", "stderr": "", "cmd": [], "encoding": "",
+              "added": [], "removed": [], "elapsed": 0.0}
+    try:
+        # 两个后端的输出不同，切换后端要重新生成；lv_font_conv 保持原来的哈希
+        options = job["options"] + (["--backend", job["backend"]] if job["backend"] != "lv_font_conv" else [])
+        new_hash = conversion_hash(job["ttf"], job["size"], job["bpp"], job["symbols"], options)
+        if os.path.exists(job["out_path"]):
+            result["added"], result["removed"] = codepoint_diff(read_font_codepoints(job["out_path"]),
+                                                                {ord(c) for c in job["symbols"]})
+            if not force and stored_conversion_hash(job["out_path"]) == new_hash:
+                result["status"] = "skipped"
+                return result
+        os.makedirs(os.path.dirname(job["out_path"]) or ".", exist_ok=True)
+        if job["backend"] == "python":
+            result["encoding"] = run_native(job, glyph_workers)
+            result["returncode"] = 0
+        else:
+            proc, result["cmd"], result["encoding"] = run_lv_font_conv(job)
+            result.update(returncode=proc.returncode, stdout=proc.stdout, stderr=proc.stderr)
+        if result["returncode"] == 0:
+            stamp_conversion_hash(job["out_path"], new_hash)
+            result["status"] = "ok"
+    except (OSError, ValueError) as e:
+        result["stderr"] = str(e)
+    except Exception as e:
+        # 字体损坏、Pillow/struct 出错等意外异常只让本任务失败，批量中其余任务照常进行
+        result["stderr"] = f"{type(e).__name__}: {e}"
+    finally:
+        result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def run_font_jobs(jobs, workers=BATCH_WORKERS, force=False, on_result=None):
+    """用有界线程池同时运行多个 lv_font_conv 进程，按任务顺序返回结果
+
+    on_result(done, total, job, result) 在调用线程中逐个回调。
+    """
+    results = [None] * len(jobs)
+    workers = max(1, min(workers, len(jobs)))
+    # Python 后端每个任务自己再开进程池栅格化，按同时运行的任务数分摊 CPU
+    glyph_workers = max(1, (os.cpu_count() or 1) // workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(convert_font, job, force, glyph_workers): i for i, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result:
+                on_result(done, len(jobs), jobs[i], results[i])
+    return results
+
+
+def job_backends(jobs):
+    """任务用到的转换后端名，多个时用 / 连接 (如 lv_font_conv/python)"""
+    return "/".join(sorted({job["backend"] for job in jobs}))
+
+
+def describe_job(job):
+    backend = ", Python 后端" if job["backend"] == "python" else ""
+    return f"{os.path.basename(job['out_path'])} ({os.path.basename(job['ttf'])} {job['size']}px {job['bpp']}bpp{backend})"
+
+
 class LVGLFontTool:
     def __init__(self, root):
         self.root = root
         self.root.title("LVGL 字体助手")
-        self.root.geometry("800x750")
+        self.root.geometry("800x850")
         self.setup_ui()
 
     def setup_ui(self):
@@ -36,10 +689,27 @@ class LVGLFontTool:
         ttk.Entry(group1, textvariable=self.src_path).grid(row=0, column=1, sticky="ew", padx=5)
         ttk.Button(group1, text="浏览", command=self.select_src).grid(row=0, column=2)
         
+        ttk.Label(group1, text="忽略目录/文件 (通配符):").grid(row=1, column=0, sticky="w", pady=(5, 0))
+        self.ignore_text = tk.StringVar(value=DEFAULT_IGNORE)
+        ttk.Entry(group1, textvariable=self.ignore_text).grid(row=1, column=1, sticky="ew", padx=5, pady=(5, 0))
+        group1.columnconfigure(1, weight=1)
+
+        opt_frame = ttk.Frame(group1)
+        opt_frame.grid(row=2, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        self.literals_only = tk.BooleanVar(value=True)
+        ttk.Checkbutton(opt_frame, text="只提取字符串常量 (跳过注释)", variable=self.literals_only).pack(side="left")
+        self.include_i18n = tk.BooleanVar(value=False)
+        ttk.Checkbutton(opt_frame, text="包含翻译表 (.po/.json/.csv 等)", variable=self.include_i18n).pack(side="left", padx=10)
+
         btn_frame = ttk.Frame(group1)
-        btn_frame.grid(row=1, column=0, columnspan=3, pady=10)
-        ttk.Button(btn_frame, text="🔍 从源码提取汉字", command=self.extract_from_src).pack(side="left", padx=10)
+        btn_frame.grid(row=3, column=0, columnspan=3, pady=10)
+        self.scan_btn = ttk.Button(btn_frame, text="🔍 从源码提取汉字", command=self.extract_from_src)
+        self.scan_btn.pack(side="left", padx=10)
         ttk.Button(btn_frame, text="🔄 逆向解析现有C字库", command=self.extract_from_c_font).pack(side="left", padx=10)
+        self.report_btn = ttk.Button(btn_frame, text="📄 字形来源", command=self.show_glyph_report, state='disabled')
+        self.report_btn.pack(side="left", padx=10)
+        self.glyph_sources = {}
+        self.glyph_base = ""
 
         # --- 2. 字符集编辑区域 ---
         group2 = ttk.LabelFrame(main_frame, text=" 2. 待转换字符集 (可直接编辑) ", padding=10)
@@ -82,13 +752,40 @@ class LVGLFontTool:
         self.font_name = tk.StringVar(value="lv_font_custom_16")
         ttk.Entry(params, textvariable=self.font_name, width=20).pack(side="left", padx=5)
 
+        self.force_rebuild = tk.BooleanVar(value=False)
+        ttk.Checkbutton(params, text="强制重新生成", variable=self.force_rebuild).pack(side="left", padx=(10, 0))
+
+        backend_frame = ttk.Frame(group3)
+        backend_frame.grid(row=2, column=0, columnspan=3, sticky="w")
+        ttk.Label(backend_frame, text="转换后端:").pack(side="left")
+        self.backend = tk.StringVar(value=BACKENDS[0])
+        ttk.Combobox(backend_frame, textvariable=self.backend, values=list(BACKENDS), width=12,
+                     state="readonly").pack(side="left", padx=5)
+        ttk.Label(backend_frame, text="(python: 用 Pillow 在本机生成，无需 Node.js；批量任务以任务文件为准)",
+                  foreground="gray").pack(side="left")
+
         # --- 4. 执行按钮 ---
-        self.run_btn = ttk.Button(main_frame, text="🔨 调用 lv_font_conv 生成字库", style="Big.TButton", command=self.run_conversion)
-        self.run_btn.pack(fill="x", pady=10)
+        run_frame = ttk.Frame(main_frame)
+        run_frame.pack(fill="x", pady=10)
+        self.run_btn = ttk.Button(run_frame, text="🔨 调用 lv_font_conv 生成字库", style="Big.TButton", command=self.run_conversion)
+        self.run_btn.pack(side="left", fill="x", expand=True)
+        self.batch_btn = ttk.Button(run_frame, text="📋 批量任务...", style="Big.TButton", command=self.run_batch)
+        self.batch_btn.pack(side="left", padx=(10, 0))
 
         self.status_label = ttk.Label(main_frame, text="就绪", foreground="gray")
         self.status_label.pack(anchor="w")
 
+        # --- 5. 日志 ---
+        log_frame = ttk.LabelFrame(main_frame, text=" 日志 ", padding=5)
+        log_frame.pack(fill="both", pady=5)
+        self.log_text = scrolledtext.ScrolledText(log_frame, height=6, state='disabled', font=("Consolas", 9))
+        self.log_text.pack(fill="both", expand=True)
+        self.log_sink = LogSink(self.root, self.log_text)
+
+    def log(self, msg):
+        """任意线程可调用，主线程定时批量刷新到日志框"""
+        self.log_sink.write(msg)
+
     def select_src(self):
         path = filedialog.askopenfilename(title="选择文件") or filedialog.askdirectory(title="选择源码目录")
         if path: self.src_path.set(path)
@@ -112,25 +809,57 @@ class LVGLFontTool:
             messagebox.showwarning("提示", "请先选择有效的源码目录或文件")
             return
         
-        chars = set()
-        files = [path] if os.path.isfile(path) else []
-        if not files:
-            for r, d, fs in os.walk(path):
-                for f in fs:
-                    if f.endswith(('.c', '.h', '.cpp', '.hpp')):
-                        files.append(os.path.join(r, f))
-        
-        for f_path in files:
-            try:
-                with open(f_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    # 匹配双引号内的中文字符
-                    for char in content:
-                        if ord(char) > 127: chars.add(char)
-            except: continue
-        
-        self.char_text.insert(tk.END, "".join(sorted(list(chars))))
-        self.status_label.config(text=f"从源码中提取了 {len(chars)} 个非ASCII字符")
+        ignore = parse_ignore_patterns(self.ignore_text.get())
+        literals_only = self.literals_only.get()
+        extensions = SOURCE_EXTENSIONS + (I18N_EXTENSIONS if self.include_i18n.get() else ())
+        self.scan_btn.config(state='disabled')
+        self.status_label.config(text="正在扫描源码...", foreground="blue")
+        threading.Thread(target=self.scan_worker, args=(path, ignore, literals_only, extensions), daemon=True).start()
+
+    def scan_worker(self, path, ignore, literals_only=True, extensions=SOURCE_EXTENSIONS):
+        """后台线程：收集文件并并行扫描，结果交回主线程"""
+        try:
+            files = collect_source_files(path, ignore, extensions)
+            # 单个文件不值得缓存；目录扫描按 (大小, 修改时间) 复用上次的结果
+            cache = GlyphCache(path, literals_only) if os.path.isdir(path) else None
+            self.log(f"找到 {len(files)} 个文件，开始扫描 ({'字符串常量' if literals_only else '全部非ASCII字符'})")
+            step = max(1, len(files) // 100)
+            last = [0]
+
+            def progress(done, total):
+                # 约每 1% 刷新一次状态栏
+                if done - last[0] >= step or done == total:
+                    last[0] = done
+                    self.root.after(0, lambda: self.status_label.config(text=f"扫描中 {done}/{total}"))
+
+            per_file, stats = scan_sources(files, progress=progress, literals_only=literals_only, cache=cache)
+            base = path if os.path.isdir(path) else os.path.dirname(path)
+            self.root.after(0, self.scan_done, per_file, stats, base)
+        except Exception as e:
+            self.log(f"扫描失败: {e}")
+            self.root.after(0, lambda: self.status_label.config(text="扫描失败", foreground="red"))
+            self.root.after(0, lambda: self.scan_btn.config(state='normal'))
+
+    def scan_done(self, per_file, stats, base):
+        chars = set().union(*per_file.values())
+        self.char_text.insert(tk.END, "".join(sorted(chars)))
+        self.status_label.config(text=f"从源码中提取了 {len(chars)} 个非ASCII字符", foreground="gray")
+        note = f"，{stats['failed']} 个文件无法读取" if stats["failed"] else ""
+        self.log(f"扫描 {stats['files']} 个文件 (重新读取 {stats['scanned']}，缓存 {stats['cached']})，"
+                 f"{sum(1 for c in per_file.values() if c)} 个文件含非ASCII字符，共 {len(chars)} 个{note}")
+        self.glyph_sources = per_file
+        self.glyph_base = base
+        self.scan_btn.config(state='normal')
+        self.report_btn.config(state='normal')
+
+    def show_glyph_report(self):
+        """弹窗显示每个文件贡献了哪些字符"""
+        win = tk.Toplevel(self.root)
+        win.title("字形来源")
+        txt = scrolledtext.ScrolledText(win, width=80, height=30, font=("Consolas", 10))
+        txt.insert(tk.END, glyph_report(self.glyph_sources, self.glyph_base))
+        txt.config(state='disabled')
+        txt.pack(fill="both", expand=True, padx=10, pady=10)
 
     def extract_from_c_font(self):
         path = self.src_path.get()
@@ -138,27 +867,18 @@ class LVGLFontTool:
             messagebox.showwarning("提示", "请先选择现有的 C 字库文件")
             return
         
-        chars = set()
         try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-                # 兼容不同版本的 LVGL 注释提取
-                # 模式 1: U+XXXX
-                matches = re.findall(r"U\+([0-9a-fA-F]{2,6})", content)
-                for m in matches:
-                    chars.add(chr(int(m, 16)))
-                # 模式 2: .unicode = 0xXXXX
-                matches = re.findall(r"\.unicode\s*=\s*0x([0-9a-fA-F]+)", content)
-                for m in matches:
-                    chars.add(chr(int(m, 16)))
-            
+            chars = {chr(c) for c in read_font_codepoints(path)}
+
             # 清空并填入提取结果
             current = self.char_text.get("1.0", tk.END).strip()
             all_chars = "".join(sorted(list(chars | set(current))))
             self.char_text.delete("1.0", tk.END)
             self.char_text.insert("1.0", all_chars)
             self.status_label.config(text=f"从 C 文件中提取/合并了 {len(chars)} 个字符")
+            self.log(f"{os.path.basename(path)}: 提取 {len(chars)} 个码点，合并后共 {len(all_chars)} 个字符")
         except Exception as e:
+            self.log(f"解析失败: {e}")
             messagebox.showerror("解析失败", str(e))
 
     def run_conversion(self):
@@ -166,7 +886,7 @@ class LVGLFontTool:
         size = self.font_size.get()
         bpp = self.bpp.get()
         name = self.font_name.get()
-        chars = self.char_text.get("1.0", tk.END).strip()
+        chars = canonical_symbols(self.char_text.get("1.0", tk.END))
         
         if not ttf or not os.path.exists(ttf):
             messagebox.showerror("错误", "请选择有效的 TTF 字体文件")
@@ -176,41 +896,130 @@ class LVGLFontTool:
             return
 
         out_path = os.path.join(os.path.dirname(ttf), f"{name}.c")
-        
-        # 构建 lv_font_conv 命令
-        # 使用 npx 确保不需要全局安装也能尝试运行
-        cmd = [
-            "npx", "lv_font_conv",
-            "--font", ttf,
-            "--size", size,
-            "--bpp", bpp,
-            "--symbols", chars,
-            "--format", "lvgl",
-            "-o", out_path
-        ]
-
-        self.status_label.config(text="正在转换中，请稍候...", foreground="blue")
-        self.root.update()
+        self.start_jobs([font_job(ttf, size, bpp, chars, out_path, backend=self.backend.get())], 1)
 
+    def run_batch(self):
+        path = filedialog.askopenfilename(title="选择批量任务文件", filetypes=[("任务文件", "*.json")])
+        if not path:
+            return
         try:
-            # shell=True 在 Windows 下调用 npx 是必须的
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-            if result.returncode == 0:
-                self.status_label.config(text=f"成功生成: {out_path}", foreground="green")
-                messagebox.showinfo("完成", f"字库文件已成功生成！\n保存路径: {out_path}")
+            jobs, workers = load_font_jobs(path)
+        except (OSError, ValueError, KeyError) as e:
+            messagebox.showerror("任务文件错误", str(e))
+            return
+        self.log(f"任务文件 {os.path.basename(path)}: {len(jobs)} 个字库，{workers} 个并行")
+        self.start_jobs(jobs, workers)
+
+    def start_jobs(self, jobs, workers):
+        """在后台线程中运行转换任务，界面保持响应"""
+        self.run_btn.config(state='disabled')
+        self.batch_btn.config(state='disabled')
+        self.status_label.config(text=f"正在转换 0/{len(jobs)}，请稍候...", foreground="blue")
+        force = self.force_rebuild.get()
+        threading.Thread(target=self.jobs_worker, args=(jobs, workers, force), daemon=True).start()
+
+    def jobs_worker(self, jobs, workers, force):
+        def on_result(done, total, job, result):
+            label = describe_job(job)
+            if result["added"] or result["removed"]:
+                self.log(f"{label} 与现有字库相比: 新增 {len(result['added'])} 个，删除 {len(result['removed'])} 个")
+                if result["added"]:
+                    self.log(f"  + {describe_codepoints(result['added'])}")
+                if result["removed"]:
+                    self.log(f"  - {describe_codepoints(result['removed'])}")
+            if result["encoding"]:
+                self.log(f"{label} 码点编码: {result['encoding']}")
+            if result["status"] == "skipped":
+                self.log(f"[{done}/{total}] {label}: 字体、参数和字符集均未变化，跳过")
+            elif result["status"] == "ok":
+                self.log(f"[{done}/{total}] {label}: 成功 ({result['elapsed']:.1f} s)")
             else:
-                self.status_label.config(text="转换失败", foreground="red")
-                # 弹出详细错误信息
-                err_window = tk.Toplevel(self.root)
-                err_window.title("转换错误详情")
-                err_txt = scrolledtext.ScrolledText(err_window, width=80, height=20)
-                err_txt.insert(tk.END, f"命令: {' '.join(cmd)}\n\n错误输出:\n{result.stderr}\n\n标准输出:\n{result.stdout}")
-                err_txt.pack(padx=10, pady=10)
+                self.log(f"[{done}/{total}] {label}: 失败 (返回码 {result['returncode']})")
+            self.root.after(0, lambda: self.status_label.config(text=f"正在转换 {done}/{total}，请稍候..."))
+
+        try:
+            for job in jobs:
+                self.log(f"开始转换: {describe_job(job)}，共 {len(job['symbols'])} 个字符")
+            results = run_font_jobs(jobs, workers, force, on_result)
+            self.root.after(0, self.jobs_done, jobs, results)
         except Exception as e:
+            self.log(f"无法调用 {job_backends(jobs)} 后端: {e}")
+            self.root.after(0, self.jobs_done, jobs, None, str(e))
+
+    def jobs_done(self, jobs, results, error=None):
+        self.run_btn.config(state='normal')
+        self.batch_btn.config(state='normal')
+        if results is None:
             self.status_label.config(text="系统错误", foreground="red")
-            messagebox.showerror("错误", f"无法调用转换工具，请检查是否安装了 Node.js。\n{str(e)}")
+            hint = "请检查是否安装了 Node.js" if any(job["backend"] == "lv_font_conv" for job in jobs) \
+                else "请检查是否安装了 Pillow"
+            messagebox.showerror("错误", f"无法调用 {job_backends(jobs)} 后端，{hint}。\n{error}")
+            return
+        failed = [(job, r) for job, r in zip(jobs, results) if r["status"] == "failed"]
+        skipped = sum(1 for r in results if r["status"] == "skipped")
+        if failed:
+            self.status_label.config(text=f"转换失败 {len(failed)}/{len(jobs)}", foreground="red")
+            # 弹出详细错误信息
+            err_window = tk.Toplevel(self.root)
+            err_window.title("转换错误详情")
+            err_txt = scrolledtext.ScrolledText(err_window, width=80, height=20)
+            for job, r in failed:
+                command = ' '.join(r['cmd']) if r['cmd'] else f"{job['backend']} 后端"
+                err_txt.insert(tk.END, f"== {describe_job(job)}\n命令: {command}\n\n"
+                                       f"错误输出:\n{r['stderr']}\n\n标准输出:\n{r['stdout']}\n\n")
+            err_txt.pack(padx=10, pady=10)
+        elif len(jobs) == 1:
+            out_path = jobs[0]["out_path"]
+            if skipped:
+                self.status_label.config(text=f"字库无变化，跳过转换: {out_path}", foreground="green")
+            else:
+                self.status_label.config(text=f"成功生成: {out_path}", foreground="green")
+                messagebox.showinfo("完成", f"字库文件已成功生成！\n保存路径: {out_path}")
+        else:
+            self.status_label.config(text=f"批量完成: 生成 {len(jobs) - skipped} 个，未变化 {skipped} 个", foreground="green")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LVGL 字体助手 (不带参数运行则启动界面)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_batch = sub.add_parser("batch", help="按任务文件批量生成字库 (字体 × 字号 × BPP)")
+    p_batch.add_argument("job_file", help="JSON 任务文件")
+    p_batch.add_argument("-j", "--jobs", type=int, default=None, help="同时运行的 lv_font_conv 进程数 (默认取任务文件中的 workers)")
+    p_batch.add_argument("--force", action="store_true", help="忽略哈希，全部重新生成")
+    p_batch.add_argument("--backend", choices=BACKENDS, default=None, help="覆盖任务文件中的转换后端")
+
+    args = parser.parse_args(argv)
+
+    try:
+        jobs, workers = load_font_jobs(args.job_file)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"任务文件错误: {e}")
+    if args.backend:
+        for job in jobs:
+            job["backend"] = args.backend
+
+    def on_result(done, total, job, result):
+        state = {"ok": "已生成", "skipped": "无变化，跳过", "failed": "失败"}[result["status"]]
+        diff = f" (+{len(result['added'])} -{len(result['removed'])})" if result["added"] or result["removed"] else ""
+        print(f"[{done}/{total}] {state}: {describe_job(job)}{diff} {result['elapsed']:.1f} s", file=sys.stderr)
+        if result["encoding"]:
+            print(f"    {result['encoding']}", file=sys.stderr)
+        if result["status"] == "failed":
+            print(result["stderr"] or result["stdout"], file=sys.stderr)
+
+    results = run_font_jobs(jobs, args.jobs or workers, args.force, on_result)
+    failed = sum(1 for r in results if r["status"] == "failed")
+    skipped = sum(1 for r in results if r["status"] == "skipped")
+    print(f"共 {len(jobs)} 个字库: 生成 {len(jobs) - failed - skipped} 个，未变化 {skipped} 个，失败 {failed} 个")
+    return 1 if failed else 0
+
 
 if __name__ == "__main__":
+    # Python 后端用多进程栅格化，打包成 exe 后需要
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(main())
     root = tk.Tk()
     app = LVGLFontTool(root)
     root.mainloop()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+波形数据导出 (CSV / NPY / 16-bit WAV)
+
+所有导出函数接收若干段一维整型数组 (segments)，例如环形缓冲区的两段切片
+或录制时按批次追加的数据块，逐块转换并写盘，不会把整段数据拼接或一次性
+转换成浮点/文本，因此导出百万级采样点时内存占用不会翻倍。
+"""
+import os
+import wave
+
+import numpy as np
+
+EXPORT_CHUNK_SAMPLES = 65536
+WAV_SAMPLE_MIN = -32768
+WAV_SAMPLE_MAX = 32767
+
+EXPORT_FILTERS = {
+    ".csv": "CSV (*.csv)",
+    ".npy": "NumPy (*.npy)",
+    ".wav": "WAV 16-bit (*.wav)",
+}
+
+
+def total_samples(segments):
+    return sum(len(segment) for segment in segments)
+
+
+def iter_chunks(segments, chunk_size=EXPORT_CHUNK_SAMPLES):
+    """按顺序遍历所有数据段，每次产出不超过 chunk_size 的视图 (不复制)"""
+    for segment in segments:
+        for start in range(0, len(segment), chunk_size):
+            yield segment[start : start + chunk_size]
+
+
+def _report(progress, done, total):
+    if progress is not None:
+        progress(done, total)
+
+
+def export_csv(path, segments, sample_rate, volts_per_count, progress=None):
+    total = total_samples(segments)
+    period = 1.0 / sample_rate
+    done = 0
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        handle.write("index,time_s,raw,voltage_v\n")
+        for chunk in iter_chunks(segments):
+            index = np.arange(done, done + len(chunk))
+            columns = np.column_stack((index, index * period, chunk, chunk * volts_per_count))
+            np.savetxt(handle, columns, fmt=("%d", "%.9g", "%d", "%.9g"), delimiter=",")
+            done += len(chunk)
+            _report(progress, done, total)
+    return total
+
+
+def export_npy(path, segments, progress=None):
+    total = total_samples(segments)
+    dtype = np.result_type(*segments) if segments else np.int32
+    if total == 0:
+        np.save(path, np.empty(0, dtype=dtype))
+        return 0
+    # open_memmap 先写好 .npy 头，再按块落盘，避免在内存中拼出完整数组
+    output = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(total,))
+    done = 0
+    try:
+        for chunk in iter_chunks(segments):
+            output[done : done + len(chunk)] = chunk
+            done += len(chunk)
+            _report(progress, done, total)
+        output.flush()
+    finally:
+        del output
+    return total
+
+
+def wav_gain(segments):
+    """WAV 只有 16 bit：采样值超出 int16 范围 (例如 24 bit ADC) 时按整段峰值等比缩小，否则原样写入"""
+    peak = 0
+    for segment in segments:
+        if len(segment):
+            peak = max(peak, int(segment.max()), -int(segment.min()) - 1)
+    return 1.0 if peak <= WAV_SAMPLE_MAX else WAV_SAMPLE_MAX / peak
+
+
+def export_wav(path, segments, sample_rate, progress=None):
+    """导出单声道 16-bit PCM WAV，可直接交给 wav_to_c_array.py 转为 C 数组
+
+    先遍历一遍求峰值，超出 16 bit 范围时整体缩放 (见 wav_gain)，不会静默削顶。
+    """
+    total = total_samples(segments)
+    framerate = max(1, int(round(sample_rate)))
+    gain = wav_gain(segments)
+    done = 0
+    with wave.open(path, "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(framerate)
+        for chunk in iter_chunks(segments):
+            if gain != 1.0:
+                chunk = np.rint(chunk * gain)
+            frames = np.clip(chunk, WAV_SAMPLE_MIN, WAV_SAMPLE_MAX).astype("<i2")
+            handle.writeframesraw(frames.tobytes())
+            done += len(chunk)
+            _report(progress, done, total)
+    return total
+
+
+def export_samples(path, segments, sample_rate, volts_per_count, progress=None):
+    """根据扩展名选择导出格式，返回写入的采样点数"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return export_csv(path, segments, sample_rate, volts_per_count, progress)
+    if ext == ".npy":
+        return export_npy(path, segments, progress)
+    if ext == ".wav":
+        return export_wav(path, segments, sample_rate, progress)
+    raise ValueError(f"不支持的导出格式: {ext or path}")
@@ -14,6 +14,7 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 from serial.tools import list_ports
 
 from alc.alc_config import ALC_PARAM_CONFIG
+from export.waveform_export import EXPORT_FILTERS, export_samples, total_samples
 
 # ========== Waveform parameters ==========
 DEFAULT_BUFFER_SIZE = 1024
@@ -461,6 +462,12 @@ class ALCSettingsDialog(QtWidgets.QDialog):
         return errors
 
 
+class ExportSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(int)
+    finished = QtCore.pyqtSignal(str, int)
+    failed = QtCore.pyqtSignal(str)
+
+
 class SerialWaveformWindow(QtWidgets.QMainWindow):
     def __init__(self):
         super().__init__()
@@ -491,6 +498,13 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
         self.buffer_pos = 0
         self.sample_count = 0
         self.is_paused = False
+        self.is_recording = False
+        self.capture_chunks = []
+        self.export_thread = None
+        self.export_signals = ExportSignals()
+        self.export_signals.progress.connect(self.on_export_progress)
+        self.export_signals.finished.connect(self.on_export_finished)
+        self.export_signals.failed.connect(self.on_export_failed)
 
         self.setWindowTitle("Serial Real-Time Waveform")
         self._build_ui()
@@ -552,6 +566,20 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
         self.alc_button.clicked.connect(self.open_alc_settings)
         ctrl_layout.addWidget(self.alc_button)
 
+        self.record_button = QtWidgets.QPushButton("Record")
+        self.record_button.setCheckable(True)
+        self.record_button.toggled.connect(self.toggle_record)
+        ctrl_layout.addWidget(self.record_button)
+
+        self.export_view_button = QtWidgets.QPushButton("Export View")
+        self.export_view_button.clicked.connect(self.export_view)
+        ctrl_layout.addWidget(self.export_view_button)
+
+        self.export_capture_button = QtWidgets.QPushButton("Export Capture")
+        self.export_capture_button.clicked.connect(self.export_capture)
+        self.export_capture_button.setEnabled(False)
+        ctrl_layout.addWidget(self.export_capture_button)
+
         ctrl_layout.addStretch()
         main_layout.addLayout(ctrl_layout)
 
@@ -564,7 +592,14 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
         self.vpp_label = QtWidgets.QLabel("Vpp: --")
         self.rms_label = QtWidgets.QLabel("RMS: --")
         self.freq_label = QtWidgets.QLabel("Freq: --")
+        self.capture_label = QtWidgets.QLabel("")
+        self.export_progress = QtWidgets.QProgressBar()
+        self.export_progress.setRange(0, 100)
+        self.export_progress.setFixedWidth(120)
+        self.export_progress.hide()
         status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.capture_label)
+        status_layout.addWidget(self.export_progress)
         status_layout.addStretch()
         status_layout.addWidget(self.latest_label)
         status_layout.addWidget(self.min_label)
@@ -985,6 +1020,7 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
         updated = False
         latest_value = None
         count = 0
+        recorded = [] if self.is_recording else None
 
         while True:
             try:
@@ -993,6 +1029,8 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
                 break
             self.data_buffer[self.buffer_pos] = value
             self.buffer_pos = (self.buffer_pos + 1) % self.buffer_size
+            if recorded is not None:
+                recorded.append(value)
             latest_value = value
             count += 1
             updated = True
@@ -1001,6 +1039,9 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
             return
 
         self.sample_count += count
+        if recorded:
+            self.capture_chunks.append(np.array(recorded, dtype=np.int32))
+            self.capture_label.setText(f"Capture: {total_samples(self.capture_chunks)}")
         y_data = self._ordered_buffer() * self.volts_per_count
         self.curve.setData(self.x_data, y_data)
 
@@ -1085,6 +1126,91 @@ class SerialWaveformWindow(QtWidgets.QMainWindow):
             if " [Paused]" in current_status:
                 self.status_label.setText(current_status.replace(" [Paused]", ""))
 
+    def toggle_record(self, checked):
+        self.is_recording = checked
+        if checked:
+            self.capture_chunks = []
+            self.record_button.setText("Stop Rec")
+            self.capture_label.setText("Capture: 0")
+        else:
+            self.record_button.setText("Record")
+        self.export_capture_button.setEnabled(not checked and bool(self.capture_chunks))
+
+    def _snapshot_segments(self):
+        # 按时间顺序返回环形缓冲区的两段副本，导出线程不受后续刷新影响；
+        # 缓冲区还没写满时只导出已接收的部分，不带开头未填充的 0
+        pos = self.buffer_pos
+        if self.sample_count < self.buffer_size:
+            return [self.data_buffer[max(0, pos - self.sample_count):pos].copy()]
+        return [self.data_buffer[pos:].copy(), self.data_buffer[:pos].copy()]
+
+    def export_view(self):
+        self.start_export(self._snapshot_segments(), "waveform_view")
+
+    def export_capture(self):
+        if not self.capture_chunks:
+            QtWidgets.QMessageBox.information(self, "Export", "没有已录制的数据")
+            return
+        # 录制已停止，数据块不会再被修改，直接交给导出线程
+        self.start_export(list(self.capture_chunks), "waveform_capture")
+
+    def start_export(self, segments, default_name):
+        if self.export_thread and self.export_thread.is_alive():
+            QtWidgets.QMessageBox.warning(self, "Export", "正在导出，请稍候")
+            return
+
+        path, selected_filter = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "导出波形数据",
+            os.path.join(os.getcwd(), default_name + ".csv"),
+            ";;".join(EXPORT_FILTERS.values()),
+        )
+        if not path:
+            return
+        if os.path.splitext(path)[1].lower() not in EXPORT_FILTERS:
+            for ext, name in EXPORT_FILTERS.items():
+                if name == selected_filter:
+                    path += ext
+                    break
+
+        sample_rate = self.sample_rate
+        volts_per_count = self.volts_per_count
+        signals = self.export_signals
+
+        def progress(done, total):
+            signals.progress.emit(int(done * 100 / total) if total else 100)
+
+        def run():
+            try:
+                written = export_samples(path, segments, sample_rate, volts_per_count, progress)
+            except Exception as exc:
+                signals.failed.emit(str(exc))
+            else:
+                signals.finished.emit(path, written)
+
+        self.export_progress.setValue(0)
+        self.export_progress.show()
+        self.export_view_button.setEnabled(False)
+        self.export_capture_button.setEnabled(False)
+        self.export_thread = threading.Thread(target=run, daemon=True)
+        self.export_thread.start()
+
+    def _export_done(self):
+        self.export_progress.hide()
+        self.export_view_button.setEnabled(True)
+        self.export_capture_button.setEnabled(not self.is_recording and bool(self.capture_chunks))
+
+    def on_export_progress(self, percent):
+        self.export_progress.setValue(percent)
+
+    def on_export_finished(self, path, written):
+        self._export_done()
+        self.statusBar().showMessage(f"已导出 {written} 个采样点: {path}", 5000)
+
+    def on_export_failed(self, message):
+        self._export_done()
+        QtWidgets.QMessageBox.critical(self, "Export", f"导出失败:\n{message}")
+
     def open_alc_settings(self):
         if not self.ser or not self.ser.is_open:
             QtWidgets.QMessageBox.critical(self, "Error", "请先连接串口")
@@ -0,0 +1,113 @@
+"""
+fapiao_engine 的流式报表与监视模式校验
+
+监视模式下，已输出的文件被重新保存 (内容不变) 时不再输出，被修改时替换报表中原来的那一行。
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fapiao_engine as fe  # noqa: E402
+
+COLUMNS = list(fe.new_info(""))
+
+
+def invoice_xml(number):
+    return (f"<Invoice><InvoiceNo>{number}</InvoiceNo><IssueDate>2024-01-02</IssueDate>"
+            f"<TotalTaxIncludedAmount>100.00</TotalTaxIncludedAmount>"
+            f"<BuyerTaxID>91110000MA00000001</BuyerTaxID><SellerTaxID>91110000MA00000002</SellerTaxID>"
+            f"</Invoice>").encode("utf-8")
+
+
+def info(name, number, code=""):
+    row = fe.new_info(name)
+    row.update({"发票号码": number, "发票代码": code})
+    return row
+
+
+class StreamingReportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_duplicates_and_empty_numbers(self):
+        path = os.path.join(self.tmp.name, "r.jsonl")
+        report = fe.StreamingReport(path, COLUMNS)
+        for row in (info("a", "1"), info("b", "1"), info("c", ""), info("d", "")):
+            report.write(row)
+        report.close()
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([r["是否重复"] for r in rows], [False, True, False, False])
+        self.assertEqual(rows[1]["重复于"], "a")
+        self.assertEqual(report.duplicates, 1)
+
+    def test_rewrite_replaces_row(self):
+        for ext in (".csv", ".jsonl"):
+            path = os.path.join(self.tmp.name, "r" + ext)
+            report = fe.StreamingReport(path, COLUMNS)
+            report.write(info("a", "1"))
+            report.write(info("b", "2"))
+            report.write(info("a", "1"))
+            self.assertEqual((report.rows, report.duplicates), (2, 0))
+            # a 改成与 b 相同的号码：成为 b 的重复；之后出现的号码 1 不再算重复
+            report.write(info("a", "2"))
+            report.write(info("c", "1"))
+            report.close()
+            self.assertEqual((report.rows, report.duplicates), (3, 1))
+            if ext == ".csv":
+                with open(path, newline="", encoding="utf-8-sig") as f:
+                    rows = list(csv.DictReader(f))
+            else:
+                with open(path, encoding="utf-8") as f:
+                    rows = [json.loads(line) for line in f]
+            self.assertEqual([(r["文件名"], r["发票号码"], r["重复于"]) for r in rows],
+                             [("a", "2", "b"), ("b", "2", ""), ("c", "1", "")], ext)
+
+
+class WatchTest(unittest.TestCase):
+    def test_resaved_and_modified_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "a.xml")
+            saves = []
+
+            def save(number):
+                with open(path, "wb") as f:
+                    f.write(invoice_xml(number))
+                # 保证 mtime 与上次不同
+                saves.append(number)
+                os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9 * len(saves)))
+
+            save("11111111")
+            rows = []
+            stop = threading.Event()
+            steps = iter([
+                lambda: save("11111111"),  # 重新保存，内容不变
+                None, None,
+                lambda: save("22222222"),  # 内容修改
+                None, None,
+            ])
+
+            def wait(self, stop_event, interval=None):
+                step = next(steps, "stop")
+                if step == "stop":
+                    stop_event.set()
+                elif step is not None:
+                    step()
+
+            with mock.patch.object(fe.FolderWatcher, "wait", wait):
+                fe.watch_invoices(folder, stop, rows.append, workers=1, log=lambda message: None)
+            self.assertEqual([r["发票号码"] for r in rows], ["11111111", "22222222"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+lvgl_font_native 的 cmap 划分校验 (需要 Pillow)
+
+lv_font_fmt_txt_cmap_t.range_length 是 uint16_t，子表覆盖的码点数超过 0xFFFF 会在 C 结构体里回绕。
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import lvgl_font_native as lfn  # noqa: E402
+except ImportError:
+    lfn = None
+
+
+@unittest.skipUnless(lfn, "需要 Pillow")
+class BuildCmapsTest(unittest.TestCase):
+    def assert_covers(self, codepoints, cmaps):
+        restored = []
+        for cmap in cmaps:
+            self.assertLessEqual(cmap["length"], lfn.RANGE_LENGTH_MAX)
+            if cmap["type"] == "FORMAT0_TINY":
+                restored += range(cmap["start"], cmap["start"] + cmap["length"])
+            else:
+                restored += [cmap["start"] + offset for offset in cmap["offsets"]]
+                self.assertEqual(cmap["offsets"][-1] + 1, cmap["length"])
+        self.assertEqual(restored, codepoints)
+
+    def test_sparse_span_boundary(self):
+        for last in (0x20 + 0xFFFE, 0x20 + 0xFFFF, 0x1001F):
+            codepoints = [0x20, last]
+            cmaps = lfn.build_cmaps(codepoints)
+            self.assert_covers(codepoints, cmaps)
+        self.assertEqual(len(lfn.build_cmaps([0x20, 0x20 + 0xFFFE])), 1)
+        self.assertEqual(len(lfn.build_cmaps([0x20, 0x20 + 0xFFFF])), 2)
+
+    def test_long_run_is_split(self):
+        codepoints = list(range(0x20, 0x20 + lfn.RANGE_LENGTH_MAX + 5))
+        cmaps = lfn.build_cmaps(codepoints)
+        self.assertEqual([cmap["length"] for cmap in cmaps], [lfn.RANGE_LENGTH_MAX, 5])
+        self.assertEqual([cmap["glyph_id_start"] for cmap in cmaps], [1, 1 + lfn.RANGE_LENGTH_MAX])
+        self.assert_covers(codepoints, cmaps)
+
+
+@unittest.skipUnless(lfn, "需要 Pillow")
+class RenderLimitsTest(unittest.TestCase):
+    """glyph_dsc 位域放不下时要求 LV_FONT_FMT_TXT_LARGE，连 LARGE 也放不下时报错"""
+
+    def render(self, box_w=2, box_h=2, ofs_x=0, ofs_y=0):
+        glyphs = {0x41: (160, box_w, box_h, ofs_x, ofs_y, b"\x00")}
+        return lfn.render_font_c("font", 16, 8, glyphs, lfn.build_cmaps([0x41]), (14, 4))
+
+    def test_small_glyph(self):
+        self.assertNotIn("#error", self.render(box_w=255, ofs_x=-128, ofs_y=127))
+
+    def test_needs_large_format(self):
+        for kwargs in ({"box_w": 256}, {"box_h": 300}, {"ofs_x": -129}, {"ofs_y": 128}):
+            self.assertIn("LV_FONT_FMT_TXT_LARGE", self.render(**kwargs), kwargs)
+
+    def test_beyond_large_format(self):
+        for kwargs in ({"box_w": 0x10000}, {"ofs_x": -0x8001}, {"ofs_y": 0x8000}):
+            with self.assertRaises(ValueError):
+                self.render(**kwargs)
+
+
+if __name__ == "__main__":
+    unittest.main()
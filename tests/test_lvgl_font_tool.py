@@ -0,0 +1,193 @@
+"""
+lvgl_font_tool 的源码字符提取、字符集编码与 lv_font_conv 调用校验
+
+只能经 cmd.exe 调用 npx.cmd 时，字符集中的 cmd 特殊字符不能出现在命令行里。
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import lvgl_font_tool as lft  # noqa: E402
+
+SYMBOLS = "a&b|c%PATH%"
+SHELL_LAUNCHER = {"cmd": ["npx", "--yes", "lv_font_conv"], "shell": True, "cli": None}
+
+
+class LiteralCharsTest(unittest.TestCase):
+    def chars(self, source):
+        return "".join(sorted(lft.literal_chars(source.encode("utf-8"))))
+
+    def test_skips_comments(self):
+        source = '// 注释 "引号"\n/* 多行\n "注释" */ const char *s = "确认"; /* 未闭合 "取消"'
+        self.assertEqual(self.chars(source), "确认")
+        self.assertEqual(self.chars('const char *s = "// 不是注释";'), "不是注释")
+
+    def test_escapes(self):
+        self.assertEqual(self.chars(r'"\xe7\xa1\xae" "\u8ba4" "\347\250\213" "\U00004E2D"'), "中确程认")
+        self.assertEqual(self.chars(r'"\"确\"" "\\" "认\n"'), "确认")
+
+    def test_prefixed_and_char_literals(self):
+        self.assertEqual(self.chars('u8"确" L"认" u"取" U"消" L\'中\''), "中取消确认")
+
+    def test_raw_literals(self):
+        self.assertEqual(self.chars('R"(确"认)" u8R"x(取)"消)x" // 注'), "取消确认")
+        self.assertEqual(self.chars('LR"(\\x41 "中")"'), "中")
+
+    def test_adjacent_literals(self):
+        self.assertEqual(self.chars(r'"\xe7\xa1" "\xae"'), "确")
+        self.assertEqual(self.chars(r'"\xe7\xa1" /* c */ u8"\xae"'), "确")
+        self.assertEqual(self.chars('"\\xe7\\xa1"\n  "\\xae"'), "确")
+        # 中间隔着其他 token 时不拼接，残缺的 UTF-8 序列被丢弃
+        self.assertEqual(self.chars(r'"\xe7\xa1" x "\xae"'), "")
+
+    def test_ascii_only(self):
+        self.assertEqual(self.chars('printf("hello %d", 1); // 注释'), "")
+
+
+class GlyphCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "ui.c")
+        self.write('const char *s = "确认";', 1_000_000_000)
+
+    def write(self, text, mtime_ns):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def scan(self):
+        cache = lft.GlyphCache(self.tmp.name, literals_only=True)
+        per_file, stats = lft.scan_sources([self.path], workers=1, literals_only=True, cache=cache)
+        return "".join(sorted(per_file[self.path])), stats
+
+    def test_unchanged_file_is_cached(self):
+        self.assertEqual(self.scan(), ("确认", {"files": 1, "scanned": 1, "cached": 0, "failed": 0}))
+        self.assertEqual(self.scan(), ("确认", {"files": 1, "scanned": 0, "cached": 1, "failed": 0}))
+
+    def test_changed_mtime_or_size_rescans(self):
+        self.scan()
+        # 大小不变、只改 mtime
+        self.write('const char *s = "取消";', 2_000_000_000)
+        chars, stats = self.scan()
+        self.assertEqual((chars, stats["scanned"], stats["cached"]), ("取消", 1, 0))
+        # mtime 不变、只改大小
+        self.write('const char *s = "取消确认";', 2_000_000_000)
+        chars, stats = self.scan()
+        self.assertEqual((chars, stats["scanned"], stats["cached"]), ("取消确认", 1, 0))
+
+    def test_modes_are_separate(self):
+        self.write('// 注释\nconst char *s = "确认";', 3_000_000_000)
+        self.scan()
+        cache = lft.GlyphCache(self.tmp.name, literals_only=False)
+        per_file, stats = lft.scan_sources([self.path], workers=1, cache=cache)
+        self.assertEqual((stats["scanned"], "".join(sorted(per_file[self.path]))), (1, "注确认释"))
+
+
+class ConvertFontSkipTest(unittest.TestCase):
+    """参数不变时跳过转换；字符集或字号变化时重新生成 (lv_font_conv 用假的转换函数代替)"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.ttf = os.path.join(self.tmp.name, "font.ttf")
+        with open(self.ttf, "wb") as f:
+            f.write(b"fake ttf")
+        self.out_path = os.path.join(self.tmp.name, "out", "font.c")
+        self.calls = []
+
+    def fake_conv(self, job):
+        self.calls.append(job)
+        with open(job["out_path"], "w", encoding="utf-8") as f:
+            f.write("".join(f"/* U+{ord(c):04X} */\n" for c in job["symbols"]))
+        return subprocess.CompletedProcess([], 0, "", ""), ["lv_font_conv"], ""
+
+    def convert(self, symbols, size=16):
+        with mock.patch.object(lft, "run_lv_font_conv", self.fake_conv):
+            return lft.convert_font(lft.font_job(self.ttf, size, 4, symbols, self.out_path))
+
+    def test_skip_and_regenerate(self):
+        self.assertEqual(self.convert("确认")["status"], "ok")
+        self.assertEqual(self.convert("认确")["status"], "skipped")
+        self.assertEqual(len(self.calls), 1)
+
+        result = self.convert("确认取消")
+        self.assertEqual((result["status"], result["added"], result["removed"]), ("ok", [ord("取"), ord("消")], []))
+        self.assertEqual(self.convert("确认取消")["status"], "skipped")
+
+        result = self.convert("确认取消", size=20)
+        self.assertEqual((result["status"], result["added"], result["removed"]), ("ok", [], []))
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(self.calls[-1]["size"], "20")
+
+        with mock.patch.object(lft, "run_lv_font_conv", self.fake_conv):
+            forced = lft.convert_font(lft.font_job(self.ttf, 20, 4, "确认取消", self.out_path), force=True)
+        self.assertEqual(forced["status"], "ok")
+        self.assertEqual(len(self.calls), 4)
+
+
+class EncodeSymbolsTest(unittest.TestCase):
+    def test_unsafe_chars_become_ranges(self):
+        encoding = lft.encode_symbols(SYMBOLS, lft.CMD_METACHARS)
+        self.assertFalse(set(encoding["symbols"]) & set(lft.CMD_METACHARS))
+        self.assertEqual(lft.decode_symbols(encoding), {ord(c) for c in SYMBOLS})
+
+    def test_default_keeps_symbols(self):
+        encoding = lft.encode_symbols(SYMBOLS)
+        self.assertEqual(encoding["ranges"], [])
+        self.assertEqual(lft.decode_symbols(encoding), {ord(c) for c in SYMBOLS})
+
+
+class ShellSpawnTest(unittest.TestCase):
+    def run_job(self, job):
+        done = subprocess.CompletedProcess([], 0, "", "")
+        with mock.patch.object(lft, "find_lv_font_conv", return_value=SHELL_LAUNCHER), \
+                mock.patch.object(lft.subprocess, "run", return_value=done) as run:
+            lft.run_lv_font_conv(job)
+        return run.call_args
+
+    def test_metachars_stay_off_the_command_line(self):
+        job = lft.font_job(os.path.join("fonts", "font.ttf"), 16, 4, SYMBOLS, os.path.join("out", "font.c"))
+        call = self.run_job(job)
+        cmdline = call.args[0]
+        self.assertIsInstance(cmdline, str)
+        self.assertTrue(call.kwargs["shell"])
+        self.assertFalse(set(cmdline) & set(lft.CMD_METACHARS), cmdline)
+        for c in "&|%":
+            self.assertIn(f"0x{ord(c):X}", cmdline)
+
+    def test_unsafe_path_is_rejected(self):
+        job = lft.font_job("fonts&co/font.ttf", 16, 4, "ab", "out/font.c")
+        with self.assertRaises(ValueError):
+            self.run_job(job)
+
+
+class LoadFontJobsTest(unittest.TestCase):
+    def load(self, spec):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fonts.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(spec, f)
+            return lft.load_font_jobs(path)
+
+    def test_expands_jobs(self):
+        jobs, workers = self.load({"fonts": ["a.ttf"], "sizes": [12, 16], "bpp": [2, 4], "symbols": "确认", "workers": 3})
+        self.assertEqual(len({job["out_path"] for job in jobs}), 4)
+        self.assertEqual(workers, 3)
+
+    def test_rejects_shared_output(self):
+        with self.assertRaises(ValueError):
+            self.load({"fonts": ["a.ttf"], "sizes": [12, 16], "symbols": "确认", "name": "lv_font_{font}"})
+        with self.assertRaises(ValueError):
+            self.load({"symbols": "确认", "jobs": [{"fonts": "a.ttf", "sizes": 16}, {"fonts": "a.ttf", "sizes": 16}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
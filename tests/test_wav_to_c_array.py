@@ -0,0 +1,298 @@
+"""
+WAV -> C 数组 -> WAV 往返校验 (python -m unittest 或 pytest 均可运行)
+
+覆盖空文件、行/块边界、解析切片边界以及带空格和中文的文件名，
+还原出的文件必须与源文件逐字节一致。完整的性能对比见 benchmarks/bench_wav_to_c.py。
+另外校验压缩编码的误差、二进制资源包的索引表和去重资源包的还原结果。
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wav_to_c_array as w2c  # noqa: E402
+
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.src = os.path.join(self.tmp.name, "src")
+        os.makedirs(self.src)
+        sizes = [0, 1, 11, 12, 13, 44, w2c.CHUNK_SIZE - 1, w2c.CHUNK_SIZE + 1, w2c.PARSE_SLICE_SIZE + 7]
+        self.paths = []
+        for i, size in enumerate(sizes):
+            path = os.path.join(self.src, f"rt {i}-提示音.wav" if i % 2 else f"rt_{i}.WAV")
+            with open(path, "wb") as f:
+                f.write(os.urandom(size))
+            self.paths.append(path)
+
+    def assert_restored(self, c_path):
+        out_dir = os.path.join(self.tmp.name, "restored_" + os.path.basename(c_path))
+        self.assertEqual(w2c.c_array_to_wav(c_path, out_dir), len(self.paths))
+        for path in self.paths:
+            with open(path, "rb") as a, open(os.path.join(out_dir, os.path.basename(path)), "rb") as b:
+                self.assertEqual(a.read(), b.read(), os.path.basename(path))
+
+    def test_write_c_file(self):
+        c_path = os.path.join(self.tmp.name, "serial.c")
+        w2c.write_c_file(c_path, self.paths)
+        self.assert_restored(c_path)
+
+    def test_convert_wav_files_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial.c")
+        parallel = os.path.join(self.tmp.name, "parallel.c")
+        w2c.write_c_file(serial, self.paths)
+        w2c.convert_wav_files(self.paths, parallel, workers=1,
+                              cache_dir=os.path.join(self.tmp.name, w2c.CACHE_DIR_NAME))
+        with open(serial, "rb") as a, open(parallel, "rb") as b:
+            self.assertEqual(a.read(), b.read())
+        self.assert_restored(parallel)
+
+
+class PcmRoundTripTest(unittest.TestCase):
+    """PCM 模式 / 压缩编码的数组经 c_array_to_wav 还原为可播放的 WAV"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def restore(self, samples, channels, rate, options):
+        src = os.path.join(self.tmp.name, "src.wav")
+        with wave.open(src, "wb") as f:
+            f.setnchannels(channels)
+            f.setsampwidth(2)
+            f.setframerate(rate)
+            f.writeframes(samples.astype("<i2").tobytes())
+        c_path = os.path.join(self.tmp.name, "pcm.c")
+        w2c.write_c_file(c_path, [src], pcm_options=options)
+        out_dir = os.path.join(self.tmp.name, "restored")
+        self.assertEqual(w2c.c_array_to_wav(c_path, out_dir), 1)
+        with wave.open(os.path.join(out_dir, "src.wav"), "rb") as f:
+            params = (f.getnchannels(), f.getframerate(), f.getnframes(), f.getsampwidth())
+            frames = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+        return params, frames
+
+    def test_pcm_keeps_samples(self):
+        samples = (np.sin(np.arange(6000) * 0.01) * 12000).astype(np.int16)
+        options = {"rate": None, "bits": None, "mono": False, "codec": "pcm"}
+        params, frames = self.restore(samples, 2, 22050, options)
+        self.assertEqual(params, (2, 22050, 3000, 2))
+        self.assertTrue(np.array_equal(frames, samples))
+
+    def test_mono_and_resample(self):
+        samples = (np.sin(np.arange(8000) * 0.01) * 12000).astype(np.int16)
+        options = {"rate": 8000, "bits": None, "mono": True, "codec": "pcm"}
+        params, _ = self.restore(samples, 2, 16000, options)
+        self.assertEqual(params, (1, 8000, 2000, 2))
+
+    def test_codecs(self):
+        samples = (np.sin(np.arange(3001) * 0.02) * 12000).astype(np.int16)
+        for codec in ("ulaw", "alaw", "ima_adpcm"):
+            options = {"rate": None, "bits": None, "mono": False, "codec": codec}
+            params, frames = self.restore(samples, 1, 16000, options)
+            self.assertEqual(params, (1, 16000, len(samples), 2), codec)
+            self.assertLess(np.abs(frames.astype(np.int32) - samples).mean(), 300, codec)
+
+
+class CliTest(unittest.TestCase):
+    def test_bad_input_reports_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "bad.wav"), "wb") as f:
+                f.write(b"RIFX" + os.urandom(60))
+            for command in ("wav2c", "wav2bin", "dedup"):
+                with contextlib.redirect_stderr(io.StringIO()) as err:
+                    code = w2c.main([command, tmp, "--pcm", "-o", os.path.join(tmp, "out_" + command)])
+                self.assertEqual(code, 1, command)
+                self.assertIn("错误", err.getvalue())
+                self.assertNotIn("Traceback", err.getvalue())
+
+
+class CodecTest(unittest.TestCase):
+    samples = np.arange(-32768, 32768, dtype=np.int16)
+
+    def test_ulaw_within_g711_bound(self):
+        codes = w2c.ulaw_encode(self.samples)
+        error = np.abs(w2c.ulaw_decode(codes.tobytes()).astype(np.int32) - self.samples)
+        # 段 s 的量化间隔为 2^(s+3) (16 bit 刻度)，误差不超过半个间隔加上 >>2 截掉的低位；超出 ±32124 饱和
+        segment = (~codes.astype(np.int32) >> 4) & 7
+        inside = np.abs(self.samples.astype(np.int32)) <= 32124
+        self.assertTrue(np.all((error <= (1 << (segment + 2)) + 3)[inside]))
+        self.assertLessEqual(error.max(), 32768 - 32124)
+
+    def test_alaw_within_g711_bound(self):
+        codes = w2c.alaw_encode(self.samples)
+        error = np.abs(w2c.alaw_decode(codes.tobytes()).astype(np.int32) - self.samples)
+        # 段 0/1 的量化间隔为 16，之后每段翻倍；另加 >>3 截掉的低位；超出 ±32256 饱和
+        segment = ((codes.astype(np.int32) ^ 0x55) >> 4) & 7
+        inside = np.abs(self.samples.astype(np.int32)) <= 32256
+        self.assertTrue(np.all((error <= (8 << np.maximum(segment - 1, 0)) + 7)[inside]))
+        self.assertLessEqual(error.max(), 32768 - 32256)
+
+    def test_ima_adpcm_blocks(self):
+        spb = w2c.IMA_SAMPLES_PER_BLOCK
+        self.assertEqual(len(w2c.ima_adpcm_encode(np.zeros(0, dtype=np.int16))), 0)
+        for count in (1, spb - 1, spb, spb + 1, spb * 3 + 7):
+            samples = (np.sin(np.arange(count) * 0.05) * 8000).astype(np.int16)
+            data = w2c.ima_adpcm_encode(samples).tobytes()
+            blocks = -(-count // spb)
+            self.assertEqual(len(data), blocks * w2c.IMA_BLOCK_ALIGN)
+            self.assertEqual(len(w2c.ima_adpcm_decode(data)), blocks * spb)
+            decoded = w2c.ima_adpcm_decode(data, count)
+            self.assertEqual(len(decoded), count)
+            # 每块首样本原样保存
+            self.assertTrue(np.array_equal(decoded[::spb], samples[::spb]))
+            self.assertLess(np.abs(decoded.astype(np.int32) - samples).mean(), 200)
+
+
+def write_wav(path, samples, rate=16000):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(samples.astype("<i2").tobytes())
+
+
+class PackTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(1)
+        tone = (rng.standard_normal(20000) * 3000).astype(np.int16)
+        silence = np.zeros(3000, dtype=np.int16)
+        clips = [np.concatenate([silence, tone, silence]), np.concatenate([silence[:500], tone[:12000]]),
+                 tone[5000:], np.concatenate([silence, tone, silence]), tone[:7]]
+        self.paths = []
+        for i, clip in enumerate(clips):
+            path = os.path.join(self.tmp.name, f"clip_{i}.wav")
+            write_wav(path, clip)
+            self.paths.append(path)
+
+    def test_bin_pack_index(self):
+        out_path = os.path.join(self.tmp.name, "out", "audio.bin")
+        for align in (4, 32, 512):
+            stats = w2c.write_bin_pack(self.paths, out_path, align=align)
+            with open(out_path, "rb") as f:
+                data = f.read()
+            self.assertEqual(stats["bytes"], len(data))
+            magic, version, count, stored_align = w2c.PACK_HEADER.unpack_from(data)
+            self.assertEqual((magic, version, count, stored_align),
+                             (w2c.PACK_MAGIC, w2c.PACK_VERSION, len(self.paths), align))
+            end = w2c.PACK_HEADER.size + w2c.PACK_ENTRY.size * count
+            for i, path in enumerate(self.paths):
+                offset, length = w2c.PACK_ENTRY.unpack_from(data, w2c.PACK_HEADER.size + w2c.PACK_ENTRY.size * i)
+                self.assertEqual(offset % align, 0)
+                self.assertGreaterEqual(offset, end)
+                with open(path, "rb") as f:
+                    self.assertEqual(data[offset:offset + length], f.read())
+                end = offset + length
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "out", "audio.h")))
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, "out", "audio.S")))
+
+    def test_bin_pack_same_basename(self):
+        other = os.path.join(self.tmp.name, "sub")
+        os.makedirs(other)
+        twin = os.path.join(other, os.path.basename(self.paths[0]))
+        with open(self.paths[1], "rb") as a, open(twin, "wb") as b:
+            b.write(a.read())
+        out_path = os.path.join(self.tmp.name, "out", "audio.bin")
+        w2c.write_bin_pack([self.paths[0], twin], out_path)
+        with open(os.path.join(self.tmp.name, "out", "audio.h"), encoding="utf-8") as f:
+            offsets = re.findall(r"^#define (\w+)_OFFSET ", f.read(), re.M)
+        self.assertEqual(offsets, ["PCM_DATA_CLIP_0", "PCM_DATA_CLIP_0_2"])
+
+    def restore_dedup(self, c_path):
+        """按片段表把 audio_shared 拼回每个资源"""
+        with open(c_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        shared_text = text[text.index("audio_shared[] = {"):text.index("audio_shared_len")]
+        shared = bytes(int(x, 16) for x in re.findall(r"0x([0-9a-fA-F]{2})", shared_text))
+        seg_text = text[text.index("audio_segments[] = {"):text.index("audio_assets[] = {")]
+        segments = [tuple(map(int, m)) for m in re.findall(r"\{ (\d+), (\d+) \}", seg_text)]
+        assets = re.findall(r"^    \{ (\d+), (\d+), (\d+),", text[text.index("audio_assets[] = {"):], re.M)
+        restored = []
+        for first, count, length in (tuple(map(int, a)) for a in assets):
+            data = b"".join(shared[o:o + n] for o, n in segments[first:first + count])
+            self.assertEqual(len(data), length)
+            restored.append(data)
+        return restored, len(shared)
+
+    def test_dedup_pack_raw(self):
+        out_path = os.path.join(self.tmp.name, "dedup.c")
+        stats = w2c.write_dedup_pack(self.paths, out_path)
+        restored, shared = self.restore_dedup(out_path)
+        for path, data in zip(self.paths, restored):
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data, os.path.basename(path))
+        self.assertEqual(stats["identical_files"], 1)
+        self.assertEqual(stats["shared_bytes"], shared)
+        self.assertLess(shared, sum(os.path.getsize(p) for p in self.paths))
+
+    def test_dedup_pack_codecs(self):
+        for codec in ("pcm", "ulaw", "alaw", "ima_adpcm"):
+            options = {"rate": None, "bits": None, "mono": False, "codec": codec}
+            out_path = os.path.join(self.tmp.name, f"dedup_{codec}.c")
+            w2c.write_dedup_pack(self.paths, out_path, pcm_options=options)
+            restored, _ = self.restore_dedup(out_path)
+            for path, data in zip(self.paths, restored):
+                self.assertEqual(w2c.convert_pcm(path, options)[0], data, f"{codec} {os.path.basename(path)}")
+
+    def test_dedup_pack_same_basename(self):
+        other = os.path.join(self.tmp.name, "sub")
+        os.makedirs(other)
+        paths = self.paths[:2] + [os.path.join(other, os.path.basename(p)) for p in self.paths[:2]]
+        for src, dst in zip(self.paths[:2], paths[2:]):
+            with open(src, "rb") as a, open(dst, "wb") as b:
+                b.write(a.read()[::-1])
+        out_path = os.path.join(self.tmp.name, "dedup_names.c")
+        w2c.write_dedup_pack(paths, out_path)
+        with open(out_path, encoding="utf-8") as f:
+            macros = re.findall(r"^#define (AUDIO_ASSET_\w+) (\d+)$", f.read(), re.M)
+        self.assertEqual([int(index) for _, index in macros], [0, 1, 2, 3])
+        self.assertEqual(len({name for name, _ in macros}), 4)
+        self.assertEqual([name for name, _ in macros][2:], ["AUDIO_ASSET_PCM_DATA_CLIP_0_2", "AUDIO_ASSET_PCM_DATA_CLIP_1_2"])
+
+    def test_silence_bytes_counts_reuse_only(self):
+        packer = w2c.SharedBlockPacker(io.BytesIO())
+        packer.add("a", bytes(100) + b"x" * 10)
+        self.assertEqual(packer.stats["silence_bytes"], 0)
+        packer.add("b", bytes(80) + b"y" * 10)
+        self.assertEqual(packer.stats["silence_bytes"], 80)
+        packer.add("c", bytes(300) + b"z" * 10)
+        self.assertEqual(packer.stats["silence_bytes"], 80)
+        packer.add("d", b"w" * 5 + bytes(200))
+        self.assertEqual(packer.stats["silence_bytes"], 80 + 200)
+        # 最长静音正好在共享数组末尾时原地延长，复用原有的 500 字节
+        packer.add("e", b"v" * 5 + bytes(500))
+        size = packer.size
+        packer.add("f", bytes(700) + b"u" * 5)
+        self.assertEqual(packer.stats["silence_bytes"], 80 + 200 + 500)
+        self.assertEqual(packer.size, size + 200 + 5)
+
+
+class CdcTest(unittest.TestCase):
+    def test_cuts_align_to_frame(self):
+        data = bytes(w2c.CDC_MAX_CHUNK * 3) + os.urandom(w2c.CDC_MAX_CHUNK * 4)
+        for frame in (1, 2, 4, 6):
+            cuts = w2c.cdc_cut_points(data, frame)
+            self.assertEqual(cuts[-1], len(data))
+            starts = [0] + cuts[:-1]
+            self.assertTrue(all(cut % frame == 0 for cut in starts), frame)
+            self.assertLessEqual(max(b - a for a, b in zip(starts, cuts)), w2c.CDC_MAX_CHUNK)
+
+    def test_shorter_than_window(self):
+        self.assertEqual(w2c.cdc_cut_points(b"abc"), [3])
+        self.assertEqual(w2c.cdc_cut_points(b""), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
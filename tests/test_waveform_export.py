@@ -0,0 +1,78 @@
+"""
+串口波形导出校验：CSV / NPY / WAV 的内容，以及跨多个数据块的分块写入
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "serial_waveform"))
+
+from export import waveform_export as we  # noqa: E402
+
+
+class WaveformExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        rng = np.random.default_rng(7)
+        # 第一段跨过 EXPORT_CHUNK_SAMPLES，模拟环形缓冲区的两段切片
+        self.segments = [rng.integers(-30000, 30000, we.EXPORT_CHUNK_SAMPLES + 123, dtype=np.int32),
+                         rng.integers(-30000, 30000, 77, dtype=np.int32)]
+        self.samples = np.concatenate(self.segments)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_csv(self):
+        segments = [np.array([0, -5, 7], dtype=np.int32), np.array([100], dtype=np.int32)]
+        self.assertEqual(we.export_csv(self.path("a.csv"), segments, 1000.0, 0.5), 4)
+        with open(self.path("a.csv"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], "index,time_s,raw,voltage_v")
+        self.assertEqual(lines[1:], ["0,0,0,0", "1,0.001,-5,-2.5", "2,0.002,7,3.5", "3,0.003,100,50"])
+
+    def test_npy_chunked(self):
+        calls = []
+        written = we.export_npy(self.path("a.npy"), self.segments, lambda done, total: calls.append((done, total)))
+        self.assertEqual(written, len(self.samples))
+        loaded = np.load(self.path("a.npy"))
+        self.assertEqual(loaded.dtype, np.int32)
+        self.assertTrue(np.array_equal(loaded, self.samples))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[-1], (len(self.samples), len(self.samples)))
+
+    def test_npy_empty(self):
+        self.assertEqual(we.export_npy(self.path("e.npy"), []), 0)
+        self.assertEqual(len(np.load(self.path("e.npy"))), 0)
+
+    def read_wav(self, path):
+        with wave.open(path, "rb") as f:
+            self.assertEqual((f.getnchannels(), f.getsampwidth(), f.getframerate()), (1, 2, 48000))
+            return np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+
+    def test_wav_in_range(self):
+        self.assertEqual(we.export_samples(self.path("a.wav"), self.segments, 48000.0, 1.0), len(self.samples))
+        self.assertTrue(np.array_equal(self.read_wav(self.path("a.wav")), self.samples))
+
+    def test_wav_scales_wide_samples(self):
+        # 24 bit ADC 的值按峰值缩放，而不是削顶
+        segments = [np.array([0, 1 << 22, -(1 << 23), (1 << 23) - 1], dtype=np.int32)]
+        we.export_wav(self.path("w.wav"), segments, 48000)
+        frames = self.read_wav(self.path("w.wav"))
+        self.assertEqual(frames[0], 0)
+        self.assertLessEqual(frames[2], -we.WAV_SAMPLE_MAX)
+        self.assertEqual(frames[3], we.WAV_SAMPLE_MAX)
+        self.assertAlmostEqual(int(frames[1]), 16384, delta=1)
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            we.export_samples(self.path("a.txt"), self.segments, 1000.0, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
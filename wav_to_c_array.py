@@ -6,42 +6,605 @@ WAV 文件与 C 数组 双向转换工具 (带UI版)
     2. C数组 -> WAV：从生成的 C 源文件中解析出数据，还原成完全一致的 WAV 音频文件。
     
 保证相互转换的数据内容完全一致（字节级 100% 匹配）。
+
+命令行 (无界面，多进程并行)：
+    python wav_to_c_array.py wav2c <目录或WAV文件...> -o audio_data.c [-j 进程数]
+    python wav_to_c_array.py wav2bin <目录或WAV文件...> -o audio_data.bin [--align 32]
+    python wav_to_c_array.py dedup <目录或WAV文件...> -o audio_pack.c
+    python wav_to_c_array.py c2wav audio_data.c -o restored_wavs
 """
 
+import argparse
+import binascii
+import filecmp
+import hashlib
+import io
+import json
+import mmap
+import multiprocessing
 import os
 import re
-import textwrap
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+from log_sink import LogSink
+
 # ================= 核心逻辑部分 =================
 
-def wav_to_c_array(input_path, var_prefix="pcm_data"):
-    """将 WAV 文件转成 C 数组字符串"""
-    with open(input_path, "rb") as f:
-        data = f.read()
+BYTES_PER_ROW = 12
+# 每次读取的块大小，必须是 BYTES_PER_ROW 的整数倍，保证行不会跨块
+CHUNK_SIZE = BYTES_PER_ROW * 16384
+ROW_SEPARATOR = ",\n    "
+C_FILE_HEADER = "// Auto-generated audio data\n#include <stdint.h>\n"
 
-    # 转成 0xXX 格式
-    hex_list = [f"0x{b:02x}" for b in data]
-    
-    # 按行格式化，每行 12 个字节以适应大多数显示器
-    rows = [", ".join(hex_list[i:i+12]) for i in range(0, len(hex_list), 12)]
-    hex_body = ",\n    ".join(rows)
 
-    # 生成安全的变量名
+def format_hex_rows(chunk):
+    """将一段字节格式化为 0xXX 行文本 (每行 12 字节，行间以 ROW_SEPARATOR 连接)"""
+    if not chunk:
+        return ""
+    # bytes.hex 一次完成全部转换，每个字节固定占 6 个字符 ("0xXX, ")
+    text = "0x" + chunk.hex(" ").replace(" ", ", 0x")
+    width = BYTES_PER_ROW * 6
+    return ROW_SEPARATOR.join([text[i:i + width - 2] for i in range(0, len(text), width)])
+
+
+def c_var_name(input_path, var_prefix="pcm_data"):
+    """生成安全的变量名"""
     base_name = os.path.splitext(os.path.basename(input_path))[0]
     safe_name = re.sub(r"[^a-zA-Z0-9_]", "_", base_name)
-    var_name = f"{var_prefix}_{safe_name}"
-
-    array_lines = [
-        f"// Original File: {os.path.basename(input_path)}",
-        f"const unsigned char {var_name}[] = {{",
-        f"    {hex_body}",
-        f"}};",
-        f"const unsigned int {var_name}_len = {len(data)};",
-        ""
-    ]
-    return "\n".join(array_lines)
+    return f"{var_prefix}_{safe_name}"
+
+
+def unique_var_names(paths, var_prefix="pcm_data"):
+    """为一组文件生成互不相同的变量名：不同目录下的同名文件依次加 _2、_3 后缀
+
+    宏名会转成大写，因此按大写比较。
+    """
+    names, used = [], set()
+    for path in paths:
+        base = name = c_var_name(path, var_prefix)
+        n = 1
+        while name.upper() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.upper())
+        names.append(name)
+    return names
+
+
+def write_c_array(out, input_path, var_prefix="pcm_data", chunk_size=CHUNK_SIZE, pcm_options=None):
+    """流式地把 WAV 文件写成 C 数组到文本流 out，内存占用与文件大小无关，返回字节数
+
+    pcm_options 不为 None 时只输出 data 块中的 PCM 数据 (见 write_pcm_array)。
+    """
+    if pcm_options is not None:
+        return write_pcm_array(out, input_path, var_prefix, pcm_options)
+
+    var_name = c_var_name(input_path, var_prefix)
+    out.write(f"// Original File: {os.path.basename(input_path)}\n")
+    out.write(f"const unsigned char {var_name}[] = {{\n    ")
+
+    total = 0
+    with open(input_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if total:
+                out.write(ROW_SEPARATOR)
+            out.write(format_hex_rows(chunk))
+            total += len(chunk)
+
+    out.write(f"\n}};\nconst unsigned int {var_name}_len = {total};\n")
+    return total
+
+
+def wav_to_c_array(input_path, var_prefix="pcm_data"):
+    """将 WAV 文件转成 C 数组字符串"""
+    buf = io.StringIO()
+    write_c_array(buf, input_path, var_prefix)
+    return buf.getvalue()
+
+
+def c_file_header(pcm_options=None):
+    if pcm_options is None:
+        return C_FILE_HEADER
+    return C_FILE_HEADER + AUDIO_INFO_TYPEDEF
+
+
+def write_c_file(out_path, wav_paths, var_prefix="pcm_data", progress=None, pcm_options=None):
+    """将多个 WAV 依次流式写入同一个 C 文件，返回总字节数
+
+    progress(done, total, path) 在每个文件完成后回调。
+    """
+    total = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        out.write(c_file_header(pcm_options))
+        for index, path in enumerate(wav_paths):
+            out.write("\n")
+            total += write_c_array(out, path, var_prefix, pcm_options=pcm_options)
+            if progress:
+                progress(index + 1, len(wav_paths), path)
+    return total
+
+
+# ================= PCM 模式 =================
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# PCM 模式的默认选项：None 表示保持源文件参数；codec 见 AUDIO_CODECS
+PCM_DEFAULTS = {"rate": None, "mono": False, "bits": None, "codec": "pcm"}
+
+# 编码名 -> 固件端 AUDIO_CODEC_* 取值
+AUDIO_CODECS = {"pcm": 0, "ima_adpcm": 1, "ulaw": 2, "alaw": 3}
+
+AUDIO_CODEC_DEFINES = """
+#define AUDIO_CODEC_PCM       0
+#define AUDIO_CODEC_IMA_ADPCM 1
+#define AUDIO_CODEC_ULAW      2
+#define AUDIO_CODEC_ALAW      3
+"""
+
+AUDIO_INFO_TYPEDEF = AUDIO_CODEC_DEFINES + """
+typedef struct {
+    uint32_t sample_rate;
+    uint16_t channels;
+    uint16_t bits_per_sample;     /* PCM: 8/16, IMA-ADPCM: 4, G.711: 8 */
+    uint32_t data_len;
+    const unsigned char *data;
+    uint16_t codec;               /* AUDIO_CODEC_* */
+    uint16_t block_align;         /* IMA-ADPCM 块字节数，其他编码为 0 */
+    uint32_t sample_count;        /* 解码后每声道采样点数 */
+} audio_info_t;
+"""
+
+
+def read_wav_info(path):
+    """解析 RIFF 块结构，返回 fmt 参数以及 data 块在文件中的偏移和长度"""
+    file_size = os.path.getsize(path)
+    info = None
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            raise ValueError(f"不是有效的 RIFF/WAVE 文件: {os.path.basename(path)}")
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            chunk_id = header[:4]
+            chunk_size = struct.unpack("<I", header[4:])[0]
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                tag, channels, rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                    tag = struct.unpack("<H", fmt[24:26])[0]
+                info = {"format": tag, "channels": channels, "rate": rate,
+                        "bits": bits, "block_align": block_align}
+            elif chunk_id == b"data":
+                if info is None:
+                    raise ValueError(f"data 块之前缺少 fmt 块: {os.path.basename(path)}")
+                offset = f.tell()
+                # 流式录音软件可能把长度写成 0xFFFFFFFF，以实际文件大小为准
+                info["data_offset"] = offset
+                info["data_size"] = min(chunk_size, file_size - offset)
+                info["file_size"] = file_size
+                return info
+            else:
+                f.seek(chunk_size, os.SEEK_CUR)
+            if chunk_size % 2:
+                f.seek(1, os.SEEK_CUR)
+    raise ValueError(f"未找到 data 块: {os.path.basename(path)}")
+
+
+def _decode_samples(raw, info):
+    """将 data 块解码为 (帧数, 声道数) 的 float64 数组，取值范围 [-1, 1)"""
+    import numpy as np
+
+    tag, bits, channels = info["format"], info["bits"], info["channels"]
+    if tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        samples = np.frombuffer(raw, dtype=f"<f{bits // 8}").astype(np.float64)
+    elif tag != WAVE_FORMAT_PCM:
+        raise ValueError(f"不支持的 WAV 编码格式: 0x{tag:04x}")
+    elif bits == 8:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128.0) / 128.0
+    elif bits == 16:
+        samples = np.frombuffer(raw, dtype="<i2") / 32768.0
+    elif bits == 24:
+        b = np.frombuffer(raw[:len(raw) // 3 * 3], dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples = np.where(value >= 1 << 23, value - (1 << 24), value) / float(1 << 23)
+    elif bits == 32:
+        samples = np.frombuffer(raw, dtype="<i4") / float(1 << 31)
+    else:
+        raise ValueError(f"不支持的位深: {bits}")
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels)
+
+
+def _resample(samples, src_rate, dst_rate):
+    """线性插值重采样；降采样前先做滑动平均低通，抑制明显的混叠"""
+    import numpy as np
+
+    frames = samples.shape[0]
+    if frames == 0 or src_rate == dst_rate:
+        return samples
+    if dst_rate < src_rate:
+        width = int(np.ceil(src_rate / dst_rate))
+        if width > 1:
+            kernel = np.ones(width) / width
+            samples = np.column_stack([np.convolve(samples[:, c], kernel, mode="same")
+                                       for c in range(samples.shape[1])])
+    out_frames = max(1, int(round(frames * dst_rate / src_rate)))
+    src_pos = np.arange(out_frames) * (src_rate / dst_rate)
+    index = np.arange(frames)
+    return np.column_stack([np.interp(src_pos, index, samples[:, c]) for c in range(samples.shape[1])])
+
+
+def _encode_samples(samples, bits):
+    import numpy as np
+
+    if bits == 8:
+        # WAV 约定 8 bit 为无符号，MCU 端 DAC 也可直接使用
+        return (np.clip(np.round(samples * 128.0), -128, 127) + 128).astype(np.uint8).tobytes()
+    if bits == 16:
+        return np.clip(np.round(samples * 32768.0), -32768, 32767).astype("<i2").tobytes()
+    raise ValueError(f"PCM 模式只支持输出 8/16 bit，当前: {bits}")
+
+
+def _read_data_chunks(path, info, chunk_size=CHUNK_SIZE):
+    """按块读取 data 块，内存占用与文件大小无关"""
+    with open(path, "rb") as f:
+        f.seek(info["data_offset"])
+        remaining = info["data_size"]
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _split_chunks(payload, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(payload), chunk_size):
+        yield payload[start:start + chunk_size]
+
+
+def stream_pcm(path, pcm_options):
+    """与 convert_pcm 相同，但返回 (数据块迭代器, 数据字节数, 源参数, 输出参数)
+
+    不需要任何转换的线性 PCM 直接从文件按块读取 data 块，不整段读入、不解码；
+    需要重采样/转声道/转位深/压缩编码时才把整段数据读入内存处理。
+    数据块长度都是 CHUNK_SIZE (最后一块除外)，写 C 数组时行不会跨块。
+    """
+    options = dict(PCM_DEFAULTS, **pcm_options)
+    codec = options["codec"]
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"不支持的编码: {codec}")
+    info = read_wav_info(path)
+    rate = options["rate"] or info["rate"]
+    # IMA-ADPCM 只输出单声道块格式；压缩编码统一从 16 bit 线性 PCM 出发
+    channels = 1 if options["mono"] or codec == "ima_adpcm" else info["channels"]
+    bits = options["bits"]
+    if codec != "pcm":
+        bits = 16
+    elif not bits:
+        # "保持" 位深：只能原样保留 8/16 bit 整数 PCM，浮点和 24/32 bit 源文件转为 16 bit
+        keep = info["format"] == WAVE_FORMAT_PCM and info["bits"] in (8, 16)
+        bits = info["bits"] if keep else 16
+
+    needs_convert = (rate != info["rate"] or channels != info["channels"] or bits != info["bits"]
+                     or info["format"] != WAVE_FORMAT_PCM)
+    if codec == "pcm" and not needs_convert:
+        out_fmt = {"codec": codec, "rate": rate, "channels": channels, "bits": bits,
+                   "block_align": 0, "samples": info["data_size"] // (channels * bits // 8)}
+        return _read_data_chunks(path, info), info["data_size"], info, out_fmt
+
+    with open(path, "rb") as f:
+        f.seek(info["data_offset"])
+        raw = f.read(info["data_size"])
+    if needs_convert:
+        samples = _decode_samples(raw, info)
+        if channels == 1 and samples.shape[1] > 1:
+            samples = samples.mean(axis=1, keepdims=True)
+        samples = _resample(samples, info["rate"], rate)
+        raw = _encode_samples(samples, bits)
+
+    sample_count = len(raw) // (channels * bits // 8)
+    out_fmt = {"codec": codec, "rate": rate, "channels": channels, "bits": bits,
+               "block_align": 0, "samples": sample_count}
+    if codec == "pcm":
+        return _split_chunks(raw), len(raw), info, out_fmt
+
+    import numpy as np
+
+    linear = np.frombuffer(raw, dtype="<i2")
+    if codec == "ima_adpcm":
+        payload = ima_adpcm_encode(linear)
+        out_fmt.update(bits=4, block_align=IMA_BLOCK_ALIGN)
+    elif codec == "ulaw":
+        payload = ulaw_encode(linear)
+        out_fmt.update(bits=8)
+    else:
+        payload = alaw_encode(linear)
+        out_fmt.update(bits=8)
+    payload = payload.tobytes()
+    return _split_chunks(payload), len(payload), info, out_fmt
+
+
+def convert_pcm(path, pcm_options):
+    """读取 WAV 的 PCM 数据，按需重采样/转单声道/转位深/压缩编码，返回 (payload, 源参数, 输出参数)"""
+    chunks, _, info, out_fmt = stream_pcm(path, pcm_options)
+    return b"".join(chunks), info, out_fmt
+
+
+def write_pcm_array(out, input_path, var_prefix="pcm_data", pcm_options=None):
+    """PCM 模式：只输出 data 块 (可选重采样/单声道/8-16 bit/压缩编码)，附带格式信息结构体，返回数据字节数"""
+    chunks, length, info, fmt = stream_pcm(input_path, pcm_options or {})
+    var_name = c_var_name(input_path, var_prefix)
+    saved = info["file_size"] - length
+    out.write(f"// Audio: codec={fmt['codec']} rate={fmt['rate']} channels={fmt['channels']} bits={fmt['bits']} "
+              f"block_align={fmt['block_align']} samples={fmt['samples']} "
+              f"source={info['rate']}/{info['channels']}/{info['bits']} "
+              f"source_bytes={info['file_size']} saved={saved}\n")
+    out.write(f"// Original File: {os.path.basename(input_path)}\n")
+    out.write(f"const unsigned char {var_name}[] = {{\n    ")
+    for index, chunk in enumerate(chunks):
+        if index:
+            out.write(ROW_SEPARATOR)
+        out.write(format_hex_rows(chunk))
+    out.write(f"\n}};\nconst unsigned int {var_name}_len = {length};\n")
+    out.write(f"const audio_info_t {var_name}_info = "
+              f"{{ {fmt['rate']}, {fmt['channels']}, {fmt['bits']}, {length}, {var_name}, "
+              f"AUDIO_CODEC_{fmt['codec'].upper()}, {fmt['block_align']}, {fmt['samples']} }};\n")
+    return length
+
+
+# ================= 压缩编码 (IMA-ADPCM / G.711) =================
+
+IMA_STEP_TABLE = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+]
+IMA_INDEX_TABLE = [-1, -1, -1, -1, 2, 4, 6, 8]
+# 与 Microsoft IMA-ADPCM WAV (format 0x11) 单声道块格式一致：
+# 4 字节块头 (int16 首样本, uint8 步长索引, 保留 0) + 每字节两个 4 bit 码 (低半字节在前)
+IMA_BLOCK_ALIGN = 256
+IMA_SAMPLES_PER_BLOCK = (IMA_BLOCK_ALIGN - 4) * 2 + 1
+
+
+def ima_adpcm_encode(samples):
+    """分块编码 int16 单声道样本。各块相互独立，按采样位置循环、所有块同时向量化计算"""
+    import numpy as np
+
+    spb = IMA_SAMPLES_PER_BLOCK
+    blocks = -(-len(samples) // spb) if len(samples) else 0
+    if blocks == 0:
+        return np.zeros(0, dtype=np.uint8)
+    padded = np.zeros(blocks * spb, dtype=np.int32)
+    padded[:len(samples)] = samples
+    padded[len(samples):] = samples[-1]
+    padded = padded.reshape(blocks, spb)
+
+    steps = np.array(IMA_STEP_TABLE, dtype=np.int32)
+    index_adjust = np.array(IMA_INDEX_TABLE, dtype=np.int32)
+    predictor = padded[:, 0].copy()
+    # 块之间不传递状态，用块首几个样本的平均差分估计初始步长，减少开头的适应过程
+    head = np.abs(np.diff(padded[:, :9], axis=1)).mean(axis=1)
+    index = np.clip(np.searchsorted(steps, head), 0, 88).astype(np.int32)
+    first_index = index.copy()
+
+    codes = np.zeros((blocks, spb - 1), dtype=np.uint8)
+    for k in range(1, spb):
+        step = steps[index]
+        diff = padded[:, k] - predictor
+        code = np.where(diff < 0, 8, 0)
+        diff = np.abs(diff)
+        vpdiff = step >> 3
+        for bit, shift in ((4, 0), (2, 1), (1, 2)):
+            s = step >> shift
+            hit = diff >= s
+            code |= np.where(hit, bit, 0)
+            diff = np.where(hit, diff - s, diff)
+            vpdiff = vpdiff + np.where(hit, s, 0)
+        predictor = np.clip(np.where(code & 8, predictor - vpdiff, predictor + vpdiff), -32768, 32767)
+        index = np.clip(index + index_adjust[code & 7], 0, 88)
+        codes[:, k - 1] = code
+
+    out = np.zeros((blocks, IMA_BLOCK_ALIGN), dtype=np.uint8)
+    first = padded[:, 0].astype("<i2").view(np.uint8).reshape(blocks, 2)
+    out[:, 0:2] = first
+    out[:, 2] = first_index
+    out[:, 4:] = codes[:, 0::2] | (codes[:, 1::2] << 4)
+    return out.reshape(-1)
+
+
+def ima_adpcm_decode(data, sample_count=None):
+    """解码 ima_adpcm_encode 生成的块数据为 int16 样本"""
+    import numpy as np
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    blocks = len(raw) // IMA_BLOCK_ALIGN
+    raw = raw[:blocks * IMA_BLOCK_ALIGN].reshape(blocks, IMA_BLOCK_ALIGN)
+    steps = np.array(IMA_STEP_TABLE, dtype=np.int32)
+    index_adjust = np.array(IMA_INDEX_TABLE, dtype=np.int32)
+
+    predictor = raw[:, 0:2].copy().view("<i2").reshape(blocks).astype(np.int32)
+    index = np.clip(raw[:, 2].astype(np.int32), 0, 88)
+    codes = np.empty((blocks, IMA_SAMPLES_PER_BLOCK - 1), dtype=np.int32)
+    codes[:, 0::2] = raw[:, 4:] & 0x0F
+    codes[:, 1::2] = raw[:, 4:] >> 4
+
+    out = np.empty((blocks, IMA_SAMPLES_PER_BLOCK), dtype=np.int16)
+    out[:, 0] = predictor
+    for k in range(IMA_SAMPLES_PER_BLOCK - 1):
+        code = codes[:, k]
+        step = steps[index]
+        vpdiff = (step >> 3) + np.where(code & 4, step, 0) + np.where(code & 2, step >> 1, 0) \
+            + np.where(code & 1, step >> 2, 0)
+        predictor = np.clip(np.where(code & 8, predictor - vpdiff, predictor + vpdiff), -32768, 32767)
+        index = np.clip(index + index_adjust[code & 7], 0, 88)
+        out[:, k + 1] = predictor
+    out = out.reshape(-1)
+    return out if sample_count is None else out[:sample_count]
+
+
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159
+# 各段的上限，用于 μ-law (14 bit 幅度) / A-law (13 bit 幅度) 查段
+ULAW_SEGMENT_END = [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]
+ALAW_SEGMENT_END = [0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]
+
+
+def ulaw_encode(samples):
+    """G.711 μ-law 编码 (与 Sun g711.c 的 linear2ulaw 一致)，全程向量化"""
+    import numpy as np
+
+    pcm = samples.astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    pcm = np.minimum(np.abs(pcm), ULAW_CLIP) + (ULAW_BIAS >> 2)
+    seg = np.searchsorted(np.array(ULAW_SEGMENT_END), pcm)
+    uval = (np.minimum(seg, 7) << 4) | ((pcm >> (seg + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    return (uval ^ mask).astype(np.uint8)
+
+
+def ulaw_decode(data):
+    import numpy as np
+
+    code = ~np.frombuffer(data, dtype=np.uint8).astype(np.int32) & 0xFF
+    exponent = (code >> 4) & 0x07
+    magnitude = ((((code & 0x0F) << 3) + ULAW_BIAS) << exponent) - ULAW_BIAS
+    return np.where(code & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+def alaw_encode(samples):
+    """G.711 A-law 编码 (与 Sun g711.c 的 linear2alaw 一致)，全程向量化"""
+    import numpy as np
+
+    pcm = samples.astype(np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    pcm = np.where(pcm >= 0, pcm, -pcm - 1)
+    seg = np.searchsorted(np.array(ALAW_SEGMENT_END), pcm)
+    shift = np.where(seg < 2, 1, seg)
+    aval = (np.minimum(seg, 7) << 4) | ((pcm >> shift) & 0x0F)
+    aval = np.where(seg >= 8, 0x7F, aval)
+    return (aval ^ mask).astype(np.uint8)
+
+
+def alaw_decode(data):
+    import numpy as np
+
+    code = np.frombuffer(data, dtype=np.uint8).astype(np.int32) ^ 0x55
+    seg = (code & 0x70) >> 4
+    t = ((code & 0x0F) << 4) + np.where(seg == 0, 8, 0x108)
+    t = np.where(seg > 1, t << np.maximum(seg - 1, 0), t)
+    return np.where(code & 0x80, t, -t).astype(np.int16)
+
+
+def decode_audio(data, meta):
+    """按 // Audio: 注释中的编码信息把压缩数据还原为 int16 线性 PCM 字节"""
+    codec = meta.get("codec")
+    if codec == "ima_adpcm":
+        return ima_adpcm_decode(data, meta.get("samples")).astype("<i2").tobytes()
+    if codec == "ulaw":
+        return ulaw_decode(data).astype("<i2").tobytes()
+    if codec == "alaw":
+        return alaw_decode(data).astype("<i2").tobytes()
+    raise ValueError(f"不支持的编码: {codec}")
+
+
+# ================= C 数组 -> WAV =================
+
+# 数组头：[// Audio: k=v ...] // Original File: name.wav \n const unsigned char var[] = {
+C_ARRAY_HEADER_RE = re.compile(
+    rb"(?://\s*Audio:(?P<meta>[^\n]*)\n)?"
+    rb"//\s*Original\s*File:\s*(?P<filename>.*?)\s*\n"
+    rb"const\s+unsigned\s+char\s+\w+\[\]\s*=\s*\{"
+)
+HEX_TOKEN_RE = re.compile(rb"0x[0-9a-fA-F]{2}")
+HEX_SEPARATORS = b" \t\r\n,"
+# 解析时每次处理的数组正文长度 (在逗号处切开，保证 0xXX 不会被截断)
+PARSE_SLICE_SIZE = 1 << 20
+
+
+def parse_hex_body(body):
+    """将数组正文 (0xXX, 0xXX, ...) 批量转换为字节"""
+    compact = body.translate(None, HEX_SEPARATORS)
+    count = len(compact) // 4
+    # 标准格式去掉分隔符后必然是 "0xHH0xHH..." 的严格周期结构，此时可整块 unhexlify
+    if len(compact) == count * 4 and compact[0::4] == b"0" * count and compact[1::4] == b"x" * count:
+        try:
+            return binascii.unhexlify(compact.replace(b"0x", b""))
+        except binascii.Error:
+            pass
+    # 含注释或非标准写法时退回逐个 token 匹配，结果与旧实现一致
+    return bytes(int(h[2:], 16) for h in HEX_TOKEN_RE.findall(body))
+
+
+def parse_audio_meta(text):
+    """解析 // Audio: 注释中的 key=value 字段"""
+    meta = {}
+    for key, value in re.findall(r"(\w+)=(\S+)", text):
+        meta[key] = int(value) if value.isdigit() else value
+    return meta
+
+
+def iter_c_arrays(buf):
+    """单次顺序扫描 C 文件内容，依次产出 (文件名, 正文起点, 正文终点, 格式信息或 None)"""
+    pos = 0
+    while True:
+        match = C_ARRAY_HEADER_RE.search(buf, pos)
+        if not match:
+            return
+        start = match.end()
+        end = buf.find(b"};", start)
+        if end < 0:
+            return
+        filename = match.group("filename").decode("utf-8", errors="ignore").strip()
+        meta = match.group("meta")
+        yield filename, start, end, parse_audio_meta(meta.decode("ascii", errors="ignore")) if meta else None
+        pos = end + 2
+
+
+def write_hex_body(out, buf, start, end, slice_size=PARSE_SLICE_SIZE):
+    """分片解析 buf[start:end] 并写入 out，返回写入字节数"""
+    total = 0
+    pos = start
+    while pos < end:
+        stop = end
+        if end - pos > slice_size:
+            cut = buf.rfind(b",", pos, pos + slice_size)
+            if cut >= 0:
+                stop = cut + 1
+        data = parse_hex_body(buf[pos:stop])
+        out.write(data)
+        total += len(data)
+        pos = stop
+    return total
+
+
+class _WaveFrameWriter:
+    """把 wave 写对象适配成 write_hex_body 需要的 write(bytes) 接口"""
+
+    def __init__(self, wav):
+        self.wav = wav
+
+    def write(self, data):
+        self.wav.writeframesraw(data)
 
 
 def c_array_to_wav(c_file_path, output_dir):
@@ -49,34 +612,609 @@ def c_array_to_wav(c_file_path, output_dir):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
-    with open(c_file_path, "r", encoding="utf-8", errors="ignore") as f:
-        content = f.read()
-
-    # 匹配模式：// Original File: name.wav \n const unsigned char var[] = { data };
-    pattern = re.compile(
-        r"//\s*Original\s*File:\s*(?P<filename>.*?)\s*\n"
-        r"const\s+unsigned\s+char\s+\w+\[\]\s*=\s*\{(?P<data>.*?)\};",
-        re.DOTALL
-    )
-
-    matches = list(pattern.finditer(content))
-    if not matches:
+    if os.path.getsize(c_file_path) == 0:
         return 0
 
     count = 0
-    for match in matches:
-        filename = match.group("filename").strip()
-        hex_data_str = match.group("data")
-        hex_values = re.findall(r"0x[0-9a-fA-F]{2}", hex_data_str)
-        byte_data = bytes([int(h, 16) for h in hex_values])
-        
-        output_path = os.path.join(output_dir, filename)
-        with open(output_path, "wb") as f:
-            f.write(byte_data)
-        count += 1
+    with open(c_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        for filename, start, end, meta in iter_c_arrays(buf):
+            output_path = os.path.join(output_dir, filename)
+            if meta and meta.get("codec") == "pcm":
+                # PCM 模式的数组没有文件头，按注释中的格式参数重建 WAV
+                with wave.open(output_path, "wb") as out:
+                    out.setnchannels(meta["channels"])
+                    out.setsampwidth(meta["bits"] // 8)
+                    out.setframerate(meta["rate"])
+                    write_hex_body(_WaveFrameWriter(out), buf, start, end)
+            elif meta and meta.get("codec") in AUDIO_CODECS:
+                # 压缩编码解码为 16 bit PCM WAV，便于试听检查
+                encoded = io.BytesIO()
+                write_hex_body(encoded, buf, start, end)
+                with wave.open(output_path, "wb") as out:
+                    out.setnchannels(meta["channels"])
+                    out.setsampwidth(2)
+                    out.setframerate(meta["rate"])
+                    out.writeframes(decode_audio(encoded.getvalue(), meta))
+            else:
+                with open(output_path, "wb") as out:
+                    write_hex_body(out, buf, start, end)
+            count += 1
     return count
 
 
+# ================= 批量并行转换 =================
+
+def collect_wav_files(sources):
+    """展开目录/文件列表为排序后的 WAV 路径，保证输出顺序稳定"""
+    wav_paths = []
+    for src in sources:
+        if os.path.isdir(src):
+            names = sorted(f for f in os.listdir(src) if f.lower().endswith(".wav"))
+            wav_paths.extend(os.path.join(src, f) for f in names)
+        elif os.path.isfile(src):
+            wav_paths.append(src)
+    return wav_paths
+
+
+def _write_fragment(wav_path, fragment_path, var_prefix, pcm_options=None):
+    # 子进程入口：单个 WAV 的 C 文本先写入临时片段，不经进程间传递大字符串
+    with open(fragment_path, "w", encoding="utf-8", newline="\n") as out:
+        return write_c_array(out, wav_path, var_prefix, pcm_options=pcm_options)
+
+
+# 片段格式变化时递增，使旧缓存自动失效
+FRAGMENT_VERSION = 2
+CACHE_DIR_NAME = ".wav2c_cache"
+
+
+def fragment_key(wav_path, var_prefix="pcm_data", pcm_options=None):
+    """缓存键：文件内容哈希 + 影响生成结果的所有选项 (文件名决定变量名，也计入)"""
+    digest = hashlib.sha256()
+    with open(wav_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    options = json.dumps({
+        "version": FRAGMENT_VERSION,
+        "prefix": var_prefix,
+        "name": os.path.basename(wav_path),
+        "sha256": digest.hexdigest(),
+        "pcm": None if pcm_options is None else dict(PCM_DEFAULTS, **pcm_options),
+    }, sort_keys=True)
+    return hashlib.sha256(options.encode("utf-8")).hexdigest()
+
+
+def _manifest_path(cache_dir, out_path):
+    # 每个输出文件一份清单，多个输出共用同一个缓存目录时互不干扰
+    digest = hashlib.sha1(os.path.abspath(out_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{digest}.manifest.json")
+
+
+def _read_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return set(json.load(f)["fragments"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return set()
+
+
+def prune_fragment_cache(cache_dir, out_path, fragments):
+    """记录 out_path 本次用到的片段，并删除它上次用过、现在已不再被任何输出引用的片段"""
+    manifest = _manifest_path(cache_dir, out_path)
+    used = {os.path.basename(frag) for frag in fragments}
+    stale = _read_manifest(manifest) - used
+    tmp_manifest = manifest + ".tmp"
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump({"output": os.path.abspath(out_path), "fragments": sorted(used)}, f, ensure_ascii=False)
+    os.replace(tmp_manifest, manifest)
+    if not stale:
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith(".manifest.json") and name != os.path.basename(manifest):
+            stale -= _read_manifest(os.path.join(cache_dir, name))
+    for name in stale:
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
+
+
+def replace_if_changed(tmp_path, out_path):
+    """内容有变化才替换 out_path，否则保留原文件 (mtime 不变，make/ninja 不会重编译)"""
+    if os.path.isfile(out_path) and filecmp.cmp(tmp_path, out_path, shallow=False):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, out_path)
+    return True
+
+
+def convert_wav_files(wav_paths, out_path, var_prefix="pcm_data", workers=None, progress=None,
+                      cache_dir=None, pcm_options=None):
+    """多进程并行转换多个 WAV，并按 wav_paths 的顺序拼接为 out_path
+
+    progress(done, total, path) 按完成顺序在调用线程中回调；输出内容与
+    write_c_file 逐字节一致。指定 cache_dir 时按内容哈希复用已生成的片段，
+    只重新转换变化过的文件 (缓存清理见 prune_fragment_cache)。返回统计信息 dict。
+    """
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    total = len(wav_paths)
+    with tempfile.TemporaryDirectory(prefix=".wav2c_", dir=out_dir) as tmp:
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            fragments = [os.path.join(cache_dir, fragment_key(p, var_prefix, pcm_options) + ".frag")
+                         for p in wav_paths]
+        else:
+            fragments = [os.path.join(tmp, f"{i}.frag") for i in range(total)]
+
+        # 每个待转换任务: (WAV 路径, 片段最终路径, 子进程写入的临时路径)
+        # 临时文件与片段放在同一目录，os.replace 不会跨文件系统 (缓存目录可能在另一个盘或 tmpfs 上)
+        todo = []
+        pending = set()
+        done = 0
+        for path, frag in zip(wav_paths, fragments):
+            if frag in pending or (cache_dir and os.path.isfile(frag)):
+                done += 1
+                if progress:
+                    progress(done, total, path)
+                continue
+            pending.add(frag)
+            todo.append((path, frag, f"{frag}.{os.getpid()}.part"))
+
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        try:
+            if workers <= 1:
+                for path, frag, part in todo:
+                    _write_fragment(path, part, var_prefix, pcm_options)
+                    os.replace(part, frag)
+                    done += 1
+                    if progress:
+                        progress(done, total, path)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = {pool.submit(_write_fragment, path, part, var_prefix, pcm_options): (path, frag, part)
+                               for path, frag, part in todo}
+                    for future in as_completed(futures):
+                        future.result()
+                        path, frag, part = futures[future]
+                        os.replace(part, frag)
+                        done += 1
+                        if progress:
+                            progress(done, total, path)
+        finally:
+            # 转换失败时不在缓存目录中留下写了一半的临时文件
+            for _, _, part in todo:
+                if os.path.exists(part):
+                    os.remove(part)
+
+        tmp_out = os.path.join(tmp, "output.c")
+        with open(tmp_out, "w", encoding="utf-8") as out:
+            out.write(c_file_header(pcm_options))
+            for frag in fragments:
+                out.write("\n")
+                with open(frag, "r", encoding="utf-8", newline="") as f:
+                    shutil.copyfileobj(f, out, CHUNK_SIZE)
+        written = replace_if_changed(tmp_out, out_path)
+
+    if cache_dir:
+        prune_fragment_cache(cache_dir, out_path, fragments)
+
+    return {
+        "files": total,
+        "bytes": sum(os.path.getsize(p) for p in wav_paths),
+        "converted": len(todo),
+        "cached": total - len(todo),
+        "written": written,
+    }
+
+
+# ================= 二进制资源包 =================
+
+PACK_MAGIC = b"APAK"
+PACK_VERSION = 1
+PACK_DEFAULT_ALIGN = 32
+# 包头: magic(4) + version(u16) + count(u16) + align(u32)，之后每个资源 {offset(u32), length(u32)}
+PACK_HEADER = struct.Struct("<4sHHI")
+PACK_ENTRY = struct.Struct("<II")
+# 包头中的资源数是 uint16，偏移和长度是 uint32
+PACK_MAX_FILES = 0xFFFF
+PACK_MAX_BYTES = 0xFFFFFFFF
+
+
+def _align_up(value, align):
+    return -(-value // align) * align
+
+
+def _pack_header_text(bin_name, symbol, entries, align):
+    guard = symbol.upper() + "_H"
+    lines = [
+        f"// Auto-generated audio pack: {bin_name}",
+        f"#ifndef {guard}",
+        f"#define {guard}",
+        "",
+        "#include <stdint.h>",
+        "",
+        "/*",
+        " * 链接方式 (二选一):",
+        f" *   1. .incbin: 将 {symbol}.S 加入工程编译",
+        " *   2. objcopy: objcopy -I binary -O <elf 格式> -B <架构> \\",
+        " *          --rename-section .data=.rodata,alloc,load,readonly,data,contents \\",
+        f" *          --set-section-alignment .rodata={align} {bin_name} {symbol}.o",
+        f" *      并在包含本头文件前定义 {symbol.upper()}_USE_OBJCOPY",
+        " */",
+        f"#ifdef {symbol.upper()}_USE_OBJCOPY",
+        f"#define {symbol}_start _binary_{re.sub(r'[^a-zA-Z0-9_]', '_', bin_name)}_start",
+        f"#define {symbol}_end   _binary_{re.sub(r'[^a-zA-Z0-9_]', '_', bin_name)}_end",
+        "#endif",
+        f"extern const uint8_t {symbol}_start[];",
+        f"extern const uint8_t {symbol}_end[];",
+        "",
+        f"#define {symbol.upper()}_ALIGN {align}",
+        f"#define {symbol.upper()}_COUNT {len(entries)}",
+        "",
+        f"/* 包头: \"{PACK_MAGIC.decode()}\", uint16 version, uint16 count, uint32 align，之后 count 个索引项 */",
+        "typedef struct {",
+        "    uint32_t offset;",
+        "    uint32_t length;",
+        "} audio_pack_entry_t;",
+        "",
+    ]
+    for name, var, offset, length, fmt in entries:
+        macro = var.upper()
+        lines.append(f"// {name}")
+        lines.append(f"#define {macro}_OFFSET 0x{offset:08x}u")
+        lines.append(f"#define {macro}_LEN {length}u")
+        lines.append(f"#define {macro} ({symbol}_start + {macro}_OFFSET)")
+        if fmt:
+            lines.append(f"#define {macro}_RATE {fmt['rate']}u")
+            lines.append(f"#define {macro}_CHANNELS {fmt['channels']}u")
+            lines.append(f"#define {macro}_BITS {fmt['bits']}u")
+            lines.append(f"#define {macro}_CODEC {AUDIO_CODECS[fmt['codec']]}u")
+            lines.append(f"#define {macro}_BLOCK_ALIGN {fmt['block_align']}u")
+            lines.append(f"#define {macro}_SAMPLES {fmt['samples']}u")
+        lines.append("")
+    lines.append(f"#endif // {guard}")
+    return "\n".join(lines) + "\n"
+
+
+def _pack_asm_text(bin_name, symbol, align):
+    return (
+        f"/* Auto-generated: link {bin_name} via .incbin */\n"
+        f"    .section .rodata.{symbol}, \"a\"\n"
+        f"    .balign {align}\n"
+        f"    .global {symbol}_start\n"
+        f"{symbol}_start:\n"
+        f"    .incbin \"{bin_name}\"\n"
+        f"    .global {symbol}_end\n"
+        f"{symbol}_end:\n"
+    )
+
+
+def write_bin_pack(wav_paths, out_path, var_prefix="pcm_data", align=PACK_DEFAULT_ALIGN,
+                   pcm_options=None, progress=None):
+    """将所有 WAV 直接拼接为二进制资源包 out_path，并生成同名 .h (偏移/长度) 和 .S (.incbin)
+
+    每个资源的起始偏移按 align 字节对齐以满足 DMA 要求；原始模式下只做文件拷贝，
+    不做任何文本格式化。输出内容不变时不改写文件。返回统计信息 dict。
+    """
+    if align <= 0 or align & (align - 1):
+        raise ValueError(f"对齐必须是 2 的幂: {align}")
+    if len(wav_paths) > PACK_MAX_FILES:
+        raise ValueError(f"资源包最多容纳 {PACK_MAX_FILES} 个文件，当前 {len(wav_paths)} 个，请拆分为多个资源包")
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.splitext(out_path)[0]
+    bin_name = os.path.basename(out_path)
+    symbol = re.sub(r"[^a-zA-Z0-9_]", "_", os.path.splitext(bin_name)[0])
+
+    total = len(wav_paths)
+    var_names = unique_var_names(wav_paths, var_prefix)
+    table_size = _align_up(PACK_HEADER.size + PACK_ENTRY.size * total, align)
+    entries = []
+    with tempfile.TemporaryDirectory(prefix=".wav2bin_", dir=out_dir) as tmp:
+        tmp_bin = os.path.join(tmp, "pack.bin")
+        with open(tmp_bin, "wb") as out:
+            out.write(bytes(table_size))
+            offset = table_size
+            for done, path in enumerate(wav_paths, 1):
+                fmt = None
+                if pcm_options is None:
+                    with open(path, "rb") as f:
+                        shutil.copyfileobj(f, out, CHUNK_SIZE)
+                        length = f.tell()
+                else:
+                    chunks, length, _, fmt = stream_pcm(path, pcm_options)
+                    for chunk in chunks:
+                        out.write(chunk)
+                entries.append((os.path.basename(path), var_names[done - 1], offset, length, fmt))
+                if offset + length > PACK_MAX_BYTES:
+                    raise ValueError(f"资源包超过 4 GB (索引表只能记录 32 位偏移)，请拆分为多个资源包: "
+                                     f"{os.path.basename(path)}")
+                padding = _align_up(offset + length, align) - (offset + length)
+                out.write(bytes(padding))
+                offset += length + padding
+                if progress:
+                    progress(done, total, path)
+
+            out.seek(0)
+            out.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, total, align))
+            for _, _, entry_offset, length, _ in entries:
+                out.write(PACK_ENTRY.pack(entry_offset, length))
+
+        outputs = [(tmp_bin, out_path)]
+        for suffix, text in ((".h", _pack_header_text(bin_name, symbol, entries, align)),
+                             (".S", _pack_asm_text(bin_name, symbol, align))):
+            tmp_text = os.path.join(tmp, "pack" + suffix)
+            with open(tmp_text, "w", encoding="utf-8") as f:
+                f.write(text)
+            outputs.append((tmp_text, base + suffix))
+        written = [replace_if_changed(src, dst) for src, dst in outputs]
+
+    return {
+        "files": total,
+        "bytes": offset,
+        "written": any(written),
+    }
+
+
+# ================= 去重资源包 =================
+
+# 内容定义分块 (CDC) 参数：gear 滚动哈希窗口 32 字节，平均块约 4 KB
+# 哈希第 k 位只受最后 k+1 个字节影响，因此像 FastCDC 一样检查最高 12 位，判定才覆盖整个窗口
+CDC_WINDOW = 32
+CDC_MASK = ((1 << 12) - 1) << (64 - 12)
+CDC_MIN_CHUNK = 1024
+CDC_MAX_CHUNK = 16384
+# 首尾静音短于该长度时不单独共享
+MIN_SILENCE_RUN = 64
+
+DEDUP_TYPEDEF = """
+typedef struct {
+    uint32_t offset;              /* 在 audio_shared 中的偏移 */
+    uint32_t length;
+} audio_segment_t;
+
+typedef struct {
+    uint32_t first_segment;       /* audio_segments 中的起始下标 */
+    uint32_t segment_count;       /* 依次拼接这些片段即为完整数据 */
+    uint32_t length;
+    /* 以下与 audio_info_t 含义相同；原始模式下数据是完整 WAV 文件，这些字段全为 0 */
+    uint32_t sample_rate;
+    uint16_t channels;
+    uint16_t bits_per_sample;
+    uint16_t codec;               /* AUDIO_CODEC_* */
+    uint16_t block_align;
+    uint32_t sample_count;
+} audio_asset_t;
+"""
+# 固件端 audio_segment_t / audio_asset_t 的大小，用于统计占用
+SEGMENT_DESC_SIZE = 8
+ASSET_DESC_SIZE = 28
+
+
+def _silence_byte(fmt):
+    """各编码下“静音”对应的字节值；IMA-ADPCM 块内含状态，不做静音共享"""
+    if fmt is None:
+        return 0x00
+    codec = fmt["codec"]
+    if codec == "pcm":
+        return 0x80 if fmt["bits"] == 8 else 0x00
+    return {"ulaw": 0xFF, "alaw": 0xD5}.get(codec)
+
+
+def _frame_bytes(fmt):
+    if fmt is None or fmt["codec"] == "ima_adpcm":
+        return 1
+    return max(1, fmt["channels"] * fmt["bits"] // 8)
+
+
+_GEAR_TABLE = None
+
+
+def cdc_cut_points(data, frame=1):
+    """用向量化 gear 滚动哈希找内容定义的切分点，返回每块的结束位置列表
+
+    相同内容无论出现在哪个文件、哪个偏移，都会切出相同的块，因此只需按块哈希查表，
+    不需要文件两两比较。
+    """
+    import numpy as np
+
+    global _GEAR_TABLE
+    if _GEAR_TABLE is None:
+        _GEAR_TABLE = np.random.default_rng(0x5EED).integers(0, 2 ** 63, 256, dtype=np.uint64)
+
+    n = len(data)
+    raw = np.frombuffer(data, dtype=np.uint8)
+    candidates = []
+    step = 1 << 20
+    for base in range(0, n, step):
+        lo = max(0, base - CDC_WINDOW + 1)
+        window = _GEAR_TABLE[raw[lo:min(n, base + step)]]
+        h = np.zeros(len(window), dtype=np.uint64)
+        # 不足一个窗口的数据 (例如去掉首尾静音后很短的文件) 只累加已有的字节
+        for j in range(min(CDC_WINDOW, len(window))):
+            h[j:] += window[:len(window) - j] << np.uint64(j)
+        hits = np.nonzero((h & np.uint64(CDC_MASK)) == 0)[0] + lo + 1
+        candidates.extend(int(x) for x in hits if x > base)
+
+    # 强制切分也对齐到采样帧，共享块不会从半个采样开始
+    max_chunk = max(frame, CDC_MAX_CHUNK // frame * frame)
+    cuts = []
+    last = 0
+    for pos in candidates:
+        pos -= pos % frame
+        while pos - last > max_chunk:
+            last += max_chunk
+            cuts.append(last)
+        if pos - last >= CDC_MIN_CHUNK:
+            cuts.append(pos)
+            last = pos
+    while n - last > max_chunk:
+        last += max_chunk
+        cuts.append(last)
+    if n > last:
+        cuts.append(n)
+    return cuts
+
+
+class SharedBlockPacker:
+    """把多个资源去重写入同一个共享数组：整文件相同、首尾静音、内容定义分块相同的部分只存一份"""
+
+    def __init__(self, shared_file):
+        self.shared = shared_file
+        self.size = 0
+        self.chunks = {}
+        self.files = {}
+        self.silence = {}
+        self.segments = []
+        self.assets = []
+        self.stats = {"files": 0, "input_bytes": 0, "identical_files": 0,
+                      "shared_chunks": 0, "silence_bytes": 0}
+
+    def _append(self, data):
+        offset = self.size
+        self.shared.write(data)
+        self.size += len(data)
+        return offset
+
+    def _silence_segment(self, byte, length):
+        # 较短的静音引用已有最长静音的前缀。更长的静音到来时，若原有静音正好在共享数组末尾就原地延长；
+        # 否则另存一段，之前那段已被片段表引用且已写入磁盘，不再回收 (静音通常只有几段，浪费有限)
+        # silence_bytes 只统计实际复用、没有再次写入的字节数
+        offset, have = self.silence.get(byte, (0, 0))
+        if length <= have:
+            saved = length
+        elif have and offset + have == self.size:
+            self._append(bytes([byte]) * (length - have))
+            saved = have
+        else:
+            offset = self._append(bytes([byte]) * length)
+            saved = 0
+        if length > have:
+            self.silence[byte] = (offset, length)
+        self.stats["silence_bytes"] += saved
+        return offset, length
+
+    def _chunk_segment(self, chunk):
+        key = hashlib.sha1(chunk).digest()
+        found = self.chunks.get(key)
+        if found is not None:
+            self.stats["shared_chunks"] += 1
+            return found, len(chunk)
+        offset = self._append(chunk)
+        self.chunks[key] = offset
+        return offset, len(chunk)
+
+    def add(self, name, data, fmt=None):
+        self.stats["files"] += 1
+        self.stats["input_bytes"] += len(data)
+        digest = hashlib.sha256(data).digest()
+        if digest in self.files:
+            self.stats["identical_files"] += 1
+            self.assets.append((name, fmt, *self.files[digest]))
+            return
+
+        frame = _frame_bytes(fmt)
+        silence = _silence_byte(fmt)
+        lead = trail = 0
+        if silence is not None:
+            pad = bytes([silence])
+            lead = (len(data) - len(data.lstrip(pad))) // frame * frame
+            if lead == len(data):
+                trail = 0
+            else:
+                trail = (len(data) - len(data.rstrip(pad))) // frame * frame
+            lead = lead if lead >= MIN_SILENCE_RUN else 0
+            trail = trail if trail >= MIN_SILENCE_RUN else 0
+
+        pieces = []
+        if lead:
+            pieces.append(self._silence_segment(silence, lead))
+        body = data[lead:len(data) - trail]
+        start = 0
+        for cut in cdc_cut_points(body, frame):
+            pieces.append(self._chunk_segment(body[start:cut]))
+            start = cut
+        if trail:
+            pieces.append(self._silence_segment(silence, trail))
+
+        # 在共享数组中首尾相接的片段合并，独有内容最终只占一个描述符
+        merged = []
+        for offset, length in pieces:
+            if merged and merged[-1][0] + merged[-1][1] == offset:
+                merged[-1] = (merged[-1][0], merged[-1][1] + length)
+            else:
+                merged.append((offset, length))
+        entry = (len(self.segments), len(merged), len(data))
+        self.segments.extend(merged)
+        self.files[digest] = entry
+        self.assets.append((name, fmt, *entry))
+
+    def packed_bytes(self):
+        return self.size + SEGMENT_DESC_SIZE * len(self.segments) + ASSET_DESC_SIZE * len(self.assets)
+
+
+def write_dedup_pack(wav_paths, out_path, var_prefix="pcm_data", pcm_options=None, progress=None):
+    """生成去重后的 C 资源包：一个共享数组 + 片段表 + 每个资源的描述符，返回统计信息 dict"""
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    total = len(wav_paths)
+    with tempfile.TemporaryDirectory(prefix=".wavpack_", dir=out_dir) as tmp:
+        shared_path = os.path.join(tmp, "shared.bin")
+        with open(shared_path, "wb") as shared:
+            packer = SharedBlockPacker(shared)
+            for done, path in enumerate(wav_paths, 1):
+                if pcm_options is None:
+                    with open(path, "rb") as f:
+                        data, fmt = f.read(), None
+                else:
+                    data, _, fmt = convert_pcm(path, pcm_options)
+                packer.add(path, data, fmt)
+                if progress:
+                    progress(done, total, path)
+
+        stats = dict(packer.stats, packed_bytes=packer.packed_bytes(), shared_bytes=packer.size)
+        stats["saved"] = stats["input_bytes"] - stats["packed_bytes"]
+
+        tmp_out = os.path.join(tmp, "output.c")
+        with open(tmp_out, "w", encoding="utf-8") as out:
+            out.write("// Auto-generated deduplicated audio data\n#include <stdint.h>\n")
+            out.write(AUDIO_CODEC_DEFINES)
+            out.write(DEDUP_TYPEDEF)
+            out.write(f"\n// {stats['files']} files, {stats['input_bytes']} bytes -> "
+                      f"{stats['packed_bytes']} bytes (saved {stats['saved']}; "
+                      f"identical files {stats['identical_files']}, shared chunks {stats['shared_chunks']}, "
+                      f"silence reused {stats['silence_bytes']} bytes)\n")
+            out.write("const unsigned char audio_shared[] = {\n    ")
+            with open(shared_path, "rb") as shared:
+                first = True
+                for chunk in iter(lambda: shared.read(CHUNK_SIZE), b""):
+                    if not first:
+                        out.write(ROW_SEPARATOR)
+                    out.write(format_hex_rows(chunk))
+                    first = False
+            out.write(f"\n}};\nconst unsigned int audio_shared_len = {packer.size};\n\n")
+
+            out.write("const audio_segment_t audio_segments[] = {\n")
+            for offset, length in packer.segments:
+                out.write(f"    {{ {offset}, {length} }},\n")
+            out.write("};\n\n")
+
+            out.write("const audio_asset_t audio_assets[] = {\n")
+            for path, fmt, first_segment, count, length in packer.assets:
+                if fmt is None:
+                    fields = "0, 0, 0, 0, 0, 0"
+                else:
+                    fields = (f"{fmt['rate']}, {fmt['channels']}, {fmt['bits']}, "
+                              f"AUDIO_CODEC_{fmt['codec'].upper()}, {fmt['block_align']}, {fmt['samples']}")
+                out.write(f"    {{ {first_segment}, {count}, {length}, {fields} }}, // {os.path.basename(path)}\n")
+            out.write("};\n\n")
+            var_names = unique_var_names([path for path, *_ in packer.assets], var_prefix)
+            for index, var_name in enumerate(var_names):
+                out.write(f"#define AUDIO_ASSET_{var_name.upper()} {index}\n")
+        stats["written"] = replace_if_changed(tmp_out, out_path)
+    return stats
+
+
 # ================= UI 界面部分 =================
 
 class WavCConverterApp:
@@ -112,6 +1250,7 @@ class WavCConverterApp:
         
         self.log_text = scrolledtext.ScrolledText(log_frame, state='disabled', font=("Consolas", 9), background="#f8f9fa")
         self.log_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.log_sink = LogSink(self.root, self.log_text, prefix=">>> ")
 
     def setup_tab1(self):
         container = ttk.Frame(self.tab1, padding=20)
@@ -130,7 +1269,42 @@ class WavCConverterApp:
         self.out_c_var = tk.StringVar(value="audio_data.c")
         ttk.Entry(container, textvariable=self.out_c_var).grid(row=1, column=1, sticky="ew", padx=10)
 
-        ttk.Button(container, text="执行批量转换", style="Action.TButton", command=self.run_wav_to_c).grid(row=2, column=0, columnspan=3, pady=20)
+        pcm_group = ttk.Frame(container)
+        pcm_group.grid(row=2, column=0, columnspan=3, sticky="w", pady=(5, 0))
+        self.pcm_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(pcm_group, text="PCM 模式 (去掉文件头)", variable=self.pcm_mode_var).pack(side=tk.LEFT)
+        ttk.Label(pcm_group, text="采样率:").pack(side=tk.LEFT, padx=(15, 2))
+        self.pcm_rate_var = tk.StringVar(value="保持")
+        ttk.Combobox(pcm_group, textvariable=self.pcm_rate_var, width=7,
+                     values=["保持", "8000", "11025", "16000", "22050", "32000", "44100", "48000"]).pack(side=tk.LEFT)
+        ttk.Label(pcm_group, text="位深:").pack(side=tk.LEFT, padx=(15, 2))
+        self.pcm_bits_var = tk.StringVar(value="保持")
+        ttk.Combobox(pcm_group, textvariable=self.pcm_bits_var, width=5, state="readonly",
+                     values=["保持", "8", "16"]).pack(side=tk.LEFT)
+        self.pcm_mono_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(pcm_group, text="转单声道", variable=self.pcm_mono_var).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Label(pcm_group, text="编码:").pack(side=tk.LEFT, padx=(15, 2))
+        self.pcm_codec_var = tk.StringVar(value="pcm")
+        ttk.Combobox(pcm_group, textvariable=self.pcm_codec_var, width=9, state="readonly",
+                     values=list(AUDIO_CODECS)).pack(side=tk.LEFT)
+        # 与命令行 --codec 一致：选择压缩编码即启用 PCM 模式
+        self.pcm_codec_var.trace_add("write", self.on_codec_changed)
+
+        format_group = ttk.Frame(container)
+        format_group.grid(row=3, column=0, columnspan=3, sticky="w", pady=(10, 0))
+        ttk.Label(format_group, text="输出格式:").pack(side=tk.LEFT)
+        self.out_format_var = tk.StringVar(value="c")
+        ttk.Radiobutton(format_group, text="C 数组 (.c)", value="c", variable=self.out_format_var).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(format_group, text="二进制包 (.bin + .h + .S)", value="bin",
+                        variable=self.out_format_var).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(format_group, text="去重资源包 (.c)", value="dedup",
+                        variable=self.out_format_var).pack(side=tk.LEFT, padx=5)
+
+        self.wav_to_c_btn = ttk.Button(container, text="执行批量转换", style="Action.TButton", command=self.run_wav_to_c)
+        self.wav_to_c_btn.grid(row=4, column=0, columnspan=3, pady=(20, 10))
+
+        self.progress_var = tk.DoubleVar()
+        ttk.Progressbar(container, variable=self.progress_var, maximum=100).grid(row=5, column=0, columnspan=3, sticky="ew")
 
     def setup_tab2(self):
         container = ttk.Frame(self.tab2, padding=20)
@@ -150,11 +1324,8 @@ class WavCConverterApp:
         ttk.Button(container, text="执行还原转换", style="Action.TButton", command=self.run_c_to_wav).grid(row=2, column=0, columnspan=3, pady=20)
 
     def log(self, msg):
-        self.log_text.config(state='normal')
-        self.log_text.insert(tk.END, f">>> {msg}\n")
-        self.log_text.see(tk.END)
-        self.log_text.config(state='disabled')
-        self.root.update()
+        """任意线程可调用，主线程定时批量刷新到日志框"""
+        self.log_sink.write(msg)
 
     def browse_dir(self, var):
         path = filedialog.askdirectory()
@@ -168,6 +1339,10 @@ class WavCConverterApp:
             default_out_dir = os.path.join(os.path.dirname(path), "restored_wavs")
             self.out_wav_dir_var.set(default_out_dir)
 
+    def on_codec_changed(self, *_):
+        if self.pcm_codec_var.get() != "pcm":
+            self.pcm_mode_var.set(True)
+
     def run_wav_to_c(self):
         in_dir = self.wav_path_var.get().strip()
         out_name = self.out_c_var.get().strip()
@@ -175,24 +1350,73 @@ class WavCConverterApp:
             messagebox.showwarning("警告", "请输入有效的源目录")
             return
 
-        wav_files = [f for f in os.listdir(in_dir) if f.lower().endswith(".wav")]
-        if not wav_files:
+        wav_paths = collect_wav_files([in_dir])
+        if not wav_paths:
             self.log("未找到 WAV 文件")
             return
 
+        pcm_options = None
+        if self.pcm_mode_var.get() or self.pcm_codec_var.get() != "pcm":
+            rate = self.pcm_rate_var.get().strip()
+            bits = self.pcm_bits_var.get().strip()
+            if rate != "保持" and not rate.isdigit():
+                messagebox.showwarning("警告", "请输入有效的采样率")
+                return
+            pcm_options = {
+                "rate": int(rate) if rate.isdigit() else None,
+                "bits": int(bits) if bits.isdigit() else None,
+                "mono": self.pcm_mono_var.get(),
+                "codec": self.pcm_codec_var.get(),
+            }
+
         # 确保输出路径在输入目录同级
         out_path = os.path.join(in_dir, out_name)
-        all_content = ["// Auto-generated audio data", "#include <stdint.h>\n"]
-        
-        for f in wav_files:
-            self.log(f"转换中: {f}")
-            all_content.append(wav_to_c_array(os.path.join(in_dir, f)))
+        out_format = self.out_format_var.get()
+        if out_format == "bin":
+            out_path = os.path.splitext(out_path)[0] + ".bin"
+        self.wav_to_c_btn.config(state='disabled')
+        self.progress_var.set(0)
+        self.log(f"找到 {len(wav_paths)} 个 WAV 文件，开始并行转换...")
 
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(all_content))
-        
-        self.log(f"完成！已生成: {out_path}")
-        messagebox.showinfo("成功", f"转换完成，共处理 {len(wav_files)} 个文件")
+        # 后台线程驱动进程池，进度通过 root.after 回到主线程
+        thread = threading.Thread(target=self.process_wav_to_c, args=(wav_paths, out_path, pcm_options, out_format))
+        thread.daemon = True
+        thread.start()
+
+    def process_wav_to_c(self, wav_paths, out_path, pcm_options=None, out_format="c"):
+        def progress(done, total, path):
+            self.log(f"[{done}/{total}] 已转换: {os.path.basename(path)}")
+            self.root.after(0, self.progress_var.set, done * 100 / total)
+
+        try:
+            if out_format == "bin":
+                stats = write_bin_pack(wav_paths, out_path, pcm_options=pcm_options, progress=progress)
+                state = "已生成" if stats["written"] else "内容无变化，未改写"
+                self.log(f"完成！{state}: {out_path} ({stats['bytes']} 字节)")
+                self.root.after(0, messagebox.showinfo, "成功", f"转换完成，共处理 {len(wav_paths)} 个文件")
+                return
+            if out_format == "dedup":
+                stats = write_dedup_pack(wav_paths, out_path, pcm_options=pcm_options, progress=progress)
+                self.log(f"相同文件 {stats['identical_files']} 个，共享块 {stats['shared_chunks']} 个，"
+                         f"静音复用 {stats['silence_bytes']} 字节")
+                self.log(f"完成！{stats['input_bytes']} -> {stats['packed_bytes']} 字节，"
+                         f"节省 {stats['saved']} 字节: {out_path}")
+                self.root.after(0, messagebox.showinfo, "成功", f"转换完成，共处理 {len(wav_paths)} 个文件")
+                return
+            cache_dir = os.path.join(os.path.dirname(out_path), CACHE_DIR_NAME)
+            stats = convert_wav_files(wav_paths, out_path, progress=progress, cache_dir=cache_dir,
+                                      pcm_options=pcm_options)
+            self.log(f"重新转换 {stats['converted']} 个，复用缓存 {stats['cached']} 个")
+            if stats["written"]:
+                self.log(f"完成！已生成: {out_path}")
+            else:
+                self.log(f"完成！内容无变化，未改写: {out_path}")
+            self.root.after(0, messagebox.showinfo, "成功", f"转换完成，共处理 {len(wav_paths)} 个文件")
+        except Exception as e:
+            self.log(f"转换失败: {e}")
+            self.root.after(0, messagebox.showerror, "失败", str(e))
+        finally:
+            self.root.after(0, lambda: self.wav_to_c_btn.config(state='normal'))
 
     def run_c_to_wav(self):
         in_c = self.in_c_var.get().strip()
@@ -209,7 +1433,99 @@ class WavCConverterApp:
             self.log("错误：未在文件中找到匹配的数组格式")
             messagebox.showerror("失败", "未找到有效的数组数据")
 
+# ================= 命令行部分 =================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WAV <-> C 数组互转 (不带参数运行则启动界面)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pcm_args = argparse.ArgumentParser(add_help=False)
+    pcm_args.add_argument("--prefix", default="pcm_data", help="数组变量名前缀")
+    pcm_args.add_argument("--pcm", action="store_true", help="PCM 模式：只输出 data 块并附带格式信息")
+    pcm_args.add_argument("--rate", type=int, default=None, help="PCM 模式下重采样到该采样率")
+    pcm_args.add_argument("--mono", action="store_true", help="PCM 模式下转为单声道")
+    pcm_args.add_argument("--bits", type=int, choices=[8, 16], default=None, help="PCM 模式下输出位深")
+    pcm_args.add_argument("--codec", choices=list(AUDIO_CODECS), default=None,
+                          help="压缩编码 (隐含 --pcm): ima_adpcm 约 4:1, ulaw/alaw 约 2:1")
+
+    p_wav = sub.add_parser("wav2c", parents=[pcm_args], help="WAV -> C 数组")
+    p_wav.add_argument("sources", nargs="+", help="WAV 文件或包含 WAV 的目录")
+    p_wav.add_argument("-o", "--output", default="audio_data.c", help="输出 C 文件")
+    p_wav.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    p_wav.add_argument("--cache-dir", default=None, help=f"片段缓存目录 (默认输出文件旁的 {CACHE_DIR_NAME})")
+    p_wav.add_argument("--no-cache", action="store_true", help="不使用缓存，全部重新转换")
+
+    p_bin = sub.add_parser("wav2bin", parents=[pcm_args], help="WAV -> 二进制资源包 (.bin + .h + .S)")
+    p_bin.add_argument("sources", nargs="+", help="WAV 文件或包含 WAV 的目录")
+    p_bin.add_argument("-o", "--output", default="audio_data.bin", help="输出 .bin 文件")
+    p_bin.add_argument("--align", type=int, default=PACK_DEFAULT_ALIGN, help="资源起始偏移对齐字节数")
+
+    p_dedup = sub.add_parser("dedup", parents=[pcm_args], help="WAV -> 去重资源包 (共享数组 + 片段描述符)")
+    p_dedup.add_argument("sources", nargs="+", help="WAV 文件或包含 WAV 的目录")
+    p_dedup.add_argument("-o", "--output", default="audio_pack.c", help="输出 C 文件")
+
+    p_c = sub.add_parser("c2wav", help="C 数组 -> WAV")
+    p_c.add_argument("c_file", help="C 源文件")
+    p_c.add_argument("-o", "--output", default="restored_wavs", help="输出目录")
+
+    args = parser.parse_args(argv)
+
+    if args.command in ("wav2c", "wav2bin", "dedup"):
+        wav_paths = collect_wav_files(args.sources)
+        if not wav_paths:
+            print("未找到 WAV 文件", file=sys.stderr)
+            return 1
+
+        def progress(done, total, path):
+            print(f"[{done}/{total}] {os.path.basename(path)}", file=sys.stderr)
+
+        pcm_options = None
+        if args.pcm or args.codec:
+            pcm_options = {"rate": args.rate, "mono": args.mono, "bits": args.bits, "codec": args.codec or "pcm"}
+        elif args.rate or args.mono or args.bits:
+            parser.error("--rate/--mono/--bits 需要配合 --pcm 使用")
+
+        # 源文件损坏、格式参数不支持等输入问题只输出错误信息，不打印调用栈
+        try:
+            if args.command == "wav2bin":
+                stats = write_bin_pack(wav_paths, args.output, args.prefix, args.align, pcm_options, progress)
+                state = "已生成" if stats["written"] else "内容无变化，未改写"
+                print(f"{state}: {args.output} ({stats['files']} 个文件, {stats['bytes']} 字节)")
+                return 0
+
+            if args.command == "dedup":
+                stats = write_dedup_pack(wav_paths, args.output, args.prefix, pcm_options, progress)
+                state = "已生成" if stats["written"] else "内容无变化，未改写"
+                print(f"{state}: {args.output} ({stats['files']} 个文件, {stats['input_bytes']} -> "
+                      f"{stats['packed_bytes']} 字节, 节省 {stats['saved']} 字节; 相同文件 {stats['identical_files']} 个, "
+                      f"共享块 {stats['shared_chunks']} 个, 静音复用 {stats['silence_bytes']} 字节)")
+                return 0
+
+            cache_dir = None
+            if not args.no_cache:
+                cache_dir = args.cache_dir or os.path.join(os.path.dirname(os.path.abspath(args.output)), CACHE_DIR_NAME)
+            stats = convert_wav_files(wav_paths, args.output, args.prefix, args.jobs, progress, cache_dir, pcm_options)
+        except (ValueError, OSError) as e:
+            print(f"错误: {e}", file=sys.stderr)
+            return 1
+        state = "已生成" if stats["written"] else "内容无变化，未改写"
+        print(f"{state}: {args.output} ({stats['files']} 个文件, {stats['bytes']} 字节, "
+              f"重新转换 {stats['converted']} 个, 复用缓存 {stats['cached']} 个)")
+        return 0
+
+    count = c_array_to_wav(args.c_file, args.output)
+    if count == 0:
+        print("错误：未在文件中找到匹配的数组格式", file=sys.stderr)
+        return 1
+    print(f"还原完成！共输出 {count} 个文件到 {args.output}")
+    return 0
+
+
 if __name__ == "__main__":
+    # 打包成 exe 时进程池的子进程需要
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(main())
     root = tk.Tk()
     WavCConverterApp(root)
     root.mainloop()
\ No newline at end of file